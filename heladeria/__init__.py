@@ -0,0 +1,34 @@
+"""Sistema de Gestión - Heladería.
+
+El núcleo (base de datos, administradores, CSV) se importa sin tkinter y a demanda:
+``from heladeria import Database`` sólo carga el módulo que define esa clase.
+"""
+import importlib
+
+_EXPORTS = {
+    'Database': 'database',
+    'Money': 'money',
+    'ClientManager': 'managers',
+    'ProductCatalog': 'managers',
+    'ProductManager': 'managers',
+    'SalesManager': 'managers',
+    'SalesJournal': 'journal',
+    'BackupManager': 'backup',
+    'SalesServer': 'server',
+    'RemoteConnection': 'remote',
+    'InventoryManager': 'inventory',
+    'LoyaltyManager': 'loyalty',
+    'CsvManager': 'csv_io',
+    'ReportManager': 'reports',
+    'HeladeriaApp': 'gui',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,134 @@
+"""Respaldos en línea: ``python -m heladeria respaldo`` o Herramientas > Respaldos.
+
+Cada respaldo copia la base (y la base de archivo) con la API de respaldo de SQLite, de a
+unas páginas por paso y desde una conexión de lectura, así no frena las ventas ni hace
+falta cerrar la aplicación; también se puede correr desde otro proceso mientras el
+servidor de ventas atiende. La copia se verifica con PRAGMA quick_check, se comprime
+con gzip y se conservan los últimos respaldos. Para restaurar, descomprimir el .db.gz
+con la aplicación cerrada y reemplazar el archivo de la base (y el -archivo.db).
+"""
+import datetime
+import gzip
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from .database import BACKUP_PAGES
+
+BACKUP_KEEP = 14            # Respaldos que se conservan
+BACKUP_PAUSE = 0.002        # Segundos de pausa entre pasos de la copia, para no acaparar el disco
+COMPRESS_CHUNK = 1024 * 1024
+
+
+class BackupCancelled(Exception):
+    """Respaldo cortado con cancel()"""
+
+
+class BackupManager:
+    def __init__(self, db, directory=None, keep=None, pages=BACKUP_PAGES, pause=BACKUP_PAUSE):
+        self.db = db
+        self.directory = (directory or os.environ.get('HELADERIA_BACKUP_DIR')
+                          or os.path.join(os.path.dirname(os.path.abspath(db.path)), 'respaldos'))
+        self.keep = keep or int(os.environ.get('HELADERIA_BACKUP_KEEP', BACKUP_KEEP))
+        self.pages = pages
+        self.pause = pause
+        self.name = os.path.splitext(os.path.basename(db.path))[0]
+        self.pattern = re.compile(re.escape(self.name) + r'(-archivo)?-(\d{8}-\d{6})\.db\.gz')
+        self.progress = None  # (etapa, hechas, total) del respaldo en curso, para mostrarlo
+        self.last = None      # Resultado del último respaldo
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    def run(self, on_progress=None):
+        """Hacer un respaldo completo; devuelve {'archivos', 'paginas', 'bytes', 'copia',
+        'verificacion', 'compresion'} con los tiempos de cada etapa en segundos.
+        on_progress(etapa, hechas, total) se llama desde el hilo que respalda."""
+        if not self._lock.acquire(blocking=False):
+            raise ValueError("Ya hay un respaldo en curso")
+        try:
+            self._cancel.clear()
+            return self._run(on_progress)
+        finally:
+            self.progress = None
+            self._lock.release()
+
+    def _run(self, on_progress):
+        def report(etapa, hechas, total):
+            if self._cancel.is_set():
+                raise BackupCancelled("Respaldo cancelado")
+            self.progress = (etapa, hechas, total)
+            if on_progress is not None:
+                on_progress(etapa, hechas, total)
+
+        def step(schema, remaining, total):
+            report('copia', total - remaining, total)
+            time.sleep(self.pause)
+
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        targets = {'main': os.path.join(self.directory, f'{self.name}-{stamp}.db')}
+        if self.db.archive_path is not None:
+            targets['archivo'] = os.path.join(self.directory, f'{self.name}-archivo-{stamp}.db')
+        partial = list(targets.values())
+        result = {'archivos': [], 'paginas': 0, 'bytes': 0}
+        try:
+            started = time.perf_counter()
+            result['paginas'] = self.db.backup(targets, self.pages, step)
+            result['copia'] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for path in targets.values():
+                report('verificacion', 0, 1)
+                problems = self.db.quick_check(path)
+                if problems:
+                    raise sqlite3.DatabaseError(
+                        f"La copia {os.path.basename(path)} no pasó la verificación: {problems[0]}")
+            result['verificacion'] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            total = sum(os.path.getsize(path) for path in targets.values())
+            done = 0
+            for path in targets.values():
+                partial.append(path + '.gz.parcial')
+                with open(path, 'rb') as source, gzip.open(path + '.gz.parcial', 'wb', compresslevel=6) as target:
+                    while chunk := source.read(COMPRESS_CHUNK):
+                        target.write(chunk)
+                        done += len(chunk)
+                        report('compresion', done, total)
+                os.replace(path + '.gz.parcial', path + '.gz')
+                os.remove(path)
+                result['archivos'].append(path + '.gz')
+                result['bytes'] += os.path.getsize(path + '.gz')
+            result['compresion'] = time.perf_counter() - started
+        finally:
+            for path in partial:
+                if os.path.exists(path):
+                    os.remove(path)
+        self.rotate()
+        self.last = result
+        return result
+
+    def cancel(self):
+        """Cortar el respaldo en curso (por ejemplo, al cerrar la aplicación)"""
+        self._cancel.set()
+
+    def snapshots(self):
+        """(fecha y hora, [archivos]) de los respaldos guardados, del más reciente al más antiguo"""
+        groups = {}
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                match = self.pattern.fullmatch(name)
+                if match:
+                    groups.setdefault(match.group(2), []).append(os.path.join(self.directory, name))
+        return [(datetime.datetime.strptime(stamp, '%Y%m%d-%H%M%S'), sorted(paths))
+                for stamp, paths in sorted(groups.items(), reverse=True)]
+
+    def rotate(self):
+        """Borrar los respaldos que exceden keep; devuelve cuántos borró"""
+        old = self.snapshots()[self.keep:]
+        for _, paths in old:
+            for path in paths:
+                os.remove(path)
+        return len(old)
@@ -0,0 +1,319 @@
+"""Banco de pruebas de rendimiento: ``python -m heladeria.benchmark``.
+
+Genera una base sintética (clientes, productos y años de ventas) y mide los caminos
+críticos con las clases reales, sin interfaz gráfica. Los resultados (p50/p99 y
+operaciones por segundo) se guardan en JSON para comparar corridas.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import multiprocessing
+import os
+import pathlib
+import platform
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from .dao import ClientRepository, OrderRepository, ProductRepository
+from .database import Database, today
+from .journal import SalesJournal
+from .managers import ClientManager, ProductManager, SalesManager
+from .money import Money
+from .remote import RemoteConnection, RemoteProductManager, RemoteSalesManager
+from .reports import ReportManager
+from .server import SalesServer
+
+NOMBRES = ('Ana', 'Bruno', 'Carla', 'Diego', 'Elena', 'Facundo', 'Gabriela', 'Hernán', 'Inés', 'Julián',
+           'Lucía', 'Martín', 'Natalia', 'Octavio', 'Paula', 'Ramiro', 'Sofía', 'Tomás', 'Valeria', 'Zoe')
+APELLIDOS = ('González', 'Rodríguez', 'Gómez', 'Fernández', 'López', 'Díaz', 'Martínez', 'Pérez',
+             'García', 'Sánchez', 'Romero', 'Sosa', 'Álvarez', 'Torres', 'Ruiz', 'Ramírez')
+CALLES = ('San Martín', 'Belgrano', 'Rivadavia', 'Mitre', 'Sarmiento', 'Moreno', '9 de Julio', 'Colón')
+SABORES = ('Chocolate', 'Dulce de Leche', 'Frutilla', 'Limón', 'Vainilla', 'Menta Granizada', 'Sambayón',
+           'Banana Split', 'Crema Americana', 'Tramontana', 'Granizado', 'Durazno', 'Mascarpone', 'Pistacho')
+FORMATOS = (('Cucurucho Simple', 'Cucuruchos', 1500), ('Cucurucho Doble', 'Cucuruchos', 2500),
+            ('Vasito', 'Vasos', 1800), ('Cuarto Kilo', 'Potes', 4000), ('Medio Kilo', 'Potes', 7000),
+            ('Kilo', 'Potes', 12000), ('Paleta', 'Palitos', 1200), ('Bombón', 'Postres', 1600))
+# Peso relativo de las ventas por hora (UTC, como la columna hora)
+HORAS = {12: 2, 13: 3, 14: 4, 15: 6, 16: 8, 17: 9, 18: 9, 19: 8, 20: 7, 21: 6, 22: 4, 23: 3, 0: 2, 1: 1}
+CHUNK_SIZE = 5000
+
+
+def generate_dataset(db, clientes=10000, productos=200, dias=730, ventas_por_dia=300, seed=1):
+    """Llenar la base con datos sintéticos realistas; devuelve la cantidad de ventas generadas"""
+    rng = random.Random(seed)
+    cursor = db.connection.cursor()
+
+    cursor.executemany('INSERT INTO Clientes (nombre, direccion, telefono) VALUES (?, ?, ?)',
+                       ((f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}",
+                         f"{rng.choice(CALLES)} {rng.randint(1, 5000)}",
+                         f"11{rng.randint(10000000, 99999999)}") for _ in range(clientes)))
+    cursor.executemany('INSERT INTO Productos (nombre, categoria, precio) VALUES (?, ?, ?)',
+                       ((f"{formato} {sabor}" if i >= len(FORMATOS) else formato, categoria,
+                         Money((precio + rng.randint(0, 10) * 50) * 100))
+                        for i, (formato, categoria, precio), sabor in
+                        ((i, rng.choice(FORMATOS), rng.choice(SABORES)) for i in range(productos))))
+    db.connection.commit()
+
+    product_ids = [row[0] for row in cursor.execute('SELECT id FROM Productos')]
+    precios = dict(cursor.execute('SELECT id, precio FROM Productos'))
+    # Pocos productos concentran la mayoría de las ventas
+    pesos = [1.0 / (rank + 1) for rank in range(len(product_ids))]
+    horas, pesos_horas = list(HORAS), list(HORAS.values())
+
+    def ventas():
+        inicio = datetime.date.fromisoformat(today()) - datetime.timedelta(days=dias)
+        for d in range(dias):
+            fecha = inicio + datetime.timedelta(days=d)
+            factor = 1.6 if fecha.weekday() >= 5 else 1.0
+            factor *= 1.5 if fecha.month in (12, 1, 2) else 0.7 if fecha.month in (6, 7, 8) else 1.0
+            cantidad_ventas = max(1, int(rng.gauss(ventas_por_dia * factor, ventas_por_dia * 0.1)))
+            for producto_id, hora in zip(rng.choices(product_ids, pesos, k=cantidad_ventas),
+                                         rng.choices(horas, pesos_horas, k=cantidad_ventas)):
+                cantidad = rng.choice((1, 1, 1, 2, 2, 3))
+                yield producto_id, cantidad, precios[producto_id] * cantidad, fecha.isoformat(), hora
+
+    total = 0
+    rows = ventas()
+    while True:
+        chunk = [row for _, row in zip(range(CHUNK_SIZE), rows)]
+        if not chunk:
+            break
+        cursor.executemany('INSERT INTO Ventas (producto_id, cantidad, precio_total, fecha, hora) VALUES (?, ?, ?, ?, ?)',
+                           chunk)
+        db.connection.commit()
+        total += len(chunk)
+
+    # Un pedido entregado por venta, como el historial migrado; tres de cada diez con cliente
+    db.backfill_orders()
+    cursor.execute('UPDATE Pedidos SET cliente_id = (id * 7919) % ? + 1 WHERE id % 10 < 3', (clientes,))
+    db.connection.commit()
+    return total
+
+
+def measure(fn, repeat):
+    """Ejecutar fn repeat veces y devolver las latencias en segundos"""
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def summarize(latencies):
+    ordered = sorted(latencies)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+    total = sum(ordered)
+    return {
+        'n': len(ordered),
+        'p50_ms': percentile(50) * 1000,
+        'p99_ms': percentile(99) * 1000,
+        'media_ms': total / len(ordered) * 1000,
+        'ops_por_seg': len(ordered) / total if total else None,
+    }
+
+
+def run_benchmarks(db, repeat=200, seed=1):
+    """Medir los caminos críticos; devuelve {nombre: resumen}"""
+    rng = random.Random(seed)
+    client_manager = ClientManager(db)
+    product_manager = ProductManager(db)
+    sales_manager = SalesManager(db, product_manager.catalog)
+    report_manager = ReportManager(db)
+    product_ids = list(product_manager.catalog.products)
+    hoy = today()
+    mes = (datetime.date.fromisoformat(hoy) - datetime.timedelta(days=29)).isoformat()
+    heavy = max(5, repeat // 20)  # Menos repeticiones para las lecturas completas
+
+    benchmarks = {
+        'sell_product': (lambda: sales_manager.sell_product(rng.choice(product_ids), rng.randint(1, 3)), repeat),
+        'sell_ticket_3_lineas': (lambda: sales_manager.sell_ticket(
+            [(rng.choice(product_ids), rng.randint(1, 3)) for _ in range(3)]), repeat),
+        'get_clients': (client_manager.get_clients, heavy),
+        'get_products': (product_manager.get_products, heavy),
+        'get_clients_page': (lambda: client_manager.get_clients_page(
+            after_id=rng.randint(0, 1000), limit=50), repeat),
+        'search_clients': (lambda: client_manager.search_clients(rng.choice(NOMBRES)[:3]), repeat),
+        'pedidos_cliente': (lambda: sales_manager.get_client_orders(rng.randint(1, 1000)), repeat),
+        'total_diario': (sales_manager.get_daily_total, repeat),
+        'total_diario_sin_agregado': (lambda: db.connection.execute(
+            'SELECT SUM(precio_total) FROM Ventas WHERE fecha = ?', (hoy,)).fetchone(), repeat),
+        'reporte_mensual': (lambda: report_manager.sales_report(mes, hoy), heavy),
+    }
+    results = {name: summarize(measure(fn, times)) for name, (fn, times) in benchmarks.items()}
+
+    # Escritura diferida: la venta se confirma al anotarla en el diario
+    journal = SalesJournal(db, db.path + '-benchmark.journal')
+    try:
+        journal_sales = SalesManager(db, product_manager.catalog, journal)
+        results['sell_product_diario'] = summarize(measure(
+            lambda: journal_sales.sell_product(rng.choice(product_ids), rng.randint(1, 3)), repeat))
+    finally:
+        journal.close()
+        os.remove(journal.path)
+    return results
+
+
+def _till(path, address, ventas, seed):
+    """Una caja en su propio proceso: vende contra la base (address None) o contra el servidor"""
+    rng = random.Random(seed)
+    if address is None:
+        db = Database(path)
+        product_manager = ProductManager(db)
+        sales_manager = SalesManager(db, product_manager.catalog)
+    else:
+        connection = RemoteConnection(address)
+        product_manager = RemoteProductManager(connection)
+        sales_manager = RemoteSalesManager(connection)
+    product_ids = list(product_manager.catalog.products)
+    latencies, errores = [], 0
+    try:
+        for _ in range(ventas):
+            start = time.perf_counter()
+            try:
+                sales_manager.sell_ticket([(rng.choice(product_ids), rng.randint(1, 3)) for _ in range(3)])
+            except sqlite3.OperationalError:
+                errores += 1  # database is locked
+            latencies.append(time.perf_counter() - start)
+    finally:
+        if address is None:
+            db.close()
+        else:
+            connection.close()
+    return latencies, errores
+
+
+def run_terminals(db, cajas, ventas, seed=1):
+    """Varias cajas en procesos separados vendiendo a la vez: cada una contra el archivo y todas
+    a través de un servidor de ventas; devuelve {nombre: resumen} con el total por segundo"""
+    results = {}
+
+    def run(name, address):
+        start = time.perf_counter()
+        with multiprocessing.Pool(cajas) as pool:
+            partial = pool.starmap(_till, [(db.path, address, ventas, seed + i) for i in range(cajas)])
+        elapsed = time.perf_counter() - start
+        result = summarize([latency for latencies, _ in partial for latency in latencies])
+        result['errores'] = sum(errores for _, errores in partial)
+        result['ops_por_seg'] = cajas * ventas / elapsed  # Todas las cajas juntas
+        results[name] = result
+
+    run(f'cajas_{cajas}_directo', None)
+
+    server = SalesServer(db)
+    ready = threading.Event()
+    thread = threading.Thread(target=asyncio.run, args=(server.serve(('127.0.0.1', 0), lambda address: ready.set()),))
+    thread.start()
+    ready.wait()
+    try:
+        run(f'cajas_{cajas}_servidor', '%s:%d' % server.address)
+    finally:
+        server.stop()
+        thread.join()
+    return results
+
+
+def copy_database(source, target):
+    """Copiar una base existente y su base de archivo, si la tiene, con la API de respaldo de SQLite
+    y abriéndolas sólo para lectura (sin migrarlas); devuelve la ruta de la copia"""
+    for origen, destino in ((source, target),
+                            (os.path.splitext(source)[0] + '-archivo.db', os.path.splitext(target)[0] + '-archivo.db')):
+        if not os.path.exists(origen):
+            continue
+        connection = sqlite3.connect(pathlib.Path(origen).resolve().as_uri() + '?mode=ro', uri=True)
+        try:
+            copy = sqlite3.connect(destino)
+            try:
+                connection.backup(copy)
+            finally:
+                copy.close()
+        finally:
+            connection.close()
+    return target
+
+
+def compare(actual, anterior):
+    for name, result in actual.items():
+        previous = anterior.get(name)
+        if previous:
+            ratio = result['p50_ms'] / previous['p50_ms'] if previous['p50_ms'] else float('nan')
+            print(f"{name:28} p50 {previous['p50_ms']:9.3f} -> {result['p50_ms']:9.3f} ms  (x{ratio:.2f})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='heladeria.benchmark', description=__doc__.splitlines()[0])
+    parser.add_argument('--db', help="Base a usar: si existe se mide sobre una copia temporal, si no se genera "
+                                     "(por defecto un archivo temporal)")
+    parser.add_argument('--clientes', type=int, default=10000)
+    parser.add_argument('--productos', type=int, default=200)
+    parser.add_argument('--dias', type=int, default=730, help="Días de historia de ventas")
+    parser.add_argument('--ventas-por-dia', type=int, default=300)
+    parser.add_argument('--repeticiones', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--cajas', type=int, default=0,
+                        help="Además, medir tantas cajas simultáneas directo contra la base y con el servidor")
+    parser.add_argument('--ventas-por-caja', type=int, default=500)
+    parser.add_argument('--salida', help="Archivo JSON de resultados (por defecto benchmark-<fecha>.json)")
+    parser.add_argument('--comparar', help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    path = args.db
+    existing = path is not None and os.path.exists(path)
+    if path is None or existing:
+        tmpdir = tempfile.TemporaryDirectory()
+        if existing:
+            # Las mediciones venden y reasignan pedidos: se corren sobre una copia
+            path = copy_database(path, os.path.join(tmpdir.name, os.path.basename(path)))
+            print(f"Usando una copia de {args.db}; la base original no se modifica")
+        else:
+            path = os.path.join(tmpdir.name, 'heladeria.db')
+
+    db = Database(path)
+    try:
+        if not existing:
+            start = time.perf_counter()
+            ventas = generate_dataset(db, args.clientes, args.productos, args.dias, args.ventas_por_dia, args.seed)
+            print(f"Base generada en {time.perf_counter() - start:.1f} s: {args.clientes} clientes, "
+                  f"{args.productos} productos, {ventas} ventas")
+        results = run_benchmarks(db, args.repeticiones, args.seed)
+        if args.cajas:
+            results.update(run_terminals(db, args.cajas, args.ventas_por_caja, args.seed))
+        dataset = {'Clientes': ClientRepository(db).count(), 'Productos': ProductRepository(db).count(),
+                   'Ventas': OrderRepository(db).count_sales()}
+    finally:
+        db.close()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    for name, result in results.items():
+        print(f"{name:28} p50 {result['p50_ms']:9.3f} ms  p99 {result['p99_ms']:9.3f} ms  "
+              f"{result['ops_por_seg']:10.1f} ops/s")
+
+    salida = args.salida or f"benchmark-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump({
+            'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'plataforma': platform.platform(),
+            'datos': dataset,
+            'resultados': results,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            compare(results, json.load(f)['resultados'])
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
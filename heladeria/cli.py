@@ -0,0 +1,446 @@
+"""Línea de comandos: ``python -m heladeria <comando>``. Sin comando abre la interfaz gráfica."""
+import argparse
+import datetime
+import os
+import sqlite3
+
+from .database import Database, today
+from .managers import ESTADOS_PEDIDO, METODOS_PAGO
+from .money import Money
+
+
+def fecha(value):
+    return datetime.date.fromisoformat(value).isoformat()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='heladeria', description="Sistema de Gestión - Heladería")
+    parser.add_argument('--db', help="Archivo de base de datos (por defecto $HELADERIA_DB o heladeria.db)")
+    parser.add_argument('--diario', metavar='ARCHIVO',
+                        help="Diario de ventas para la escritura diferida (por defecto $HELADERIA_JOURNAL); "
+                             "al abrirlo se aplican las ventas pendientes")
+    parser.add_argument('--perfil', metavar='ARCHIVO',
+                        help="Perfilar las consultas del comando y guardar las estadísticas en un JSON "
+                             "(en la interfaz gráfica usar $HELADERIA_PROFILE y Herramientas > Diagnóstico)")
+    parser.add_argument('--servidor', metavar='DIRECCION',
+                        help="Abrir la interfaz como caja de un servidor de ventas, host:puerto o ruta de "
+                             "un socket (por defecto $HELADERIA_SERVER)")
+    comandos = parser.add_subparsers(dest='comando', metavar='comando')
+
+    comandos.add_parser('gui', help="Abrir la interfaz gráfica")
+
+    sub = comandos.add_parser('servidor', help="Servidor de ventas para varias cajas (usa --db y --diario)")
+    sub.add_argument('--direccion',
+                     help="host:puerto o ruta de un socket Unix (por defecto 127.0.0.1:8765); para escuchar "
+                          "fuera de la máquina hay que fijar un token en $HELADERIA_SERVER_TOKEN, el mismo en las cajas")
+
+    sub = comandos.add_parser('cierre', help="Total de ventas del día o su cierre de caja")
+    sub.add_argument('--fecha', type=fecha, help="AAAA-MM-DD (por defecto hoy)")
+    sub.add_argument('--cerrar', action='store_true',
+                     help="Cerrar la caja del día y pasar al archivo los pedidos viejos")
+
+    sub = comandos.add_parser('archivar', help="Pasar a la base de archivo los pedidos entregados viejos")
+    sub.add_argument('--dias', type=int,
+                     help="Antigüedad en días (por defecto $HELADERIA_ARCHIVE_DAYS o 90)")
+
+    sub = comandos.add_parser('respaldo', help="Respaldar la base en línea (también con el servidor andando)")
+    sub.add_argument('--directorio', help="Carpeta de los respaldos (por defecto $HELADERIA_BACKUP_DIR o "
+                                          "respaldos/ junto a la base)")
+    sub.add_argument('--conservar', type=int, metavar='N',
+                     help="Respaldos que se conservan (por defecto $HELADERIA_BACKUP_KEEP o 14)")
+
+    sub = comandos.add_parser('verificar', help="Verificar la integridad de la base")
+    sub.add_argument('--completo', action='store_true',
+                     help="integrity_check completo en lugar de quick_check (más lento)")
+
+    sub = comandos.add_parser('ventas', help="Listar las ventas entre dos fechas")
+    sub.add_argument('--desde', type=fecha, help="AAAA-MM-DD (por defecto hoy)")
+    sub.add_argument('--hasta', type=fecha, help="AAAA-MM-DD (por defecto hoy)")
+
+    sub = comandos.add_parser('reporte', help="Facturación por producto y categoría entre dos fechas")
+    sub.add_argument('--desde', type=fecha, help="AAAA-MM-DD (por defecto hoy)")
+    sub.add_argument('--hasta', type=fecha, help="AAAA-MM-DD (por defecto hoy)")
+    sub.add_argument('--top', type=int, default=10, help="Cantidad de productos a mostrar")
+
+    productos = comandos.add_parser('productos', help="Mantenimiento del catálogo")
+    acciones = productos.add_subparsers(dest='accion', metavar='accion', required=True)
+    sub = acciones.add_parser('listar', help="Listar productos")
+    sub.add_argument('--buscar', help="Filtrar por nombre o categoría")
+    sub = acciones.add_parser('agregar', help="Agregar un producto")
+    sub.add_argument('nombre')
+    sub.add_argument('precio', type=Money.parse)
+    sub.add_argument('--categoria', default='')
+    sub = acciones.add_parser('actualizar', help="Modificar un producto")
+    sub.add_argument('id', type=int)
+    sub.add_argument('--nombre')
+    sub.add_argument('--categoria')
+    sub.add_argument('--precio', type=Money.parse)
+    sub = acciones.add_parser('eliminar', help="Eliminar un producto")
+    sub.add_argument('id', type=int)
+
+    stock = comandos.add_parser('stock', help="Inventario de insumos y recetas")
+    acciones = stock.add_subparsers(dest='accion', metavar='accion', required=True)
+    sub = acciones.add_parser('listar', help="Listar insumos")
+    sub.add_argument('--faltantes', action='store_true', help="Sólo los que están en el mínimo o por debajo")
+    sub = acciones.add_parser('agregar', help="Agregar un insumo")
+    sub.add_argument('nombre')
+    sub.add_argument('--unidad', default='unidad')
+    sub.add_argument('--stock', type=int, default=0)
+    sub.add_argument('--minimo', type=int, default=0)
+    sub.add_argument('--producto', type=int, help="Producto que lo consume de a uno (stock por producto)")
+    sub = acciones.add_parser('ingresar', help="Sumar stock a un insumo")
+    sub.add_argument('id', type=int)
+    sub.add_argument('cantidad', type=int)
+    sub = acciones.add_parser('ajustar', help="Fijar el stock contado de un insumo")
+    sub.add_argument('id', type=int)
+    sub.add_argument('stock', type=int)
+    sub = acciones.add_parser('receta', help="Ver o reemplazar la receta de un producto")
+    sub.add_argument('producto', type=int)
+    sub.add_argument('insumos', nargs='*', metavar='INSUMO:CANTIDAD')
+    sub = acciones.add_parser('movimientos', help="Historial de un insumo")
+    sub.add_argument('id', type=int)
+    sub.add_argument('--limite', type=int, default=50)
+
+    pedidos = comandos.add_parser('pedidos', help="Pedidos, su estado y sus pagos")
+    acciones = pedidos.add_subparsers(dest='accion', metavar='accion', required=True)
+    sub = acciones.add_parser('listar', help="Pedidos abiertos o los de un cliente")
+    sub.add_argument('--cliente', type=int, help="Pedidos del cliente, del más reciente al más antiguo")
+    sub.add_argument('--limite', type=int, default=50)
+    sub = acciones.add_parser('ver', help="Líneas y pagos de un pedido")
+    sub.add_argument('id', type=int)
+    sub = acciones.add_parser('estado', help="Cambiar el estado de un pedido")
+    sub.add_argument('id', type=int)
+    sub.add_argument('estado', choices=ESTADOS_PEDIDO)
+    sub = acciones.add_parser('pagar', help="Registrar un pago de un pedido")
+    sub.add_argument('id', type=int)
+    sub.add_argument('monto', type=Money.parse)
+    sub.add_argument('--metodo', choices=METODOS_PAGO, default='efectivo')
+
+    clientes = comandos.add_parser('clientes', help="Fidelidad: mejores clientes, inactivos e historial")
+    acciones = clientes.add_subparsers(dest='accion', metavar='accion', required=True)
+    sub = acciones.add_parser('top', help="Mejores clientes")
+    sub.add_argument('--por', choices=('gasto', 'visitas'), default='gasto')
+    sub.add_argument('--limite', type=int, default=10)
+    sub = acciones.add_parser('inactivos', help="Clientes habituales que dejaron de venir")
+    sub.add_argument('--dias', type=int, default=60, help="Días sin comprar (por defecto 60)")
+    sub.add_argument('--visitas', type=int, default=3, help="Visitas mínimas (por defecto 3)")
+    sub.add_argument('--limite', type=int, default=50)
+    sub = acciones.add_parser('ver', help="Visitas, gasto, preferidos y últimos pedidos de un cliente")
+    sub.add_argument('id', type=int)
+
+    for nombre in ('importar-productos', 'importar-clientes'):
+        sub = comandos.add_parser(nombre, help=f"{nombre.replace('-', ' ').capitalize()} desde un CSV")
+        sub.add_argument('archivo')
+    for nombre in ('exportar-productos', 'exportar-clientes'):
+        sub = comandos.add_parser(nombre, help=f"{nombre.replace('-', ' ').capitalize()} a un CSV")
+        sub.add_argument('archivo')
+    sub = comandos.add_parser('exportar-ventas', help="Exportar ventas entre dos fechas a un CSV")
+    sub.add_argument('archivo')
+    sub.add_argument('--desde', required=True, type=fecha, help="AAAA-MM-DD")
+    sub.add_argument('--hasta', required=True, type=fecha, help="AAAA-MM-DD")
+    return parser
+
+
+def run_gui(db_path, journal_path, server_address):
+    import tkinter as tk
+    from .gui import HeladeriaApp
+
+    root = tk.Tk()  # Crea la ventana principal
+    app = HeladeriaApp(root, db_path, journal_path, server_address)  # Pasa la ventana principal a HeladeriaApp
+    root.mainloop()  # Inicia el bucle principal de la interfaz
+    return 0
+
+
+def run_server(db, address, journal_path):
+    from .journal import JournalInUse, SalesJournal
+    from .remote import DEFAULT_ADDRESS
+    from .server import run
+
+    # Con diario, el servidor confirma cada venta al anotarla y la escribe después
+    try:
+        journal = SalesJournal(db, journal_path) if journal_path else None
+    except JournalInUse as e:
+        print(e)
+        return 1
+    try:
+        run(db, address or DEFAULT_ADDRESS, journal)
+    except ValueError as e:  # Dirección inválida, o fuera de la máquina sin token
+        print(e)
+        return 1
+    finally:
+        if journal is not None:
+            journal.close()
+    return 0
+
+
+def run_products(db, args):
+    from .managers import ProductManager
+
+    product_manager = ProductManager(db)
+    if args.accion == 'listar':
+        if args.buscar:
+            products = product_manager.search_products(args.buscar, limit=-1)
+        else:
+            products = product_manager.get_products()
+        for product_id, nombre, categoria, precio in products:
+            print(f"{product_id}\t{nombre}\t{categoria or ''}\t{precio}")
+    elif args.accion == 'agregar':
+        product_id = product_manager.add_product(args.nombre, args.categoria, args.precio)
+        print(f"Producto agregado con ID {product_id}")
+    elif args.accion == 'actualizar':
+        product = product_manager.get_product(args.id)
+        if product is None:
+            print("Producto no encontrado")
+            return 1
+        product_manager.update_product(args.id,
+                                       args.nombre if args.nombre is not None else product.nombre,
+                                       args.categoria if args.categoria is not None else product.categoria,
+                                       args.precio if args.precio is not None else product.precio)
+        print("Producto actualizado")
+    else:
+        if product_manager.get_product(args.id) is None:
+            print("Producto no encontrado")
+            return 1
+        product_manager.delete_product(args.id)
+        print("Producto eliminado")
+    return 0
+
+
+def run_stock(db, args):
+    from .inventory import InventoryManager
+
+    inventory = InventoryManager(db)
+    if args.accion == 'listar':
+        for insumo_id, nombre, unidad, stock, minimo in (inventory.low_stock() if args.faltantes
+                                                         else inventory.get_items()):
+            print(f"{insumo_id}\t{nombre}\t{stock} {unidad}\tmínimo {minimo}")
+    elif args.accion == 'agregar':
+        insumo_id = inventory.add_item(args.nombre, args.unidad, args.stock, args.minimo, args.producto)
+        print(f"Insumo agregado con ID {insumo_id}")
+    elif args.accion == 'ingresar':
+        print(f"Stock actual: {inventory.receive(args.id, args.cantidad)}")
+    elif args.accion == 'ajustar':
+        inventory.adjust(args.id, args.stock)
+        print("Stock ajustado")
+    elif args.accion == 'receta':
+        if args.insumos:
+            try:
+                ingredientes = [(int(insumo), int(cantidad))
+                                for insumo, _, cantidad in (item.partition(':') for item in args.insumos)]
+            except ValueError:
+                print("Cada insumo se indica como ID:CANTIDAD")
+                return 1
+            inventory.set_recipe(args.producto, ingredientes)
+        for insumo_id, nombre, unidad, cantidad in inventory.get_recipe(args.producto):
+            print(f"{insumo_id}\t{nombre}\t{cantidad} {unidad}")
+    else:
+        for _, fecha, hora, cantidad, stock, motivo in inventory.movements(args.id, limit=args.limite):
+            print(f"{fecha}\t{cantidad:+d}\t{stock}\t{motivo}")
+    return 0
+
+
+def run_orders(db, args):
+    from .managers import SalesManager
+
+    sales_manager = SalesManager(db)
+    if args.accion == 'listar':
+        pedidos = (sales_manager.get_client_orders(args.cliente, limit=args.limite) if args.cliente is not None
+                   else sales_manager.get_open_orders())
+        for pedido_id, cliente_id, dia, hora, estado, total in pedidos:
+            print(f"{pedido_id}\t{dia}\t{cliente_id or ''}\t{estado}\t{total}")
+        return 0
+    try:
+        if args.accion == 'estado':
+            sales_manager.set_order_state(args.id, args.estado)
+        elif args.accion == 'pagar':
+            sales_manager.add_payment(args.id, args.monto, args.metodo)
+    except ValueError as e:
+        print(e)
+        return 1
+    order = sales_manager.get_order(args.id)
+    if order is None:
+        print("Pedido no encontrado")
+        return 1
+    (pedido_id, cliente_id, dia, hora, estado, total), lineas, pagos = order
+    print(f"Pedido {pedido_id} del {dia}, {estado}, total {total}")
+    for _, nombre, cantidad, precio_total in lineas:
+        print(f"{nombre}\t{cantidad}\t{precio_total}")
+    for _, dia, monto, metodo_pago, confirmado in pagos:
+        print(f"Pago {dia}\t{metodo_pago}\t{monto}{'' if confirmado else ' (sin confirmar)'}")
+    return 0
+
+
+def run_closing(db, args):
+    from .managers import SalesManager
+
+    sales_manager = SalesManager(db)
+    dia = args.fecha or today()
+    if args.cerrar:
+        try:
+            closing = sales_manager.close_day(dia)
+        except ValueError as e:
+            print(e)
+            return 1
+    else:
+        closing = sales_manager.get_closing(dia)
+    if closing is None:
+        print(f"Total de ventas del día {dia}: ${sales_manager.get_daily_total(dia)} (caja abierta)")
+        return 0
+    (_, cerrado, _, pedidos, ventas, cantidad, total), productos, pagos = closing
+    print(f"Cierre de caja del {dia} ({cerrado} UTC): {pedidos} pedidos, {ventas} ventas, total ${total}")
+    for _, nombre, ventas, cantidad, total in productos:
+        print(f"{nombre}\t{cantidad}\t{total}")
+    for metodo_pago, cantidad_pagos, total in pagos:
+        print(f"Pagos {metodo_pago}\t{cantidad_pagos}\t{total}")
+    if args.cerrar:
+        moved = sales_manager.archive_sales()
+        if moved:
+            print(f"Ventas pasadas al archivo: {moved}")
+    return 0
+
+
+def run_backup(db, args):
+    from .backup import BackupManager
+
+    backup_manager = BackupManager(db, args.directorio, args.conservar)
+    last = [None]
+
+    def progress(etapa, hechas, total):
+        percent = 100 * hechas // total if total else 100
+        if (etapa, percent // 10) != last[0]:
+            last[0] = (etapa, percent // 10)
+            print(f"{etapa}: {percent}%", flush=True)
+
+    try:
+        result = backup_manager.run(progress)
+    except (ValueError, sqlite3.DatabaseError) as e:
+        print(e)
+        return 1
+    for path in result['archivos']:
+        print(path)
+    print(f"Páginas: {result['paginas']}, comprimido: {result['bytes'] / 1024 / 1024:.1f} MB, "
+          f"copia {result['copia']:.2f} s, verificación {result['verificacion']:.2f} s, "
+          f"compresión {result['compresion']:.2f} s")
+    return 0
+
+
+def run_loyalty(db, args):
+    from .loyalty import LoyaltyManager
+
+    loyalty_manager = LoyaltyManager(db)
+    if args.accion == 'top':
+        for cliente_id, nombre, visitas, gasto, ultima_visita in loyalty_manager.get_top_clients(args.limite, args.por):
+            print(f"{cliente_id}\t{nombre}\t{visitas}\t{gasto}\t{ultima_visita}")
+    elif args.accion == 'inactivos':
+        for cliente_id, nombre, telefono, visitas, gasto, ultima_visita in loyalty_manager.get_churned_clients(
+                args.dias, args.visitas, args.limite):
+            print(f"{cliente_id}\t{nombre}\t{telefono or ''}\t{visitas}\t{gasto}\t{ultima_visita}")
+    else:
+        stats, favorites, orders = loyalty_manager.get_client_summary(args.id)
+        if stats is None:
+            print("El cliente todavía no compró")
+            return 0
+        visitas, gasto, primera_visita, ultima_visita = stats
+        print(f"Visitas: {visitas}, gastado: ${gasto}, desde {primera_visita}, última visita {ultima_visita}")
+        for _, nombre, veces, cantidad, total in favorites:
+            print(f"Preferido\t{nombre}\t{cantidad}\t{total}")
+        for pedido_id, _, dia, _, estado, total in orders:
+            print(f"Pedido {pedido_id}\t{dia}\t{estado}\t{total}")
+    return 0
+
+
+def run_report(db, args):
+    from .reports import ReportManager
+
+    report_manager = ReportManager(db)
+    hoy = today()
+    desde, hasta = args.desde or hoy, args.hasta or hoy
+    print(f"Más vendidos del {desde} al {hasta}:")
+    for puesto, product_id, nombre, cantidad, total in report_manager.top_sellers(desde, hasta, args.top):
+        print(f"{puesto}\t{nombre}\t{cantidad}\t{total}")
+    print("Por categoría:")
+    for categoria, cantidad, total, porcentaje in report_manager.revenue_by_category(desde, hasta):
+        print(f"{categoria}\t{cantidad}\t{total}\t{porcentaje:.1f}%")
+    return 0
+
+
+def run_csv(db, args):
+    from .csv_io import CsvManager
+
+    csv_manager = CsvManager(db)
+    if args.comando.startswith('importar'):
+        import_fn = csv_manager.import_products if args.comando == 'importar-productos' else csv_manager.import_clients
+        total, errors = import_fn(args.archivo)
+        for line, error in errors:
+            print(f"Línea {line}: {error}")
+        print(f"Filas importadas: {total}, con errores: {len(errors)}")
+        return 1 if errors else 0
+    if args.comando == 'exportar-ventas':
+        total = csv_manager.export_sales(args.archivo, args.desde, args.hasta)
+    elif args.comando == 'exportar-productos':
+        total = csv_manager.export_products(args.archivo)
+    else:
+        total = csv_manager.export_clients(args.archivo)
+    print(f"Filas exportadas: {total}")
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.comando in (None, 'gui'):
+        return run_gui(args.db, args.diario, args.servidor)
+
+    db = Database(args.db, profile=bool(args.perfil) or None)
+    try:
+        journal_path = args.diario or os.environ.get('HELADERIA_JOURNAL')
+        if args.comando == 'servidor':
+            return run_server(db, args.direccion, journal_path)
+        if journal_path:
+            # Aplicar las ventas que quedaron en el diario antes de leer la base. Si la interfaz o
+            # el servidor lo tienen abierto, ellos lo descargan: se lee lo que ya está aplicado
+            from .journal import JournalInUse, SalesJournal
+            try:
+                SalesJournal(db, journal_path).close()
+            except JournalInUse as e:
+                print(f"{e}: se omiten las ventas que todavía no pasó a la base")
+        if args.comando == 'cierre':
+            return run_closing(db, args)
+        elif args.comando == 'archivar':
+            from .managers import SalesManager
+            try:
+                moved = SalesManager(db).archive_sales(args.dias)
+            except ValueError as e:
+                print(e)
+                return 1
+            print(f"Ventas pasadas al archivo: {moved}")
+        elif args.comando == 'respaldo':
+            return run_backup(db, args)
+        elif args.comando == 'verificar':
+            problems = db.quick_check(full=args.completo)
+            for problem in problems:
+                print(problem)
+            print("La base está sana" if not problems else f"Problemas encontrados: {len(problems)}")
+            return 1 if problems else 0
+        elif args.comando == 'ventas':
+            from .managers import SalesManager
+            hoy = today()
+            for venta_id, dia, product_id, nombre, cantidad, precio_total in SalesManager(db).iter_sales(
+                    args.desde or hoy, args.hasta or hoy):
+                print(f"{venta_id}\t{dia}\t{product_id}\t{nombre or ''}\t{cantidad}\t{precio_total}")
+        elif args.comando == 'reporte':
+            return run_report(db, args)
+        elif args.comando == 'productos':
+            return run_products(db, args)
+        elif args.comando == 'stock':
+            return run_stock(db, args)
+        elif args.comando == 'pedidos':
+            return run_orders(db, args)
+        elif args.comando == 'clientes':
+            return run_loyalty(db, args)
+        else:
+            return run_csv(db, args)
+        return 0
+    finally:
+        if args.perfil:
+            db.profiler.export(args.perfil)
+        db.close()
@@ -0,0 +1,110 @@
+import csv
+import itertools
+import sqlite3
+
+from .dao import ClientRepository, OrderRepository, ProductRepository
+from .money import Money
+
+CSV_CHUNK_SIZE = 1000  # Filas por transacción al importar / por lectura al exportar
+
+class CsvManager:
+    """Importación y exportación masiva en CSV, por bloques y sin cargar archivos ni tablas enteras en memoria"""
+    def __init__(self, db, catalog=None):
+        self.db = db
+        self.catalog = catalog
+        self.clients = ClientRepository(db)
+        self.products = ProductRepository(db)
+        self.orders = OrderRepository(db)
+
+    def _read_rows(self, path):
+        """Generador de (número de línea, fila) con encabezados normalizados; detecta ',' o ';'"""
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            sample = f.read(4096)
+            f.seek(0)
+            # Del Sniffer sólo se toma el separador: con comillas dobladas ("") adivina mal el
+            # resto y partiría los campos; las comillas siguen la convención de Excel
+            try:
+                delimiter = csv.Sniffer().sniff(sample, delimiters=',;').delimiter
+            except csv.Error:
+                delimiter = ','
+            reader = csv.DictReader(f, dialect=csv.excel, delimiter=delimiter)
+            if reader.fieldnames is None:
+                return
+            reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+            for row in reader:
+                yield reader.line_num, {key: (value or '').strip() for key, value in row.items() if key}
+
+    def _insert_chunks(self, insert_many, rows):
+        """Insertar con insert_many(filas) (executemany) en transacciones de CSV_CHUNK_SIZE filas"""
+        total = 0
+        rows = iter(rows)
+        while True:
+            chunk = list(itertools.islice(rows, CSV_CHUNK_SIZE))
+            if not chunk:
+                return total
+            try:
+                insert_many(chunk)
+                self.db.connection.commit()
+            except sqlite3.Error:
+                self.db.connection.rollback()
+                raise
+            total += len(chunk)
+
+    def import_products(self, path):
+        """Importar productos (columnas nombre, categoria, precio); devuelve (importados, errores)"""
+        errors = []
+
+        def valid_rows():
+            for line, row in self._read_rows(path):
+                try:
+                    precio = Money.parse(row.get('precio', ''))
+                except ValueError:
+                    errors.append((line, "El precio debe ser un número."))
+                    continue
+                if not row.get('nombre'):
+                    errors.append((line, "El campo 'nombre' es obligatorio."))
+                elif precio < 0:
+                    errors.append((line, "El precio no puede ser negativo."))
+                else:
+                    yield row['nombre'], row.get('categoria', ''), precio
+
+        total = self._insert_chunks(self.products.insert_many, valid_rows())
+        if self.catalog is not None:
+            self.catalog.invalidate()
+        return total, errors
+
+    def import_clients(self, path):
+        """Importar clientes (columnas nombre, direccion, telefono); devuelve (importados, errores)"""
+        errors = []
+
+        def valid_rows():
+            for line, row in self._read_rows(path):
+                if not row.get('nombre'):
+                    errors.append((line, "El campo 'nombre' es obligatorio."))
+                else:
+                    yield row['nombre'], row.get('direccion', ''), row.get('telefono', '')
+
+        total = self._insert_chunks(self.clients.insert_many, valid_rows())
+        return total, errors
+
+    def _export(self, path, header, rows):
+        """Escribir las filas de un repositorio (que las lee de a CSV_CHUNK_SIZE) de a bloques"""
+        total = 0
+        with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            while chunk := list(itertools.islice(rows, CSV_CHUNK_SIZE)):
+                writer.writerows(chunk)
+                total += len(chunk)
+        return total
+
+    def export_products(self, path):
+        return self._export(path, ('id', 'nombre', 'categoria', 'precio'), self.products.export(CSV_CHUNK_SIZE))
+
+    def export_clients(self, path):
+        return self._export(path, ('id', 'nombre', 'direccion', 'telefono'), self.clients.export(CSV_CHUNK_SIZE))
+
+    def export_sales(self, path, desde, hasta):
+        """Exportar las ventas entre dos fechas (AAAA-MM-DD, inclusive)"""
+        return self._export(path, ('id', 'fecha', 'producto_id', 'producto', 'cantidad', 'precio_total'),
+                            self.orders.iter_sales(desde, hasta, CSV_CHUNK_SIZE))
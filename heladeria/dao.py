@@ -0,0 +1,703 @@
+"""Acceso a datos: repositorios con sentencias con nombre, un cursor por llamada y filas como registros.
+
+Cada repositorio reúne en SQL las sentencias de una parte de la base, con nombre, y es el
+único lugar donde se escriben: para afinar una consulta frecuente se cambia ahí. Cada
+llamada abre su propio cursor, de una conexión del pool de lectura o de la conexión de
+escritura que se le pasa, así que un mismo repositorio sirve a varios hilos a la vez. Las
+conexiones de Database guardan compiladas las últimas STATEMENT_CACHE sentencias por su
+texto: una sentencia con nombre se prepara una sola vez por conexión.
+
+Las filas salen como registros (namedtuple con __slots__ vacío, sin __dict__ por fila): se
+leen por nombre (cliente.telefono) y se siguen desarmando como tuplas. Los repositorios no
+hacen commit; las transacciones siguen a cargo de los administradores.
+"""
+import collections
+import datetime
+import functools
+import json
+
+from .money import Money
+
+RECORDS = {}  # Nombre -> tipo de registro (remote.py los reconstruye con el mismo tipo)
+
+
+def record(name, fields):
+    """Tipo de registro liviano para las filas de una consulta"""
+    cls = type(name, (collections.namedtuple(name, fields),), {'__slots__': (), '__module__': __name__})
+    RECORDS[name] = cls
+    return cls
+
+
+Cliente = record('Cliente', 'id nombre direccion telefono')
+Producto = record('Producto', 'id nombre categoria precio')
+Pedido = record('Pedido', 'id cliente_id fecha hora estado total')
+LineaPedido = record('LineaPedido', 'producto_id nombre cantidad precio_total')
+Pago = record('Pago', 'id fecha monto metodo_pago confirmado')
+Venta = record('Venta', 'id producto_id cantidad precio_total fecha hora pedido_id')
+VentaDetalle = record('VentaDetalle', 'id fecha producto_id nombre cantidad precio_total')
+Cierre = record('Cierre', 'fecha cerrado hasta_venta pedidos ventas cantidad total')
+CierreProducto = record('CierreProducto', 'producto_id nombre ventas cantidad total')
+CierrePago = record('CierrePago', 'metodo_pago pagos total')
+Insumo = record('Insumo', 'id nombre unidad stock minimo')
+Ingrediente = record('Ingrediente', 'insumo_id nombre unidad cantidad')
+Movimiento = record('Movimiento', 'id fecha hora cantidad stock motivo')
+EstadisticaCliente = record('EstadisticaCliente', 'visitas gasto primera_visita ultima_visita')
+Preferido = record('Preferido', 'producto_id nombre veces cantidad total')
+ClienteDestacado = record('ClienteDestacado', 'cliente_id nombre visitas gasto ultima_visita')
+ClienteInactivo = record('ClienteInactivo', 'cliente_id nombre telefono visitas gasto ultima_visita')
+
+
+@functools.lru_cache(maxsize=None)
+def row_factory(cls):
+    """row_factory de sqlite3 que arma registros cls sin pasar por su __new__"""
+    new = tuple.__new__
+    return lambda cursor, row: new(cls, row)
+
+
+def cursor(connection, cls=None):
+    """Cursor nuevo de connection; con cls, sus filas salen como registros de ese tipo"""
+    cur = connection.cursor()
+    if cls is not None:
+        cur.row_factory = row_factory(cls)
+    return cur
+
+
+def fts_query(text):
+    """Convertir lo que escribe el usuario en una consulta FTS5 por prefijos ('hel cho' -> '"hel"* "cho"*')"""
+    return ' '.join('"{}"*'.format(term.replace('"', '""')) for term in text.split())
+
+
+def table_statements(table, columns):
+    """Sentencias de lectura de una tabla con id y con índice de texto completo ({table}FTS): fila
+    por id, páginas por clave (con y sin búsqueda), conteo, posición y exportación"""
+    fts_columns = ', '.join('t.' + column for column in columns.split(', '))
+    fts = f'{table}FTS f JOIN {table} t ON t.id = f.rowid'
+    return {
+        'get': f'SELECT {columns} FROM {table} WHERE id = ?',
+        'page_after': f'SELECT {columns} FROM {table} WHERE id > ? ORDER BY id LIMIT ?',
+        'page_before': f'SELECT {columns} FROM {table} WHERE id < ? ORDER BY id DESC LIMIT ?',
+        # Con búsqueda se recorre el índice FTS5 en orden de rowid
+        'search_after': f'''
+            SELECT {fts_columns} FROM {fts}
+            WHERE {table}FTS MATCH ? AND f.rowid > ? ORDER BY f.rowid LIMIT ?
+        ''',
+        'search_before': f'''
+            SELECT {fts_columns} FROM {fts}
+            WHERE {table}FTS MATCH ? AND f.rowid < ? ORDER BY f.rowid DESC LIMIT ?
+        ''',
+        # Para contar o buscar posiciones alcanza con el índice, sin leer la tabla
+        'count': f'SELECT COUNT(*) FROM {table}',
+        'search_count': f'SELECT COUNT(*) FROM {table}FTS WHERE {table}FTS MATCH ?',
+        'id_at': f'SELECT id FROM {table} ORDER BY id LIMIT 1 OFFSET ?',
+        'search_id_at': f'SELECT rowid FROM {table}FTS WHERE {table}FTS MATCH ? ORDER BY rowid LIMIT 1 OFFSET ?',
+        'export': f'SELECT {columns} FROM {table} ORDER BY id',
+    }
+
+
+def now():
+    """Fecha y hora (UTC, mismo criterio que DATE('now')) para registrar un pedido"""
+    ahora = datetime.datetime.now(datetime.timezone.utc)
+    return ahora.date().isoformat(), ahora.hour
+
+
+class Repository:
+    SQL = {}
+
+    def __init__(self, db):
+        self.db = db
+
+    def _one(self, name, params=(), cls=None, conn=None):
+        """Primera fila de la sentencia name; sin conn, lee de una conexión del pool"""
+        if conn is not None:
+            return cursor(conn, cls).execute(self.SQL[name], params).fetchone()
+        with self.db.reader() as conn:
+            return cursor(conn, cls).execute(self.SQL[name], params).fetchone()
+
+    def _all(self, name, params=(), cls=None, conn=None):
+        if conn is not None:
+            return cursor(conn, cls).execute(self.SQL[name], params).fetchall()
+        with self.db.reader() as conn:
+            return cursor(conn, cls).execute(self.SQL[name], params).fetchall()
+
+    def _value(self, name, params=(), conn=None):
+        row = self._one(name, params, conn=conn)
+        return row[0] if row else None
+
+    def _iter(self, name, params, cls, chunk_size):
+        """Recorrer el resultado de a chunk_size filas, con la conexión prestada mientras dura"""
+        with self.db.reader() as conn:
+            cur = cursor(conn, cls).execute(self.SQL[name], params)
+            while rows := cur.fetchmany(chunk_size):
+                yield from rows
+
+    def _write(self, name, params=(), conn=None):
+        """Ejecutar una sentencia de escritura sin commit; devuelve el cursor (lastrowid, rowcount)"""
+        return cursor(self.db.connection if conn is None else conn).execute(self.SQL[name], params)
+
+    def _write_many(self, name, rows, conn=None):
+        return cursor(self.db.connection if conn is None else conn).executemany(self.SQL[name], rows)
+
+
+class SearchableRepository(Repository):
+    """Tabla recorrida por páginas de id y buscada por prefijos; su SQL incluye table_statements"""
+    RECORD = None
+
+    def get(self, row_id):
+        return self._one('get', (row_id,), self.RECORD)
+
+    def page(self, after_id, limit, before_id=None, search=None):
+        """Paginación por clave: filas con id > after_id (o las anteriores a before_id), en orden de id"""
+        query = fts_query(search or '')
+        prefix, params = ('search_', (query,)) if query else ('page_', ())
+        if before_id is None:
+            return self._all(prefix + 'after', params + (after_id, limit), self.RECORD)
+        rows = self._all(prefix + 'before', params + (before_id, limit), self.RECORD)
+        rows.reverse()
+        return rows
+
+    def count(self, search=None):
+        query = fts_query(search or '')
+        return self._value('search_count', (query,)) if query else self._value('count')
+
+    def id_at(self, offset, search=None):
+        """Id de la fila en la posición offset (para saltos directos de la barra de desplazamiento)"""
+        query = fts_query(search or '')
+        if query:
+            return self._value('search_id_at', (query, offset))
+        return self._value('id_at', (offset,))
+
+    def export(self, chunk_size):
+        """Todas las filas en orden de id, leídas de a chunk_size"""
+        return self._iter('export', (), None, chunk_size)
+
+
+class ClientRepository(SearchableRepository):
+    RECORD = Cliente
+    SQL = {
+        **table_statements('Clientes', 'id, nombre, direccion, telefono'),
+        'all': 'SELECT id, nombre, direccion, telefono FROM Clientes',
+        'insert': 'INSERT INTO Clientes (nombre, direccion, telefono) VALUES (?, ?, ?)',
+        'update': 'UPDATE Clientes SET nombre=?, direccion=?, telefono=? WHERE id=?',
+        'delete': 'DELETE FROM Clientes WHERE id=?',
+    }
+
+    def all(self):
+        return self._all('all', cls=Cliente)
+
+    def insert(self, nombre, direccion, telefono, conn=None):
+        return self._write('insert', (nombre, direccion, telefono), conn).lastrowid
+
+    def insert_many(self, rows, conn=None):
+        self._write_many('insert', rows, conn)
+
+    def update(self, client_id, nombre, direccion, telefono, conn=None):
+        return self._write('update', (nombre, direccion, telefono, client_id), conn).rowcount
+
+    def delete(self, client_id, conn=None):
+        return self._write('delete', (client_id,), conn).rowcount
+
+
+class ProductRepository(SearchableRepository):
+    RECORD = Producto
+    SQL = {
+        **table_statements('Productos', 'id, nombre, categoria, precio'),
+        'all': 'SELECT id, nombre, categoria, precio FROM Productos',
+        # Una sola sentencia preparada para cualquier cantidad de ids (lista JSON)
+        'prices': 'SELECT id, precio FROM Productos WHERE id IN (SELECT value FROM json_each(?))',
+        'insert': 'INSERT INTO Productos (nombre, categoria, precio) VALUES (?, ?, ?)',
+        'update': 'UPDATE Productos SET nombre=?, categoria=?, precio=? WHERE id=?',
+        'delete': 'DELETE FROM Productos WHERE id=?',
+        'version': 'SELECT version FROM VersionCatalogo WHERE id = 1',
+    }
+
+    def all(self):
+        return self._all('all', cls=Producto)
+
+    def version(self):
+        """Contador que avanza con cada alta, cambio o baja de Productos, desde cualquier proceso"""
+        return self._value('version')
+
+    def prices(self, ids):
+        """{id: precio} de los productos que existen entre ids"""
+        return dict(self._all('prices', (json.dumps(list(ids)),)))
+
+    def insert(self, nombre, categoria, precio, conn=None):
+        return self._write('insert', (nombre, categoria, precio), conn).lastrowid
+
+    def insert_many(self, rows, conn=None):
+        self._write_many('insert', rows, conn)
+
+    def update(self, product_id, nombre, categoria, precio, conn=None):
+        return self._write('update', (nombre, categoria, precio, product_id), conn).rowcount
+
+    def delete(self, product_id, conn=None):
+        return self._write('delete', (product_id,), conn).rowcount
+
+
+class OrderRepository(Repository):
+    """Pedidos con sus líneas (Ventas) y pagos, totales del día y cierres de caja"""
+    SQL = {
+        'insert': 'INSERT INTO Pedidos (cliente_id, fecha, hora, estado, total) VALUES (?, ?, ?, ?, ?)',
+        'insert_line': '''
+            INSERT INTO Ventas (pedido_id, producto_id, cantidad, precio_total, fecha, hora) VALUES (?, ?, ?, ?, ?, ?)
+        ''',
+        'insert_payment': 'INSERT INTO Pagos (pedido_id, fecha, monto, metodo_pago) VALUES (?, ?, ?, ?)',
+        'add_payment': '''
+            INSERT INTO Pagos (pedido_id, fecha, monto, metodo_pago, confirmado)
+            SELECT id, DATE('now'), ?, ?, ? FROM Pedidos WHERE id = ?
+        ''',
+        'mark_paid': '''
+            UPDATE Pedidos SET estado = 'pagado'
+            WHERE id = ? AND estado = 'pendiente'
+              AND total <= (SELECT SUM(monto) FROM Pagos WHERE pedido_id = ? AND confirmado)
+        ''',
+        'set_state': 'UPDATE Pedidos SET estado = ? WHERE id = ?',
+        # Lo que falta cubrir con pagos confirmados (0 o menos: pagado)
+        'balance': '''
+            SELECT estado, total - COALESCE((SELECT SUM(monto) FROM Pagos WHERE pedido_id = :id AND confirmado), 0)
+            FROM Pedidos WHERE id = :id
+        ''',
+        'get': 'SELECT id, cliente_id, fecha, hora, estado, total FROM PedidosTodos WHERE id = ?',
+        'lines': '''
+            SELECT v.producto_id, COALESCE(p.nombre, '(eliminado)'), v.cantidad, v.precio_total
+            FROM VentasTodas v LEFT JOIN Productos p ON p.id = v.producto_id
+            WHERE v.pedido_id = ?
+            ORDER BY v.id
+        ''',
+        'payments': 'SELECT id, fecha, monto, metodo_pago, confirmado FROM PagosTodos WHERE pedido_id = ? ORDER BY id',
+        # Índice idx_pedidos_cliente
+        'client_orders': '''
+            SELECT id, cliente_id, fecha, hora, estado, total FROM PedidosTodos
+            WHERE cliente_id = ? AND id < COALESCE(?, 9223372036854775807)
+            ORDER BY id DESC
+            LIMIT ?
+        ''',
+        # Índice parcial idx_pedidos_abiertos
+        'open_orders': '''
+            SELECT id, cliente_id, fecha, hora, estado, total FROM Pedidos
+            WHERE estado <> 'entregado'
+            ORDER BY id
+        ''',
+        'sales': 'SELECT id, producto_id, cantidad, precio_total, fecha, hora, pedido_id FROM VentasTodas',
+        'count_sales': 'SELECT COUNT(*) FROM Ventas',
+        'sales_between': '''
+            SELECT v.id, v.fecha, v.producto_id, p.nombre, v.cantidad, v.precio_total
+            FROM VentasTodas v LEFT JOIN Productos p ON p.id = v.producto_id
+            WHERE v.fecha BETWEEN ? AND ?
+            ORDER BY v.fecha, v.id
+        ''',
+        'daily_total': "SELECT total FROM VentasDiarias WHERE fecha = COALESCE(?, DATE('now'))",
+        'closed': 'SELECT 1 FROM CierresCaja WHERE fecha = ?',
+        'close_products': '''
+            INSERT INTO CierresCajaProducto (fecha, producto_id, nombre, ventas, cantidad, total)
+            SELECT v.fecha, v.producto_id, COALESCE(p.nombre, '(eliminado)'),
+                   COUNT(*), SUM(v.cantidad), SUM(v.precio_total)
+            FROM VentasTodas v LEFT JOIN Productos p ON p.id = v.producto_id
+            WHERE v.fecha = ?
+            GROUP BY v.producto_id
+        ''',
+        'close_payments': '''
+            INSERT INTO CierresCajaPago (fecha, metodo_pago, pagos, total)
+            SELECT fecha, metodo_pago, COUNT(*), SUM(monto)
+            FROM PagosTodos
+            WHERE fecha = ? AND confirmado
+            GROUP BY metodo_pago
+        ''',
+        'close': '''
+            INSERT INTO CierresCaja (fecha, cerrado, hasta_venta, pedidos, ventas, cantidad, total)
+            SELECT :fecha, STRFTIME('%Y-%m-%d %H:%M:%S', 'now'),
+                   COALESCE((SELECT MAX(id) FROM VentasTodas WHERE fecha = :fecha), 0),
+                   (SELECT COUNT(*) FROM PedidosTodos WHERE fecha = :fecha),
+                   COALESCE(SUM(ventas), 0), COALESCE(SUM(cantidad), 0), COALESCE(SUM(total), 0)
+            FROM CierresCajaProducto WHERE fecha = :fecha
+        ''',
+        'closing': 'SELECT fecha, cerrado, hasta_venta, pedidos, ventas, cantidad, total FROM CierresCaja WHERE fecha = ?',
+        'closing_products': '''
+            SELECT producto_id, nombre, ventas, cantidad, total FROM CierresCajaProducto
+            WHERE fecha = ? ORDER BY total DESC
+        ''',
+        'closing_payments': 'SELECT metodo_pago, pagos, total FROM CierresCajaPago WHERE fecha = ? ORDER BY metodo_pago',
+    }
+
+    def record(self, conn, filas, cliente_id=None, estado='entregado', pagos=(), fecha=None, hora=None):
+        """Insertar un pedido con sus líneas [(producto_id, cantidad, precio_total), ...] y sus pagos
+        [(monto, metodo_pago), ...] dentro de la transacción de quien llama; devuelve el id del pedido"""
+        if fecha is None:
+            fecha, hora = now()
+        total = sum((fila[2] for fila in filas), Money(0))
+        pedido_id = self._write('insert', (cliente_id, fecha, hora, estado, total), conn).lastrowid
+        self._write_many('insert_line', [(pedido_id, product_id, cantidad, precio_total, fecha, hora)
+                                         for product_id, cantidad, precio_total in filas], conn)
+        self._write_many('insert_payment', [(pedido_id, fecha, monto, metodo_pago) for monto, metodo_pago in pagos],
+                         conn)
+        return pedido_id
+
+    def add_payment(self, conn, pedido_id, monto, metodo_pago, confirmado):
+        """Registrar un pago y pasar el pedido a pagado si quedó cubierto; False si no existe el pedido"""
+        if self._write('add_payment', (monto, metodo_pago, int(confirmado), pedido_id), conn).rowcount == 0:
+            return False
+        self._write('mark_paid', (pedido_id, pedido_id), conn)
+        return True
+
+    def set_state(self, pedido_id, estado, conn=None):
+        return self._write('set_state', (estado, pedido_id), conn).rowcount
+
+    def balance(self, pedido_id, conn=None):
+        """(estado, saldo) de un pedido sin archivar, o None si no existe; el saldo es el total
+        menos los pagos confirmados"""
+        row = self._one('balance', {'id': pedido_id}, conn=conn)
+        return None if row is None else (row[0], Money(row[1]))
+
+    def get(self, pedido_id):
+        """(pedido, líneas, pagos) leídos con una sola conexión, o None"""
+        with self.db.reader() as conn:
+            pedido = self._one('get', (pedido_id,), Pedido, conn)
+            if pedido is None:
+                return None
+            return (pedido, self._all('lines', (pedido_id,), LineaPedido, conn),
+                    self._all('payments', (pedido_id,), Pago, conn))
+
+    def client_orders(self, cliente_id, before_id, limit, conn=None):
+        return self._all('client_orders', (cliente_id, before_id, limit), Pedido, conn)
+
+    def open_orders(self):
+        return self._all('open_orders', cls=Pedido)
+
+    def sales(self):
+        return self._all('sales', cls=Venta)
+
+    def count_sales(self):
+        """Ventas en la base principal (sin las archivadas)"""
+        return self._value('count_sales')
+
+    def iter_sales(self, desde, hasta, chunk_size):
+        return self._iter('sales_between', (desde, hasta), VentaDetalle, chunk_size)
+
+    def daily_total(self, fecha=None):
+        return self._value('daily_total', (fecha,))
+
+    def close(self, conn, fecha):
+        """Guardar el cierre de caja de fecha en la transacción de quien llama; False si ya estaba cerrado"""
+        if self._one('closed', (fecha,), conn=conn):
+            return False
+        self._write('close_products', (fecha,), conn)
+        self._write('close_payments', (fecha,), conn)
+        self._write('close', {'fecha': fecha}, conn)
+        return True
+
+    def closing(self, fecha):
+        with self.db.reader() as conn:
+            cierre = self._one('closing', (fecha,), Cierre, conn)
+            if cierre is None:
+                return None
+            return (cierre, self._all('closing_products', (fecha,), CierreProducto, conn),
+                    self._all('closing_payments', (fecha,), CierrePago, conn))
+
+
+class InventoryRepository(Repository):
+    """Insumos, recetas y movimientos de stock"""
+    SQL = {
+        'items': 'SELECT id, nombre, unidad, stock, minimo FROM Insumos ORDER BY nombre',
+        'item': 'SELECT id, nombre, unidad, stock, minimo FROM Insumos WHERE id = ?',
+        # Índice idx_insumos_faltante
+        'low_stock': '''
+            SELECT id, nombre, unidad, stock, minimo FROM Insumos
+            WHERE stock - minimo <= ?
+            ORDER BY stock - minimo
+        ''',
+        'insert': 'INSERT INTO Insumos (nombre, unidad, stock, minimo) VALUES (?, ?, ?, ?)',
+        'update': 'UPDATE Insumos SET nombre = ?, unidad = ?, minimo = ? WHERE id = ?',
+        'delete': 'DELETE FROM Insumos WHERE id = ?',
+        'delete_recipes': 'DELETE FROM Recetas WHERE insumo_id = ?',
+        'delete_movements': 'DELETE FROM MovimientosStock WHERE insumo_id = ?',
+        'add_stock': 'UPDATE Insumos SET stock = stock + ? WHERE id = ? RETURNING nombre, stock',
+        'set_stock': 'UPDATE Insumos SET stock = ? WHERE id = ?',
+        'movement': '''
+            INSERT INTO MovimientosStock (insumo_id, fecha, hora, cantidad, stock, motivo)
+            VALUES (?, COALESCE(?, DATE('now')), COALESCE(?, CAST(strftime('%H', 'now') AS INTEGER)), ?, ?, ?)
+        ''',
+        # La diferencia se calcula antes de actualizar, en la misma transacción
+        'adjust_movement': '''
+            INSERT INTO MovimientosStock (insumo_id, fecha, hora, cantidad, stock, motivo)
+            SELECT id, DATE('now'), CAST(strftime('%H', 'now') AS INTEGER), ? - stock, ?, 'ajuste'
+            FROM Insumos WHERE id = ?
+        ''',
+        'movements': '''
+            SELECT id, fecha, hora, cantidad, stock, motivo FROM MovimientosStock
+            WHERE insumo_id = ? AND id < COALESCE(?, 9223372036854775807)
+            ORDER BY id DESC
+            LIMIT ?
+        ''',
+        'recipe': '''
+            SELECT r.insumo_id, i.nombre, i.unidad, r.cantidad
+            FROM Recetas r JOIN Insumos i ON i.id = r.insumo_id
+            WHERE r.producto_id = ?
+            ORDER BY i.nombre
+        ''',
+        'recipes': '''
+            SELECT producto_id, insumo_id, cantidad FROM Recetas
+            WHERE producto_id IN (SELECT value FROM json_each(?))
+        ''',
+        'insert_recipe': 'INSERT INTO Recetas (producto_id, insumo_id, cantidad) VALUES (?, ?, ?)',
+        'delete_recipe': 'DELETE FROM Recetas WHERE producto_id = ?',
+    }
+
+    def items(self):
+        return self._all('items', cls=Insumo)
+
+    def item(self, insumo_id):
+        return self._one('item', (insumo_id,), Insumo)
+
+    def low_stock(self, margen):
+        return self._all('low_stock', (margen,), Insumo)
+
+    def movements(self, insumo_id, before_id, limit):
+        return self._all('movements', (insumo_id, before_id, limit), Movimiento)
+
+    def recipe(self, producto_id):
+        return self._all('recipe', (producto_id,), Ingrediente)
+
+    def insert(self, conn, nombre, unidad, stock, minimo):
+        return self._write('insert', (nombre, unidad, stock, minimo), conn).lastrowid
+
+    def update(self, conn, insumo_id, nombre, unidad, minimo):
+        return self._write('update', (nombre, unidad, minimo, insumo_id), conn).rowcount
+
+    def delete(self, conn, insumo_id):
+        self._write('delete_recipes', (insumo_id,), conn)
+        self._write('delete_movements', (insumo_id,), conn)
+        self._write('delete', (insumo_id,), conn)
+
+    def add_stock(self, conn, insumo_id, cantidad):
+        """Sumar cantidad (negativa para descontar) con un único UPDATE ... RETURNING;
+        devuelve (nombre, stock resultante) o None si el insumo no existe"""
+        rows = self._write('add_stock', (cantidad, insumo_id), conn).fetchall()
+        return rows[0] if rows else None
+
+    def set_stock(self, conn, insumo_id, stock):
+        """Fijar el stock contado y registrar la diferencia; False si el insumo no existe"""
+        self._write('adjust_movement', (stock, stock, insumo_id), conn)
+        return self._write('set_stock', (stock, insumo_id), conn).rowcount > 0
+
+    def add_movement(self, conn, insumo_id, cantidad, stock, motivo, fecha=None, hora=None):
+        self._write('movement', (insumo_id, fecha, hora, cantidad, stock, motivo), conn)
+
+    def add_recipe(self, conn, producto_id, ingredientes):
+        self._write_many('insert_recipe', [(producto_id, insumo_id, cantidad) for insumo_id, cantidad in ingredientes],
+                         conn)
+
+    def replace_recipe(self, conn, producto_id, ingredientes):
+        self._write('delete_recipe', (producto_id,), conn)
+        self.add_recipe(conn, producto_id, ingredientes)
+
+    def consume(self, conn, items, fecha=None, hora=None, allow_negative=True):
+        """Descontar los insumos de las recetas de un ticket [(producto_id, cantidad), ...].
+
+        Corre dentro de la transacción de quien llama y no hace commit: cada insumo se
+        descuenta con un único UPDATE ... RETURNING, sin leer el stock antes. Si el stock
+        queda negativo y allow_negative es falso, lanza ValueError (quien llama deshace)."""
+        recetas = collections.defaultdict(list)
+        for product_id, insumo_id, cantidad in self._all(
+                'recipes', (json.dumps(list({product_id for product_id, _ in items})),), conn=conn):
+            recetas[product_id].append((insumo_id, cantidad))
+        if not recetas:
+            return
+
+        consumo = collections.Counter()
+        for product_id, cantidad in items:
+            for insumo_id, por_unidad in recetas[product_id]:
+                consumo[insumo_id] += por_unidad * cantidad
+
+        movimientos = []
+        for insumo_id in sorted(consumo):
+            row = self.add_stock(conn, insumo_id, -consumo[insumo_id])
+            if row is None:
+                continue  # Insumo eliminado
+            nombre, stock = row
+            if stock < 0 and not allow_negative:
+                raise ValueError(f"Stock insuficiente de '{nombre}': faltan {-stock}")
+            movimientos.append((insumo_id, fecha, hora, -consumo[insumo_id], stock, 'venta'))
+        self._write_many('movement', movimientos, conn)
+
+
+class LoyaltyRepository(Repository):
+    """EstadisticasCliente y ClienteProducto, que mantienen los triggers de las migraciones 9 y 11"""
+    SQL = {
+        'stats': 'SELECT visitas, gasto, primera_visita, ultima_visita FROM EstadisticasCliente WHERE cliente_id = ?',
+        'favorites': '''
+            SELECT c.producto_id, COALESCE(p.nombre, '(eliminado)'), c.veces, c.cantidad, c.total
+            FROM ClienteProducto c LEFT JOIN Productos p ON p.id = c.producto_id
+            WHERE c.cliente_id = ?
+            ORDER BY c.cantidad DESC, c.veces DESC
+            LIMIT ?
+        ''',
+        # Índices idx_estadisticas_gasto / idx_estadisticas_visitas
+        'top_gasto': '''
+            SELECT e.cliente_id, c.nombre, e.visitas, e.gasto, e.ultima_visita
+            FROM EstadisticasCliente e JOIN Clientes c ON c.id = e.cliente_id
+            ORDER BY e.gasto DESC
+            LIMIT ?
+        ''',
+        'top_visitas': '''
+            SELECT e.cliente_id, c.nombre, e.visitas, e.gasto, e.ultima_visita
+            FROM EstadisticasCliente e JOIN Clientes c ON c.id = e.cliente_id
+            ORDER BY e.visitas DESC
+            LIMIT ?
+        ''',
+        # Índice idx_estadisticas_ultima
+        'churned': '''
+            SELECT e.cliente_id, c.nombre, c.telefono, e.visitas, e.gasto, e.ultima_visita
+            FROM EstadisticasCliente e JOIN Clientes c ON c.id = e.cliente_id
+            WHERE e.ultima_visita < ? AND e.visitas >= ?
+            ORDER BY e.ultima_visita DESC
+            LIMIT ?
+        ''',
+    }
+
+    def stats(self, cliente_id, conn=None):
+        return self._one('stats', (cliente_id,), EstadisticaCliente, conn)
+
+    def favorites(self, cliente_id, limit, conn=None):
+        return self._all('favorites', (cliente_id, limit), Preferido, conn)
+
+    def top(self, orden, limit):
+        return self._all('top_' + orden, (limit,), ClienteDestacado)
+
+    def churned(self, desde, min_visitas, limit):
+        return self._all('churned', (desde, min_visitas, limit), ClienteInactivo)
+
+
+# Filas por día y producto: resúmenes de días cerrados más los días todavía sin resumir
+# (normalmente sólo hoy), que se agregan desde VentasTodas (base y archivo) buscando por fecha en los índices.
+PRODUCT_BASE = '''
+    pendientes AS (
+        SELECT fecha FROM VentasDiarias WHERE fecha BETWEEN :desde AND :hasta
+        EXCEPT
+        SELECT fecha FROM ResumenDias WHERE fecha BETWEEN :desde AND :hasta
+    ),
+    base AS (
+        SELECT fecha, producto_id, ventas, cantidad, total
+        FROM ResumenDiarioProducto WHERE fecha BETWEEN :desde AND :hasta
+        UNION ALL
+        SELECT fecha, producto_id, COUNT(*), SUM(cantidad), SUM(precio_total)
+        FROM VentasTodas WHERE fecha IN (SELECT fecha FROM pendientes)
+        GROUP BY fecha, producto_id
+    )
+'''
+
+HOUR_BASE = '''
+    pendientes AS (
+        SELECT fecha FROM VentasDiarias WHERE fecha BETWEEN :desde AND :hasta
+        EXCEPT
+        SELECT fecha FROM ResumenDias WHERE fecha BETWEEN :desde AND :hasta
+    ),
+    base AS (
+        SELECT fecha, hora, ventas, cantidad, total
+        FROM ResumenDiarioHora WHERE fecha BETWEEN :desde AND :hasta
+        UNION ALL
+        SELECT fecha, COALESCE(hora, -1), COUNT(*), SUM(cantidad), SUM(precio_total)
+        FROM VentasTodas WHERE fecha IN (SELECT fecha FROM pendientes)
+        GROUP BY fecha, COALESCE(hora, -1)
+    )
+'''
+
+
+class ReportRepository(Repository):
+    """Reportes de ventas y los resúmenes por día cerrado (ResumenDiarioProducto / ResumenDiarioHora)"""
+    SQL = {
+        'pending_days': '''
+            SELECT fecha FROM VentasDiarias
+            WHERE fecha BETWEEN ? AND ? AND fecha < ? AND ventas > 0
+              AND fecha NOT IN (SELECT fecha FROM ResumenDias)
+        ''',
+        'summarize_products': '''
+            INSERT INTO ResumenDiarioProducto (fecha, producto_id, ventas, cantidad, total)
+            SELECT fecha, producto_id, COUNT(*), SUM(cantidad), SUM(precio_total)
+            FROM VentasTodas WHERE fecha = ? GROUP BY fecha, producto_id
+        ''',
+        'summarize_hours': '''
+            INSERT INTO ResumenDiarioHora (fecha, hora, ventas, cantidad, total)
+            SELECT fecha, COALESCE(hora, -1), COUNT(*), SUM(cantidad), SUM(precio_total)
+            FROM VentasTodas WHERE fecha = ? GROUP BY fecha, COALESCE(hora, -1)
+        ''',
+        'summarized': 'INSERT OR IGNORE INTO ResumenDias (fecha) VALUES (?)',
+        'revenue_by_product': f'''
+            WITH {PRODUCT_BASE}
+            SELECT b.producto_id, COALESCE(p.nombre, '(eliminado)'), SUM(b.cantidad), SUM(b.total),
+                   100.0 * SUM(b.total) / SUM(SUM(b.total)) OVER (),
+                   RANK() OVER (ORDER BY SUM(b.total) DESC)
+            FROM base b LEFT JOIN Productos p ON p.id = b.producto_id
+            GROUP BY b.producto_id
+            ORDER BY 6, 1
+        ''',
+        'revenue_by_category': f'''
+            WITH {PRODUCT_BASE}
+            SELECT COALESCE(NULLIF(p.categoria, ''), 'Sin categoría') AS categoria,
+                   SUM(b.cantidad), SUM(b.total),
+                   100.0 * SUM(b.total) / SUM(SUM(b.total)) OVER ()
+            FROM base b LEFT JOIN Productos p ON p.id = b.producto_id
+            GROUP BY categoria
+            ORDER BY 3 DESC
+        ''',
+        'top_sellers': f'''
+            WITH {PRODUCT_BASE}
+            SELECT ROW_NUMBER() OVER (ORDER BY SUM(b.cantidad) DESC, SUM(b.total) DESC),
+                   b.producto_id, COALESCE(p.nombre, '(eliminado)'), SUM(b.cantidad), SUM(b.total)
+            FROM base b LEFT JOIN Productos p ON p.id = b.producto_id
+            GROUP BY b.producto_id
+            ORDER BY 1
+            LIMIT :limite
+        ''',
+        'hourly_distribution': f'''
+            WITH {HOUR_BASE}
+            SELECT hora, SUM(ventas), SUM(cantidad), SUM(total),
+                   100.0 * SUM(total) / SUM(SUM(total)) OVER ()
+            FROM base
+            GROUP BY hora
+        ''',
+        'daily_totals': '''
+            SELECT fecha, ventas, total,
+                   SUM(total) OVER (ORDER BY fecha),
+                   CAST(ROUND(AVG(total) OVER (ORDER BY fecha ROWS BETWEEN 6 PRECEDING AND CURRENT ROW)) AS INTEGER)
+            FROM VentasDiarias
+            WHERE fecha BETWEEN :desde AND :hasta AND ventas > 0
+            ORDER BY fecha
+        ''',
+        'compare_periods': f'''
+            WITH {PRODUCT_BASE}
+            SELECT b.producto_id, COALESCE(p.nombre, '(eliminado)'),
+                   SUM(CASE WHEN b.fecha >= :inicio THEN b.total ELSE 0 END) AS actual,
+                   SUM(CASE WHEN b.fecha < :inicio THEN b.total ELSE 0 END) AS anterior
+            FROM base b LEFT JOIN Productos p ON p.id = b.producto_id
+            GROUP BY b.producto_id
+            ORDER BY actual DESC, anterior DESC
+        ''',
+    }
+    # Columnas de cada reporte que son sumas de centavos (SQLite las devuelve como int) -> Money
+    MONEY = {
+        'revenue_by_product': (3,),
+        'revenue_by_category': (2,),
+        'top_sellers': (4,),
+        'hourly_distribution': (3,),
+        'daily_totals': (2, 3, 4),
+        'compare_periods': (2, 3),
+    }
+
+    def pending_days(self, desde, hasta, hoy):
+        """Días anteriores a hoy del rango, con ventas y todavía sin resumir"""
+        return [row[0] for row in self._all('pending_days', (desde, hasta, hoy))]
+
+    def summarize_day(self, conn, fecha):
+        """Resumir un día en la transacción de quien llama; False si ya tenía resumen (otro proceso
+        lo resumió después de leer los pendientes)"""
+        if not self._write('summarized', (fecha,), conn).rowcount:
+            return False
+        self._write('summarize_products', (fecha,), conn)
+        self._write('summarize_hours', (fecha,), conn)
+        return True
+
+    def report(self, name, params):
+        """Filas del reporte name (parámetros con nombre), con los importes como Money"""
+        money = self.MONEY[name]
+        return [tuple(Money(value) if i in money and value is not None else value for i, value in enumerate(row))
+                for row in self._all(name, params)]
@@ -0,0 +1,971 @@
+import datetime
+import os
+import pathlib
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from .money import Money
+from .profiling import Profiler, ProfiledConnection
+
+DEFAULT_DB_PATH = 'heladeria.db'
+PAGE_SIZE = 50
+ORDERS_CHUNK_SIZE = 5000  # Ventas por transacción al pasar el historial a pedidos
+ARCHIVE_AFTER_DAYS = 90   # Los pedidos más viejos que esto pasan a la base de archivo
+ARCHIVE_CHUNK_SIZE = 2000  # Pedidos por transacción al archivar
+BACKUP_PAGES = 256         # Páginas por paso de la copia en línea (1 MB con páginas de 4 KB)
+STATEMENT_CACHE = 256      # Sentencias compiladas que guarda cada conexión (las de los repositorios de dao.py)
+
+# Los importes se declaran "MONEY INTEGER": afinidad entera en SQLite y, al leerlos, Money
+sqlite3.register_converter('MONEY', Money)
+
+
+def rebuild_table(connection, table, definition, select):
+    """Recrear una tabla con otra definición conservando sus filas, índices y triggers
+    (el procedimiento que recomienda SQLite para cambios que ALTER TABLE no admite)"""
+    extras = [row[0] for row in connection.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+        (table,))]
+    sequence = connection.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (table,)).fetchone()
+    connection.execute(f'CREATE TABLE {table}_nueva {definition}')
+    connection.execute(f'INSERT INTO {table}_nueva {select}')
+    connection.execute(f'DROP TABLE {table}')
+    # Sin el modo anterior, RENAME revisa los triggers de otras tablas y falla mientras falta ésta
+    connection.execute('PRAGMA legacy_alter_table=ON')
+    try:
+        connection.execute(f'ALTER TABLE {table}_nueva RENAME TO {table}')
+    finally:
+        connection.execute('PRAGMA legacy_alter_table=OFF')
+    if sequence is not None:
+        # Que AUTOINCREMENT no reutilice ids de filas borradas
+        connection.execute('DELETE FROM sqlite_sequence WHERE name = ?', (table,))
+        connection.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (table, sequence[0]))
+    for sql in extras:
+        connection.execute(sql)
+
+
+def money_to_cents(connection):
+    """Pasar precios y totales de REAL en pesos a INTEGER en centavos"""
+    rebuild_table(connection, 'Productos', '''(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT NOT NULL,
+        categoria TEXT,
+        precio MONEY INTEGER NOT NULL CHECK (typeof(precio) = 'integer')
+    )''', 'SELECT id, nombre, categoria, CAST(ROUND(precio * 100) AS INTEGER) FROM Productos')
+    rebuild_table(connection, 'Ventas', '''(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        producto_id INTEGER NOT NULL,
+        cantidad INTEGER NOT NULL,
+        precio_total MONEY INTEGER NOT NULL CHECK (typeof(precio_total) = 'integer'),
+        fecha TEXT NOT NULL,
+        hora INTEGER,
+        FOREIGN KEY (producto_id) REFERENCES Productos (id)
+    )''', 'SELECT id, producto_id, cantidad, CAST(ROUND(precio_total * 100) AS INTEGER), fecha, hora FROM Ventas')
+    # Los agregados se vuelven a calcular desde los centavos para que coincidan exactamente
+    rebuild_table(connection, 'VentasDiarias', '''(
+        fecha TEXT PRIMARY KEY,
+        ventas INTEGER NOT NULL,
+        cantidad INTEGER NOT NULL,
+        total MONEY INTEGER NOT NULL
+    ) WITHOUT ROWID''', 'SELECT fecha, COUNT(*), SUM(cantidad), SUM(precio_total) FROM Ventas GROUP BY fecha')
+    connection.execute('DELETE FROM ResumenDias')
+    rebuild_table(connection, 'ResumenDiarioProducto', '''(
+        fecha TEXT NOT NULL,
+        producto_id INTEGER NOT NULL,
+        ventas INTEGER NOT NULL,
+        cantidad INTEGER NOT NULL,
+        total MONEY INTEGER NOT NULL,
+        PRIMARY KEY (fecha, producto_id)
+    ) WITHOUT ROWID''', 'SELECT * FROM ResumenDiarioProducto WHERE 0')
+    rebuild_table(connection, 'ResumenDiarioHora', '''(
+        fecha TEXT NOT NULL,
+        hora INTEGER NOT NULL,  -- -1 para ventas anteriores a la migración 3
+        ventas INTEGER NOT NULL,
+        cantidad INTEGER NOT NULL,
+        total MONEY INTEGER NOT NULL,
+        PRIMARY KEY (fecha, hora)
+    ) WITHOUT ROWID''', 'SELECT * FROM ResumenDiarioHora WHERE 0')
+
+
+# Migraciones de esquema en orden. PRAGMA user_version guarda cuántas se aplicaron.
+# Cada paso es una sentencia SQL o una función que recibe la conexión.
+MIGRATIONS = [
+    # 1: índices sobre Ventas y totales diarios mantenidos por triggers
+    (
+        'CREATE INDEX IF NOT EXISTS idx_ventas_fecha_total ON Ventas (fecha, precio_total)',
+        'CREATE INDEX IF NOT EXISTS idx_ventas_producto ON Ventas (producto_id)',
+        '''
+            CREATE TABLE IF NOT EXISTS VentasDiarias (
+                fecha TEXT PRIMARY KEY,
+                ventas INTEGER NOT NULL,
+                cantidad INTEGER NOT NULL,
+                total REAL NOT NULL
+            ) WITHOUT ROWID
+        ''',
+        '''
+            INSERT OR REPLACE INTO VentasDiarias (fecha, ventas, cantidad, total)
+            SELECT fecha, COUNT(*), SUM(cantidad), SUM(precio_total) FROM Ventas GROUP BY fecha
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_ventas_diarias_insert AFTER INSERT ON Ventas
+            BEGIN
+                INSERT INTO VentasDiarias (fecha, ventas, cantidad, total)
+                VALUES (NEW.fecha, 1, NEW.cantidad, NEW.precio_total)
+                ON CONFLICT (fecha) DO UPDATE SET ventas = ventas + 1,
+                                                  cantidad = cantidad + excluded.cantidad,
+                                                  total = total + excluded.total;
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_ventas_diarias_delete AFTER DELETE ON Ventas
+            BEGIN
+                UPDATE VentasDiarias SET ventas = ventas - 1,
+                                         cantidad = cantidad - OLD.cantidad,
+                                         total = total - OLD.precio_total
+                WHERE fecha = OLD.fecha;
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_ventas_diarias_update
+            AFTER UPDATE OF fecha, cantidad, precio_total ON Ventas
+            BEGIN
+                UPDATE VentasDiarias SET ventas = ventas - 1,
+                                         cantidad = cantidad - OLD.cantidad,
+                                         total = total - OLD.precio_total
+                WHERE fecha = OLD.fecha;
+                INSERT INTO VentasDiarias (fecha, ventas, cantidad, total)
+                VALUES (NEW.fecha, 1, NEW.cantidad, NEW.precio_total)
+                ON CONFLICT (fecha) DO UPDATE SET ventas = ventas + 1,
+                                                  cantidad = cantidad + excluded.cantidad,
+                                                  total = total + excluded.total;
+            END
+        ''',
+    ),
+    # 2: búsqueda de texto completo sobre Clientes y Productos
+    (
+        '''
+            CREATE VIRTUAL TABLE IF NOT EXISTS ClientesFTS USING fts5(
+                nombre, direccion, telefono,
+                content='Clientes', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+        ''',
+        '''
+            CREATE VIRTUAL TABLE IF NOT EXISTS ProductosFTS USING fts5(
+                nombre, categoria,
+                content='Productos', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+        ''',
+        "INSERT INTO ClientesFTS (ClientesFTS) VALUES ('rebuild')",
+        "INSERT INTO ProductosFTS (ProductosFTS) VALUES ('rebuild')",
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_clientes_fts_insert AFTER INSERT ON Clientes
+            BEGIN
+                INSERT INTO ClientesFTS (rowid, nombre, direccion, telefono)
+                VALUES (NEW.id, NEW.nombre, NEW.direccion, NEW.telefono);
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_clientes_fts_delete AFTER DELETE ON Clientes
+            BEGIN
+                INSERT INTO ClientesFTS (ClientesFTS, rowid, nombre, direccion, telefono)
+                VALUES ('delete', OLD.id, OLD.nombre, OLD.direccion, OLD.telefono);
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_clientes_fts_update AFTER UPDATE ON Clientes
+            BEGIN
+                INSERT INTO ClientesFTS (ClientesFTS, rowid, nombre, direccion, telefono)
+                VALUES ('delete', OLD.id, OLD.nombre, OLD.direccion, OLD.telefono);
+                INSERT INTO ClientesFTS (rowid, nombre, direccion, telefono)
+                VALUES (NEW.id, NEW.nombre, NEW.direccion, NEW.telefono);
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_productos_fts_insert AFTER INSERT ON Productos
+            BEGIN
+                INSERT INTO ProductosFTS (rowid, nombre, categoria) VALUES (NEW.id, NEW.nombre, NEW.categoria);
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_productos_fts_delete AFTER DELETE ON Productos
+            BEGIN
+                INSERT INTO ProductosFTS (ProductosFTS, rowid, nombre, categoria)
+                VALUES ('delete', OLD.id, OLD.nombre, OLD.categoria);
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_productos_fts_update AFTER UPDATE ON Productos
+            BEGIN
+                INSERT INTO ProductosFTS (ProductosFTS, rowid, nombre, categoria)
+                VALUES ('delete', OLD.id, OLD.nombre, OLD.categoria);
+                INSERT INTO ProductosFTS (rowid, nombre, categoria) VALUES (NEW.id, NEW.nombre, NEW.categoria);
+            END
+        ''',
+    ),
+    # 3: hora de cada venta y resúmenes por día cerrado para los reportes
+    (
+        'ALTER TABLE Ventas ADD COLUMN hora INTEGER',
+        'CREATE TABLE IF NOT EXISTS ResumenDias (fecha TEXT PRIMARY KEY) WITHOUT ROWID',
+        '''
+            CREATE TABLE IF NOT EXISTS ResumenDiarioProducto (
+                fecha TEXT NOT NULL,
+                producto_id INTEGER NOT NULL,
+                ventas INTEGER NOT NULL,
+                cantidad INTEGER NOT NULL,
+                total REAL NOT NULL,
+                PRIMARY KEY (fecha, producto_id)
+            ) WITHOUT ROWID
+        ''',
+        '''
+            CREATE TABLE IF NOT EXISTS ResumenDiarioHora (
+                fecha TEXT NOT NULL,
+                hora INTEGER NOT NULL,  -- -1 para ventas anteriores a esta migración
+                ventas INTEGER NOT NULL,
+                cantidad INTEGER NOT NULL,
+                total REAL NOT NULL,
+                PRIMARY KEY (fecha, hora)
+            ) WITHOUT ROWID
+        ''',
+        # Si cambia una venta de un día ya resumido, el resumen de ese día se descarta
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_resumen_insert AFTER INSERT ON Ventas
+            WHEN EXISTS (SELECT 1 FROM ResumenDias WHERE fecha = NEW.fecha)
+            BEGIN
+                DELETE FROM ResumenDias WHERE fecha = NEW.fecha;
+                DELETE FROM ResumenDiarioProducto WHERE fecha = NEW.fecha;
+                DELETE FROM ResumenDiarioHora WHERE fecha = NEW.fecha;
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_resumen_delete AFTER DELETE ON Ventas
+            WHEN EXISTS (SELECT 1 FROM ResumenDias WHERE fecha = OLD.fecha)
+            BEGIN
+                DELETE FROM ResumenDias WHERE fecha = OLD.fecha;
+                DELETE FROM ResumenDiarioProducto WHERE fecha = OLD.fecha;
+                DELETE FROM ResumenDiarioHora WHERE fecha = OLD.fecha;
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_resumen_update AFTER UPDATE ON Ventas
+            WHEN EXISTS (SELECT 1 FROM ResumenDias WHERE fecha IN (OLD.fecha, NEW.fecha))
+            BEGIN
+                DELETE FROM ResumenDias WHERE fecha IN (OLD.fecha, NEW.fecha);
+                DELETE FROM ResumenDiarioProducto WHERE fecha IN (OLD.fecha, NEW.fecha);
+                DELETE FROM ResumenDiarioHora WHERE fecha IN (OLD.fecha, NEW.fecha);
+            END
+        ''',
+    ),
+    # 4: última entrada aplicada de cada diario de ventas (modo de escritura diferida)
+    (
+        '''
+            CREATE TABLE IF NOT EXISTS DiariosAplicados (
+                diario TEXT PRIMARY KEY,
+                secuencia INTEGER NOT NULL
+            ) WITHOUT ROWID
+        ''',
+    ),
+    # 5: importes en centavos enteros
+    (
+        money_to_cents,
+    ),
+    # 6: inventario de insumos, recetas por producto e historial de movimientos
+    (
+        '''
+            CREATE TABLE IF NOT EXISTS Insumos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT NOT NULL UNIQUE,
+                unidad TEXT NOT NULL DEFAULT 'unidad',
+                stock INTEGER NOT NULL DEFAULT 0,
+                minimo INTEGER NOT NULL DEFAULT 0
+            )
+        ''',
+        # Faltantes (stock - minimo <= 0) ordenados por urgencia, sin recorrer la tabla
+        'CREATE INDEX IF NOT EXISTS idx_insumos_faltante ON Insumos (stock - minimo)',
+        '''
+            CREATE TABLE IF NOT EXISTS Recetas (
+                producto_id INTEGER NOT NULL,
+                insumo_id INTEGER NOT NULL,
+                cantidad INTEGER NOT NULL CHECK (cantidad > 0),
+                PRIMARY KEY (producto_id, insumo_id)
+            ) WITHOUT ROWID
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_recetas_insumo ON Recetas (insumo_id)',
+        '''
+            CREATE TABLE IF NOT EXISTS MovimientosStock (
+                id INTEGER PRIMARY KEY,
+                insumo_id INTEGER NOT NULL,
+                fecha TEXT NOT NULL,
+                hora INTEGER,
+                cantidad INTEGER NOT NULL,  -- positiva al ingresar, negativa al consumir
+                stock INTEGER NOT NULL,     -- stock resultante
+                motivo TEXT NOT NULL
+            )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_movimientos_insumo ON MovimientosStock (insumo_id, id)',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_recetas_producto_delete AFTER DELETE ON Productos
+            BEGIN
+                DELETE FROM Recetas WHERE producto_id = OLD.id;
+            END
+        ''',
+    ),
+    # 7: pedidos con estado y cliente, cuyas líneas son las filas de Ventas, y sus pagos
+    (
+        '''
+            CREATE TABLE IF NOT EXISTS Pedidos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                cliente_id INTEGER,  -- NULL para ventas de mostrador sin cliente
+                fecha TEXT NOT NULL,
+                hora INTEGER,
+                estado TEXT NOT NULL DEFAULT 'pendiente' CHECK (estado IN ('pendiente', 'pagado', 'entregado')),
+                total MONEY INTEGER NOT NULL,
+                FOREIGN KEY (cliente_id) REFERENCES Clientes (id)
+            )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_pedidos_cliente ON Pedidos (cliente_id, id)',
+        "CREATE INDEX IF NOT EXISTS idx_pedidos_abiertos ON Pedidos (id) WHERE estado <> 'entregado'",
+        '''
+            CREATE TABLE IF NOT EXISTS Pagos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                pedido_id INTEGER NOT NULL,
+                fecha TEXT NOT NULL,
+                monto MONEY INTEGER NOT NULL CHECK (typeof(monto) = 'integer'),
+                metodo_pago TEXT NOT NULL,
+                confirmado INTEGER NOT NULL DEFAULT 1 CHECK (confirmado IN (0, 1)),
+                FOREIGN KEY (pedido_id) REFERENCES Pedidos (id)
+            )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_pagos_pedido ON Pagos (pedido_id)',
+        'ALTER TABLE Ventas ADD COLUMN pedido_id INTEGER REFERENCES Pedidos (id)',
+        'CREATE INDEX IF NOT EXISTS idx_ventas_pedido ON Ventas (pedido_id)',
+        # Asignar el pedido a una venta no cambia los resúmenes del día
+        'DROP TRIGGER IF EXISTS trg_resumen_update',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_resumen_update
+            AFTER UPDATE OF producto_id, cantidad, precio_total, fecha, hora ON Ventas
+            WHEN EXISTS (SELECT 1 FROM ResumenDias WHERE fecha IN (OLD.fecha, NEW.fecha))
+            BEGIN
+                DELETE FROM ResumenDias WHERE fecha IN (OLD.fecha, NEW.fecha);
+                DELETE FROM ResumenDiarioProducto WHERE fecha IN (OLD.fecha, NEW.fecha);
+                DELETE FROM ResumenDiarioHora WHERE fecha IN (OLD.fecha, NEW.fecha);
+            END
+        ''',
+    ),
+    # 8: cierres de caja inmutables y días cuyas ventas pasaron a la base de archivo
+    (
+        '''
+            CREATE TABLE IF NOT EXISTS CierresCaja (
+                fecha TEXT PRIMARY KEY,
+                cerrado TEXT NOT NULL,          -- Fecha y hora (UTC) del cierre
+                hasta_venta INTEGER NOT NULL,   -- Última venta registrada al cerrar
+                pedidos INTEGER NOT NULL,
+                ventas INTEGER NOT NULL,
+                cantidad INTEGER NOT NULL,
+                total MONEY INTEGER NOT NULL
+            ) WITHOUT ROWID
+        ''',
+        '''
+            CREATE TABLE IF NOT EXISTS CierresCajaProducto (
+                fecha TEXT NOT NULL,
+                producto_id INTEGER NOT NULL,
+                nombre TEXT NOT NULL,           -- Nombre al cerrar: el producto puede cambiar o borrarse
+                ventas INTEGER NOT NULL,
+                cantidad INTEGER NOT NULL,
+                total MONEY INTEGER NOT NULL,
+                PRIMARY KEY (fecha, producto_id)
+            ) WITHOUT ROWID
+        ''',
+        '''
+            CREATE TABLE IF NOT EXISTS CierresCajaPago (
+                fecha TEXT NOT NULL,
+                metodo_pago TEXT NOT NULL,
+                pagos INTEGER NOT NULL,
+                total MONEY INTEGER NOT NULL,
+                PRIMARY KEY (fecha, metodo_pago)
+            ) WITHOUT ROWID
+        ''',
+        *(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{tabla.lower()}_{accion.lower()} BEFORE {accion} ON {tabla}
+            BEGIN
+                SELECT RAISE(ABORT, 'Un cierre de caja no se modifica');
+            END
+        ''' for tabla in ('CierresCaja', 'CierresCajaProducto', 'CierresCajaPago') for accion in ('UPDATE', 'DELETE')),
+        'CREATE TABLE IF NOT EXISTS DiasArchivados (fecha TEXT PRIMARY KEY) WITHOUT ROWID',
+        # Pasar una venta al archivo no la quita de los totales ni de los resúmenes del día
+        'DROP TRIGGER IF EXISTS trg_ventas_diarias_delete',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_ventas_diarias_delete AFTER DELETE ON Ventas
+            WHEN NOT EXISTS (SELECT 1 FROM DiasArchivados WHERE fecha = OLD.fecha)
+            BEGIN
+                UPDATE VentasDiarias SET ventas = ventas - 1,
+                                         cantidad = cantidad - OLD.cantidad,
+                                         total = total - OLD.precio_total
+                WHERE fecha = OLD.fecha;
+            END
+        ''',
+        'DROP TRIGGER IF EXISTS trg_resumen_delete',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_resumen_delete AFTER DELETE ON Ventas
+            WHEN EXISTS (SELECT 1 FROM ResumenDias WHERE fecha = OLD.fecha)
+             AND NOT EXISTS (SELECT 1 FROM DiasArchivados WHERE fecha = OLD.fecha)
+            BEGIN
+                DELETE FROM ResumenDias WHERE fecha = OLD.fecha;
+                DELETE FROM ResumenDiarioProducto WHERE fecha = OLD.fecha;
+                DELETE FROM ResumenDiarioHora WHERE fecha = OLD.fecha;
+            END
+        ''',
+    ),
+    # 9: estadísticas por cliente (visitas, gasto, productos preferidos), al día con cada pedido.
+    # Son históricas: pasar pedidos al archivo no las cambia
+    (
+        '''
+            CREATE TABLE IF NOT EXISTS EstadisticasCliente (
+                cliente_id INTEGER PRIMARY KEY,
+                visitas INTEGER NOT NULL,
+                gasto MONEY INTEGER NOT NULL,
+                primera_visita TEXT NOT NULL,
+                ultima_visita TEXT NOT NULL
+            )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_estadisticas_gasto ON EstadisticasCliente (gasto DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_estadisticas_visitas ON EstadisticasCliente (visitas DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_estadisticas_ultima ON EstadisticasCliente (ultima_visita)',
+        '''
+            CREATE TABLE IF NOT EXISTS ClienteProducto (
+                cliente_id INTEGER NOT NULL,
+                producto_id INTEGER NOT NULL,
+                veces INTEGER NOT NULL,
+                cantidad INTEGER NOT NULL,
+                total MONEY INTEGER NOT NULL,
+                PRIMARY KEY (cliente_id, producto_id)
+            ) WITHOUT ROWID
+        ''',
+        # Historial anterior (base y archivo, por las vistas temporales); de acá en más, los triggers
+        '''
+            INSERT INTO EstadisticasCliente (cliente_id, visitas, gasto, primera_visita, ultima_visita)
+            SELECT cliente_id, COUNT(*), SUM(total), MIN(fecha), MAX(fecha) FROM PedidosTodos
+            WHERE cliente_id IN (SELECT id FROM Clientes)
+            GROUP BY cliente_id
+        ''',
+        '''
+            INSERT INTO ClienteProducto (cliente_id, producto_id, veces, cantidad, total)
+            SELECT p.cliente_id, v.producto_id, COUNT(*), SUM(v.cantidad), SUM(v.precio_total)
+            FROM PedidosTodos p JOIN VentasTodas v ON v.pedido_id = p.id
+            WHERE p.cliente_id IN (SELECT id FROM Clientes)
+            GROUP BY p.cliente_id, v.producto_id
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_estadisticas_cliente_insert AFTER INSERT ON Pedidos
+            WHEN NEW.cliente_id IS NOT NULL
+            BEGIN
+                INSERT INTO EstadisticasCliente (cliente_id, visitas, gasto, primera_visita, ultima_visita)
+                VALUES (NEW.cliente_id, 1, NEW.total, NEW.fecha, NEW.fecha)
+                ON CONFLICT (cliente_id) DO UPDATE SET visitas = visitas + 1,
+                                                       gasto = gasto + excluded.gasto,
+                                                       primera_visita = MIN(primera_visita, excluded.primera_visita),
+                                                       ultima_visita = MAX(ultima_visita, excluded.ultima_visita);
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_cliente_producto_insert AFTER INSERT ON Ventas
+            WHEN NEW.pedido_id IS NOT NULL
+            BEGIN
+                INSERT INTO ClienteProducto (cliente_id, producto_id, veces, cantidad, total)
+                SELECT cliente_id, NEW.producto_id, 1, NEW.cantidad, NEW.precio_total
+                FROM Pedidos WHERE id = NEW.pedido_id AND cliente_id IS NOT NULL
+                ON CONFLICT (cliente_id, producto_id) DO UPDATE SET veces = veces + 1,
+                                                                    cantidad = cantidad + excluded.cantidad,
+                                                                    total = total + excluded.total;
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_estadisticas_cliente_delete AFTER DELETE ON Clientes
+            BEGIN
+                DELETE FROM EstadisticasCliente WHERE cliente_id = OLD.id;
+                DELETE FROM ClienteProducto WHERE cliente_id = OLD.id;
+            END
+        ''',
+    ),
+    # 10: versión del catálogo, avanzada por triggers con cualquier cambio en Productos, para
+    # que los catálogos en memoria de otros procesos (servidor, interfaz) noten los cambios
+    (
+        '''
+            CREATE TABLE IF NOT EXISTS VersionCatalogo (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+        ''',
+        'INSERT OR IGNORE INTO VersionCatalogo (id, version) VALUES (1, 0)',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_version_catalogo_insert AFTER INSERT ON Productos
+            BEGIN
+                UPDATE VersionCatalogo SET version = version + 1 WHERE id = 1;
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_version_catalogo_update AFTER UPDATE ON Productos
+            BEGIN
+                UPDATE VersionCatalogo SET version = version + 1 WHERE id = 1;
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_version_catalogo_delete AFTER DELETE ON Productos
+            BEGIN
+                UPDATE VersionCatalogo SET version = version + 1 WHERE id = 1;
+            END
+        ''',
+    ),
+    # 11: las estadísticas por cliente cuentan sólo pedidos pagados o entregados: uno pendiente
+    # no es todavía una visita ni un gasto, y suma recién cuando pasa a pagado. Cambiar el cliente,
+    # el total o el estado de un pedido mueve su aporte. Se rehacen desde el historial completo
+    (
+        'DROP TRIGGER IF EXISTS trg_estadisticas_cliente_insert',
+        'DROP TRIGGER IF EXISTS trg_cliente_producto_insert',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_estadisticas_cliente_insert AFTER INSERT ON Pedidos
+            WHEN NEW.cliente_id IS NOT NULL AND NEW.estado <> 'pendiente'
+            BEGIN
+                INSERT INTO EstadisticasCliente (cliente_id, visitas, gasto, primera_visita, ultima_visita)
+                VALUES (NEW.cliente_id, 1, NEW.total, NEW.fecha, NEW.fecha)
+                ON CONFLICT (cliente_id) DO UPDATE SET visitas = visitas + 1,
+                                                       gasto = gasto + excluded.gasto,
+                                                       primera_visita = MIN(primera_visita, excluded.primera_visita),
+                                                       ultima_visita = MAX(ultima_visita, excluded.ultima_visita);
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_cliente_producto_insert AFTER INSERT ON Ventas
+            WHEN NEW.pedido_id IS NOT NULL
+            BEGIN
+                INSERT INTO ClienteProducto (cliente_id, producto_id, veces, cantidad, total)
+                SELECT cliente_id, NEW.producto_id, 1, NEW.cantidad, NEW.precio_total
+                FROM Pedidos WHERE id = NEW.pedido_id AND cliente_id IS NOT NULL AND estado <> 'pendiente'
+                ON CONFLICT (cliente_id, producto_id) DO UPDATE SET veces = veces + 1,
+                                                                    cantidad = cantidad + excluded.cantidad,
+                                                                    total = total + excluded.total;
+            END
+        ''',
+        # Primero se quita el aporte anterior (si contaba) y después se suma el nuevo (si cuenta).
+        # Las fechas de visita se recalculan con los pedidos de la base principal: los archivados
+        # son de días anteriores, así que sólo quedaría vieja una última visita cuyo cliente no
+        # tenga otro pedido fuera del archivo
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_estadisticas_cliente_update
+            AFTER UPDATE OF cliente_id, total, estado ON Pedidos
+            WHEN OLD.cliente_id IS NOT NEW.cliente_id OR OLD.total IS NOT NEW.total
+              OR (OLD.estado = 'pendiente') <> (NEW.estado = 'pendiente')
+            BEGIN
+                UPDATE EstadisticasCliente
+                SET visitas = visitas - 1,
+                    gasto = gasto - OLD.total,
+                    primera_visita = CASE WHEN primera_visita = OLD.fecha THEN COALESCE(
+                        (SELECT MIN(fecha) FROM Pedidos WHERE cliente_id = OLD.cliente_id AND estado <> 'pendiente'),
+                        primera_visita) ELSE primera_visita END,
+                    ultima_visita = CASE WHEN ultima_visita = OLD.fecha THEN COALESCE(
+                        (SELECT MAX(fecha) FROM Pedidos WHERE cliente_id = OLD.cliente_id AND estado <> 'pendiente'),
+                        ultima_visita) ELSE ultima_visita END
+                WHERE cliente_id = OLD.cliente_id AND OLD.estado <> 'pendiente';
+                DELETE FROM EstadisticasCliente WHERE cliente_id = OLD.cliente_id AND visitas <= 0;
+
+                UPDATE ClienteProducto
+                SET veces = veces - (SELECT COUNT(*) FROM Ventas v
+                                     WHERE v.pedido_id = OLD.id AND v.producto_id = ClienteProducto.producto_id),
+                    cantidad = cantidad - (SELECT SUM(v.cantidad) FROM Ventas v
+                                           WHERE v.pedido_id = OLD.id AND v.producto_id = ClienteProducto.producto_id),
+                    total = total - (SELECT SUM(v.precio_total) FROM Ventas v
+                                     WHERE v.pedido_id = OLD.id AND v.producto_id = ClienteProducto.producto_id)
+                WHERE cliente_id = OLD.cliente_id AND OLD.estado <> 'pendiente'
+                  AND producto_id IN (SELECT producto_id FROM Ventas WHERE pedido_id = OLD.id);
+                DELETE FROM ClienteProducto WHERE cliente_id = OLD.cliente_id AND veces <= 0;
+
+                INSERT INTO EstadisticasCliente (cliente_id, visitas, gasto, primera_visita, ultima_visita)
+                SELECT NEW.cliente_id, 1, NEW.total, NEW.fecha, NEW.fecha
+                WHERE NEW.cliente_id IS NOT NULL AND NEW.estado <> 'pendiente'
+                ON CONFLICT (cliente_id) DO UPDATE SET visitas = visitas + 1,
+                                                       gasto = gasto + excluded.gasto,
+                                                       primera_visita = MIN(primera_visita, excluded.primera_visita),
+                                                       ultima_visita = MAX(ultima_visita, excluded.ultima_visita);
+                INSERT INTO ClienteProducto (cliente_id, producto_id, veces, cantidad, total)
+                SELECT NEW.cliente_id, producto_id, COUNT(*), SUM(cantidad), SUM(precio_total) FROM Ventas
+                WHERE pedido_id = NEW.id AND NEW.cliente_id IS NOT NULL AND NEW.estado <> 'pendiente'
+                GROUP BY producto_id
+                ON CONFLICT (cliente_id, producto_id) DO UPDATE SET veces = veces + excluded.veces,
+                                                                    cantidad = cantidad + excluded.cantidad,
+                                                                    total = total + excluded.total;
+            END
+        ''',
+        'DELETE FROM EstadisticasCliente',
+        'DELETE FROM ClienteProducto',
+        '''
+            INSERT INTO EstadisticasCliente (cliente_id, visitas, gasto, primera_visita, ultima_visita)
+            SELECT cliente_id, COUNT(*), SUM(total), MIN(fecha), MAX(fecha) FROM PedidosTodos
+            WHERE cliente_id IN (SELECT id FROM Clientes) AND estado <> 'pendiente'
+            GROUP BY cliente_id
+        ''',
+        '''
+            INSERT INTO ClienteProducto (cliente_id, producto_id, veces, cantidad, total)
+            SELECT p.cliente_id, v.producto_id, COUNT(*), SUM(v.cantidad), SUM(v.precio_total)
+            FROM PedidosTodos p JOIN VentasTodas v ON v.pedido_id = p.id
+            WHERE p.cliente_id IN (SELECT id FROM Clientes) AND p.estado <> 'pendiente'
+            GROUP BY p.cliente_id, v.producto_id
+        ''',
+    ),
+]
+
+# Base de archivo (adjunta como "archivo"): ventas, pedidos y pagos viejos, con las mismas columnas
+ARCHIVE_SCHEMA = (
+    '''
+        CREATE TABLE IF NOT EXISTS archivo.Pedidos (
+            id INTEGER PRIMARY KEY,
+            cliente_id INTEGER,
+            fecha TEXT NOT NULL,
+            hora INTEGER,
+            estado TEXT NOT NULL,
+            total MONEY INTEGER NOT NULL
+        )
+    ''',
+    'CREATE INDEX IF NOT EXISTS archivo.idx_pedidos_cliente ON Pedidos (cliente_id, id)',
+    '''
+        CREATE TABLE IF NOT EXISTS archivo.Ventas (
+            id INTEGER PRIMARY KEY,
+            producto_id INTEGER NOT NULL,
+            cantidad INTEGER NOT NULL,
+            precio_total MONEY INTEGER NOT NULL,
+            fecha TEXT NOT NULL,
+            hora INTEGER,
+            pedido_id INTEGER
+        )
+    ''',
+    'CREATE INDEX IF NOT EXISTS archivo.idx_ventas_fecha ON Ventas (fecha)',
+    'CREATE INDEX IF NOT EXISTS archivo.idx_ventas_pedido ON Ventas (pedido_id)',
+    '''
+        CREATE TABLE IF NOT EXISTS archivo.Pagos (
+            id INTEGER PRIMARY KEY,
+            pedido_id INTEGER NOT NULL,
+            fecha TEXT NOT NULL,
+            monto MONEY INTEGER NOT NULL,
+            metodo_pago TEXT NOT NULL,
+            confirmado INTEGER NOT NULL
+        )
+    ''',
+    'CREATE INDEX IF NOT EXISTS archivo.idx_pagos_pedido ON Pagos (pedido_id)',
+)
+# Vista temporal (por conexión) -> tabla y columnas; las vistas suman la base y el archivo
+ARCHIVE_VIEWS = {
+    'VentasTodas': ('Ventas', 'id, producto_id, cantidad, precio_total, fecha, hora, pedido_id'),
+    'PedidosTodos': ('Pedidos', 'id, cliente_id, fecha, hora, estado, total'),
+    'PagosTodos': ('Pagos', 'id, pedido_id, fecha, monto, metodo_pago, confirmado'),
+}
+
+def today():
+    """Fecha de hoy con el mismo criterio que DATE('now') de SQLite (UTC)"""
+    return datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+
+class Database:
+    # Ajustes aplicados a cada conexión (escritura y lectura)
+    PRAGMAS = (
+        ('synchronous', 'NORMAL'),   # Seguro en modo WAL y sin fsync por cada commit
+        ('cache_size', -16000),      # 16 MB de caché de páginas
+        ('mmap_size', 67108864),     # 64 MB mapeados en memoria
+        ('temp_store', 'MEMORY'),
+        ('busy_timeout', 5000),
+    )
+    READ_POOL_SIZE = 4
+
+    def __init__(self, path=None, read_pool_size=READ_POOL_SIZE, profile=None, archive_path=None, archive_days=None):
+        self.path = path or os.environ.get('HELADERIA_DB', DEFAULT_DB_PATH)
+        # Base de archivo junto a la principal (heladeria.db -> heladeria-archivo.db); en memoria no hay
+        if self.path == ':memory:':
+            self.archive_path = None
+        else:
+            self.archive_path = archive_path or os.path.splitext(self.path)[0] + '-archivo.db'
+        if archive_days is None:
+            archive_days = int(os.environ.get('HELADERIA_ARCHIVE_DAYS', ARCHIVE_AFTER_DAYS))
+        self.archive_days = archive_days
+        if profile is None:
+            profile = os.environ.get('HELADERIA_PROFILE', '') not in ('', '0')
+        self.profiler = Profiler(enabled=profile)
+
+        # Única conexión de escritura (la usa el hilo de DatabaseWorker en la interfaz)
+        self.connection = sqlite3.connect(self.path, check_same_thread=False,
+                                          detect_types=sqlite3.PARSE_DECLTYPES, factory=ProfiledConnection,
+                                          cached_statements=STATEMENT_CACHE)
+        self.connection.profiler = self.profiler
+        if self.path != ':memory:':
+            self.connection.execute('PRAGMA journal_mode=WAL')
+        self.configure(self.connection)
+        # Antes de las migraciones: las que recorren el historial leen también el archivo
+        self.attach_archive(self.connection, create=True)
+        self.create_tables()
+        self.backfill_orders()
+
+        # Pool de conexiones de solo lectura (se crean a demanda)
+        self._readers = queue.LifoQueue()
+        self._readers_lock = threading.Lock()
+        self._readers_created = 0
+        self._read_pool_size = read_pool_size
+
+    def set_profiling(self, enabled):
+        """Encender o apagar el perfilado; llamar desde el hilo que escribe (DatabaseWorker en la interfaz)"""
+        self.profiler.enabled = enabled
+
+    def open_writer(self):
+        """Conexión de escritura adicional para un hilo con sus propias transacciones"""
+        if self.path == ':memory:':
+            raise ValueError("Una base en memoria no admite otra conexión de escritura")
+        connection = sqlite3.connect(self.path, check_same_thread=False,
+                                     detect_types=sqlite3.PARSE_DECLTYPES, factory=ProfiledConnection,
+                                     cached_statements=STATEMENT_CACHE)
+        connection.profiler = self.profiler
+        self.configure(connection)
+        self.attach_archive(connection)
+        return connection
+
+    def configure(self, connection):
+        for name, value in self.PRAGMAS:
+            connection.execute(f'PRAGMA {name}={value}')
+
+    def attach_archive(self, connection, create=False, read_only=False):
+        """Adjuntar la base de archivo y crear las vistas temporales VentasTodas, PedidosTodos y
+        PagosTodos, que leen las dos bases. Una fila copiada al archivo que todavía no se borró de
+        la base principal (ver archive_before) se cuenta una sola vez."""
+        if self.archive_path is not None:
+            if read_only:
+                target = pathlib.Path(self.archive_path).resolve().as_uri() + '?mode=ro'
+            else:
+                target = self.archive_path
+            connection.execute('ATTACH DATABASE ? AS archivo', (target,))
+            if create:
+                connection.execute('PRAGMA archivo.journal_mode=WAL')
+                for sql in ARCHIVE_SCHEMA:
+                    connection.execute(sql)
+                connection.commit()
+        for view, (table, columns) in ARCHIVE_VIEWS.items():
+            sql = f'CREATE TEMP VIEW IF NOT EXISTS {view} AS SELECT {columns} FROM main.{table}'
+            if self.archive_path is not None:
+                sql += f'''
+                    UNION ALL
+                    SELECT {columns} FROM archivo.{table} a
+                    WHERE NOT EXISTS (SELECT 1 FROM main.{table} m WHERE m.id = a.id)
+                '''
+            connection.execute(sql)
+
+    def _open_reader(self):
+        uri = pathlib.Path(self.path).resolve().as_uri() + '?mode=ro'
+        connection = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                                     detect_types=sqlite3.PARSE_DECLTYPES, factory=ProfiledConnection,
+                                     cached_statements=STATEMENT_CACHE)
+        connection.profiler = self.profiler
+        self.configure(connection)
+        self.attach_archive(connection, read_only=True)
+        return connection
+
+    @contextmanager
+    def reader(self):
+        """Prestar una conexión de solo lectura del pool"""
+        if self.path == ':memory:':
+            # Una base en memoria no se puede compartir entre conexiones
+            yield self.connection
+            return
+
+        try:
+            connection = self._readers.get_nowait()
+        except queue.Empty:
+            connection = None
+            with self._readers_lock:
+                if self._readers_created < self._read_pool_size:
+                    self._readers_created += 1
+                    connection = self._open_reader()
+            if connection is None:
+                connection = self._readers.get()
+        try:
+            yield connection
+        finally:
+            self._readers.put(connection)
+
+    def backup(self, targets, pages=BACKUP_PAGES, progress=None):
+        """Copiar la base en línea con la API de respaldo de SQLite; targets es {esquema: ruta},
+        'main' y, si hay base de archivo, 'archivo'. Devuelve las páginas copiadas.
+
+        La copia va de a pages páginas desde una conexión de lectura propia con una transacción
+        abierta: todas las páginas salen de la misma foto de la base mientras las cajas siguen
+        vendiendo (sin esa transacción, SQLite vuelve a empezar con cada commit de otra conexión).
+        progress(esquema, restantes, total) se llama tras cada paso; si lanza una excepción, la
+        copia se corta."""
+        if self.path == ':memory:':
+            raise ValueError("Una base en memoria no se puede respaldar")
+        source = self._open_reader()
+        try:
+            source.execute('BEGIN')
+            for schema in targets:
+                source.execute(f'SELECT COUNT(*) FROM {schema}.sqlite_master').fetchone()
+            copied = 0
+            for schema, path in targets.items():
+                step = None if progress is None else (
+                    lambda status, remaining, total, schema=schema: progress(schema, remaining, total))
+                target = sqlite3.connect(path)
+                try:
+                    source.backup(target, pages=pages, name=schema, progress=step)
+                    target.execute('PRAGMA journal_mode=DELETE')  # Copia en un solo archivo, sin -wal ni -shm
+                finally:
+                    target.close()
+                copied += source.execute(f'PRAGMA {schema}.page_count').fetchone()[0]
+            source.rollback()
+            return copied
+        finally:
+            source.close()
+
+    def quick_check(self, path=None, full=False):
+        """PRAGMA quick_check (o integrity_check con full) de la base y su archivo, o de una copia
+        en path; devuelve los problemas encontrados, [] si está sana"""
+        pragma = 'integrity_check' if full else 'quick_check'
+        if path is None:
+            with self.reader() as conn:
+                rows = conn.execute(f'PRAGMA {pragma}').fetchall()
+        else:
+            conn = sqlite3.connect(pathlib.Path(path).resolve().as_uri() + '?mode=ro', uri=True)
+            try:
+                rows = conn.execute(f'PRAGMA {pragma}').fetchall()
+            finally:
+                conn.close()
+        return [row[0] for row in rows if row[0] != 'ok']
+
+    def close(self):
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+        self.connection.close()
+
+    def create_tables(self):
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS Clientes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT NOT NULL,
+                direccion TEXT,
+                telefono TEXT
+            )
+        ''')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS Productos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT NOT NULL,
+                categoria TEXT,
+                precio REAL NOT NULL
+            )
+        ''')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS Ventas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                producto_id INTEGER NOT NULL,
+                cantidad INTEGER NOT NULL,
+                precio_total REAL NOT NULL,
+                fecha TEXT NOT NULL,
+                FOREIGN KEY (producto_id) REFERENCES Productos (id)
+            )
+        ''')
+        self.connection.commit()
+        self.migrate()
+
+    def backfill_orders(self, chunk_size=ORDERS_CHUNK_SIZE):
+        """Pasar a pedidos (uno por venta, ya entregado) las ventas sin pedido: el historial
+        anterior a la migración 7. Va por rangos de id, una transacción por bloque, así que
+        una interrupción sólo deja pendiente el resto. Devuelve cuántas ventas pasó."""
+        first, last = self.connection.execute('SELECT MIN(id), MAX(id) FROM Ventas WHERE pedido_id IS NULL').fetchone()
+        if first is None:
+            return 0
+        total = 0
+        for start in range(first, last + 1, chunk_size):
+            try:
+                self.connection.execute('BEGIN IMMEDIATE')
+                base = self.connection.execute('''
+                    SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'Pedidos'), 0),
+                               COALESCE((SELECT MAX(id) FROM Pedidos), 0))
+                ''').fetchone()[0]
+                # Los pedidos nuevos toman ids a continuación del último, en el orden de las ventas
+                total += self.connection.execute('''
+                    UPDATE Ventas SET pedido_id = :base + nuevos.n
+                    FROM (SELECT id, ROW_NUMBER() OVER (ORDER BY id) AS n FROM Ventas
+                          WHERE id >= :desde AND id < :hasta AND pedido_id IS NULL) AS nuevos
+                    WHERE Ventas.id = nuevos.id
+                ''', {'base': base, 'desde': start, 'hasta': start + chunk_size}).rowcount
+                self.connection.execute('''
+                    INSERT INTO Pedidos (id, cliente_id, fecha, hora, estado, total)
+                    SELECT pedido_id, NULL, fecha, hora, 'entregado', precio_total FROM Ventas
+                    WHERE id >= ? AND id < ? AND pedido_id > ?
+                ''', (start, start + chunk_size, base))
+                self.connection.commit()
+            except sqlite3.Error:
+                self.connection.rollback()
+                raise
+        return total
+
+    def archive_before(self, fecha, chunk_size=ARCHIVE_CHUNK_SIZE):
+        """Pasar a la base de archivo los pedidos entregados anteriores a fecha, con sus ventas y
+        pagos; devuelve cuántas ventas pasó.
+
+        Va por bloques de pedidos y cada bloque usa dos transacciones cortas: una copia al
+        archivo y otra borra de la base principal (SQLite en modo WAL no confirma atómicamente
+        entre dos archivos). Si se corta entre las dos, la copia ya está y la próxima pasada sólo
+        borra. Los días pasados quedan en DiasArchivados: sus totales y resúmenes no cambian."""
+        if self.archive_path is None:
+            raise ValueError("Una base en memoria no tiene archivo")
+        connection = self.connection
+        connection.execute('CREATE TEMP TABLE IF NOT EXISTS PedidosArchivar (id INTEGER PRIMARY KEY)')
+        moved = 0
+        while True:
+            try:
+                connection.execute('BEGIN')
+                connection.execute('DELETE FROM temp.PedidosArchivar')
+                if not connection.execute('''
+                    INSERT INTO temp.PedidosArchivar (id)
+                    SELECT id FROM main.Pedidos WHERE fecha < ? AND estado = 'entregado' ORDER BY id LIMIT ?
+                ''', (fecha, chunk_size)).rowcount:
+                    connection.commit()
+                    return moved
+                for table, columns in (('Pedidos', ARCHIVE_VIEWS['PedidosTodos'][1]),
+                                       ('Ventas', ARCHIVE_VIEWS['VentasTodas'][1]),
+                                       ('Pagos', ARCHIVE_VIEWS['PagosTodos'][1])):
+                    key = 'id' if table == 'Pedidos' else 'pedido_id'
+                    connection.execute(f'''
+                        INSERT OR IGNORE INTO archivo.{table} ({columns})
+                        SELECT {columns} FROM main.{table} WHERE {key} IN (SELECT id FROM temp.PedidosArchivar)
+                    ''')
+                connection.commit()
+
+                connection.execute('BEGIN IMMEDIATE')
+                connection.execute('''
+                    INSERT OR IGNORE INTO DiasArchivados (fecha)
+                    SELECT DISTINCT fecha FROM main.Ventas WHERE pedido_id IN (SELECT id FROM temp.PedidosArchivar)
+                ''')
+                # Sólo se borra lo que ya está en el archivo
+                for table, key in (('Pagos', 'pedido_id'), ('Ventas', 'pedido_id'), ('Pedidos', 'id')):
+                    deleted = connection.execute(f'''
+                        DELETE FROM main.{table}
+                        WHERE {key} IN (SELECT id FROM temp.PedidosArchivar)
+                          AND EXISTS (SELECT 1 FROM archivo.{table} a WHERE a.id = main.{table}.id)
+                    ''').rowcount
+                    if table == 'Ventas':
+                        moved += deleted
+                connection.commit()
+            except sqlite3.Error:
+                connection.rollback()
+                raise
+
+    def migrate(self):
+        """Aplicar las migraciones pendientes, cada una en su propia transacción"""
+        version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+        for number, steps in enumerate(MIGRATIONS[version:], start=version + 1):
+            try:
+                self.connection.execute('BEGIN')
+                for step in steps:
+                    if callable(step):
+                        step(self.connection)
+                    else:
+                        self.connection.execute(step)
+                self.connection.execute(f'PRAGMA user_version={number}')
+                self.connection.commit()
+            except sqlite3.Error:
+                self.connection.rollback()
+                raise
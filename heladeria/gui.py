@@ -0,0 +1,1823 @@
+import datetime
+import os
+import queue
+import re
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk, messagebox, filedialog, simpledialog
+
+from .backup import BackupManager
+from .csv_io import CsvManager
+from .database import Database, today
+from .inventory import InventoryManager
+from .journal import JournalInUse, SalesJournal
+from .loyalty import LoyaltyManager
+from .managers import METODOS_PAGO, ClientManager, ProductManager, SalesManager
+from .money import Money
+from .remote import (RemoteClientManager, RemoteConnection, RemoteInventoryManager, RemoteLoyaltyManager,
+                     RemoteProductManager, RemoteReportManager, RemoteSalesManager)
+from .reports import ReportManager
+
+SEARCH_DELAY_MS = 150  # Espera tras la última tecla antes de buscar
+CATALOG_POLL_MS = 5000  # Cada cuánto el punto de venta busca cambios del catálogo hechos desde otro proceso
+WORKER_POLL_MS = 20    # Cada cuánto la interfaz recoge los resultados del hilo de base de datos
+HOTKEYS = 12           # Productos rápidos en F1..F12: los más vendidos de los últimos HOTKEY_DAYS días
+HOTKEY_DAYS = 30
+BACKUP_HOURS = 4       # Respaldo automático cada tantas horas con la aplicación abierta ($HELADERIA_BACKUP_HOURS, 0 lo apaga)
+QUICK_TENDER = (1000, 2000, 5000, 10000, 20000)  # Billetes (en pesos) para cobrar con un clic
+
+# Validación por tecla sin convertir el campo entero
+QUANTITY_RE = re.compile(r'\d*')
+PAYMENT_RE = re.compile(r'\$?\d*(?:[.,]\d{0,2})?')
+CODE_RE = re.compile(r'\d*\*?\d*')  # "código" o "cantidad*código"
+
+class DatabaseWorker:
+    """Hilo dedicado a la base de datos: las ventanas le encargan operaciones y reciben
+    el resultado en el hilo de Tk, así el mainloop nunca espera a SQLite"""
+    def __init__(self, root):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='heladeria-db')
+        self._done = queue.Queue()
+        self._pending = 0
+        self._busy = {}
+
+    def call(self, fn, *args, on_done=None, on_error=None, busy=None):
+        """Ejecutar fn(*args) en el hilo de base de datos; devuelve un Future"""
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(lambda f: self._done.put((f, on_done, on_error, busy)))
+        if busy is not None:
+            if not self._busy.get(busy):
+                busy.config(cursor='watch')
+            self._busy[busy] = self._busy.get(busy, 0) + 1
+        self._pending += 1
+        if self._pending == 1:
+            self.root.after(WORKER_POLL_MS, self._poll)
+        return future
+
+    def _poll(self):
+        """Entregar en el hilo de Tk los resultados terminados"""
+        while True:
+            try:
+                future, on_done, on_error, busy = self._done.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            if busy is not None:
+                self._busy[busy] -= 1
+                idle = not self._busy[busy]
+                if idle:
+                    del self._busy[busy]
+                if not busy.winfo_exists():
+                    continue  # La ventana se cerró mientras tanto
+                if idle:
+                    busy.config(cursor='')
+            error = future.exception()
+            if error is None:
+                if on_done:
+                    on_done(future.result())
+            elif on_error:
+                on_error(error)
+            else:
+                messagebox.showerror("Error", str(error))
+        if self._pending:
+            self.root.after(WORKER_POLL_MS, self._poll)
+
+    def shutdown(self):
+        """Esperar a que terminen las operaciones pendientes (por ejemplo, ventas)"""
+        self.executor.shutdown(wait=True)
+
+class HeladeriaApp:
+    def __init__(self, root, db_path=None, journal_path=None, server_address=None):
+        self.root = root
+        self.root.title("Sistema de Gestión - Heladería")
+        server_address = server_address or os.environ.get('HELADERIA_SERVER')
+        self.backup_manager = None
+        if server_address:
+            # Caja conectada a un servidor de ventas: la base la abre sólo el servidor. Toda llamada
+            # a los administradores remotos pasa por db_worker, nunca por el hilo de Tk
+            self.db = self.journal = self.csv_manager = None
+            self.remote = RemoteConnection(server_address)
+            self.client_manager = RemoteClientManager(self.remote)
+            self.product_manager = RemoteProductManager(self.remote)
+            self.sales_manager = RemoteSalesManager(self.remote)
+            self.report_manager = RemoteReportManager(self.remote)
+            self.inventory_manager = RemoteInventoryManager(self.remote)
+            self.loyalty_manager = RemoteLoyaltyManager(self.remote)
+            self.root.title(f"Sistema de Gestión - Heladería (servidor {server_address})")
+        else:
+            self.remote = None
+            self.db = Database(db_path)
+            # Escritura diferida de ventas: activa si se indica un archivo de diario
+            journal_path = journal_path or os.environ.get('HELADERIA_JOURNAL')
+            try:
+                self.journal = SalesJournal(self.db, journal_path) if journal_path else None
+            except JournalInUse as e:
+                # Otra caja o el servidor ya lo usan: esta escribe las ventas directo en la base
+                self.journal = None
+                messagebox.showwarning("Diario de ventas", f"{e}. Las ventas se guardan directo en la base.")
+            self.client_manager = ClientManager(self.db)
+            self.product_manager = ProductManager(self.db)
+            self.sales_manager = SalesManager(self.db, self.product_manager.catalog, self.journal)
+            self.csv_manager = CsvManager(self.db, self.product_manager.catalog)
+            self.report_manager = ReportManager(self.db)
+            self.inventory_manager = InventoryManager(self.db)
+            self.loyalty_manager = LoyaltyManager(self.db)
+            if self.db.path != ':memory:':
+                self.backup_manager = BackupManager(self.db)
+        self.db_worker = DatabaseWorker(root)
+        # Los respaldos van en su propio hilo: una copia larga no demora las ventas
+        self.backup_worker = DatabaseWorker(root)
+        self.backup_hours = float(os.environ.get('HELADERIA_BACKUP_HOURS', BACKUP_HOURS))
+        if self.backup_manager is not None and self.backup_hours > 0:
+            self.root.after(int(self.backup_hours * 3600 * 1000), self.scheduled_backup)
+
+        # Precargar el catálogo sin bloquear la apertura de la aplicación
+        self.db_worker.call(self.product_manager.catalog.all)
+
+        self.create_menu()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_close(self):
+        if self.backup_manager is not None:
+            self.backup_manager.cancel()
+        self.backup_worker.shutdown()
+        self.db_worker.shutdown()
+        if self.remote is not None:
+            self.remote.close()
+        else:
+            if self.journal is not None:
+                self.journal.close()
+            self.db.close()
+        self.root.destroy()
+
+    def create_menu(self):
+        menu_bar = tk.Menu(self.root)
+        self.root.config(menu=menu_bar)
+
+        gestion_menu = tk.Menu(menu_bar, tearoff=0)
+        menu_bar.add_cascade(label="Gestión", menu=gestion_menu)
+        gestion_menu.add_command(label="Clientes", command=self.open_client_management)
+        gestion_menu.add_command(label="Productos", command=self.open_product_management)
+        gestion_menu.add_command(label="Inventario", command=self.open_inventory)
+        gestion_menu.add_command(label="Punto de Venta", command=self.open_sales_point)
+        gestion_menu.add_command(label="Cerrar Caja", command=self.open_sales_report)
+
+        # Importar, exportar y el diagnóstico trabajan sobre la base local: en una caja remota se
+        # hacen desde el equipo del servidor
+        local = tk.NORMAL if self.remote is None else tk.DISABLED
+        datos_menu = tk.Menu(menu_bar, tearoff=0)
+        menu_bar.add_cascade(label="Datos", menu=datos_menu, state=local)
+        datos_menu.add_command(label="Importar Productos...", command=self.import_products)
+        datos_menu.add_command(label="Importar Clientes...", command=self.import_clients)
+        datos_menu.add_separator()
+        datos_menu.add_command(label="Exportar Productos...", command=self.export_products)
+        datos_menu.add_command(label="Exportar Clientes...", command=self.export_clients)
+        datos_menu.add_command(label="Exportar Ventas...", command=self.export_sales)
+
+        herramientas_menu = tk.Menu(menu_bar, tearoff=0)
+        menu_bar.add_cascade(label="Herramientas", menu=herramientas_menu)
+        herramientas_menu.add_command(label="Diagnóstico", command=self.open_diagnostics, state=local)
+        herramientas_menu.add_command(label="Respaldos", command=self.open_backups,
+                                      state=tk.NORMAL if self.backup_manager is not None else tk.DISABLED)
+
+    def open_client_management(self):
+        ClientManagementWindow(self)
+
+    def open_product_management(self):
+        ProductManagementWindow(self)
+
+    def open_inventory(self):
+        InventoryWindow(self)
+
+    def open_sales_point(self):
+        SalesPointWindow(self)
+
+    def open_sales_report(self):
+        SalesReportWindow(self)
+
+    def open_diagnostics(self):
+        DiagnosticsWindow(self)
+
+    def open_backups(self):
+        BackupWindow(self)
+
+    def run_backup(self, on_done=None):
+        """Respaldar en el hilo de respaldos; los errores se muestran al terminar"""
+        def failed(error):
+            messagebox.showerror("Respaldo", f"El respaldo falló: {error}")
+        self.backup_worker.call(self.backup_manager.run, on_done=on_done, on_error=failed)
+
+    def scheduled_backup(self):
+        if self.backup_manager.progress is None:
+            self.run_backup()
+        self.root.after(int(self.backup_hours * 3600 * 1000), self.scheduled_backup)
+
+    def _import(self, title, import_fn):
+        path = filedialog.askopenfilename(title=title, filetypes=[("CSV", "*.csv"), ("Todos", "*.*")])
+        if not path:
+            return
+        def done(result):
+            total, errors = result
+            message = f"Filas importadas: {total}"
+            if errors:
+                message += f"\nFilas con errores: {len(errors)}\n" + "\n".join(
+                    f"Línea {line}: {error}" for line, error in errors[:10])
+            messagebox.showinfo("Importación", message)
+        self.db_worker.call(import_fn, path, on_done=done, busy=self.root)
+
+    def _export(self, title, export_fn, *args):
+        path = filedialog.asksaveasfilename(title=title, defaultextension=".csv", filetypes=[("CSV", "*.csv")])
+        if not path:
+            return
+        def done(total):
+            messagebox.showinfo("Exportación", f"Filas exportadas: {total}")
+        self.db_worker.call(export_fn, path, *args, on_done=done, busy=self.root)
+
+    def import_products(self):
+        self._import("Importar Productos", self.csv_manager.import_products)
+
+    def import_clients(self):
+        self._import("Importar Clientes", self.csv_manager.import_clients)
+
+    def export_products(self):
+        self._export("Exportar Productos", self.csv_manager.export_products)
+
+    def export_clients(self):
+        self._export("Exportar Clientes", self.csv_manager.export_clients)
+
+    def export_sales(self):
+        hoy = today()
+        desde = simpledialog.askstring("Exportar Ventas", "Desde (AAAA-MM-DD):", initialvalue=hoy, parent=self.root)
+        if not desde:
+            return
+        hasta = simpledialog.askstring("Exportar Ventas", "Hasta (AAAA-MM-DD):", initialvalue=hoy, parent=self.root)
+        if not hasta:
+            return
+        try:
+            datetime.date.fromisoformat(desde)
+            datetime.date.fromisoformat(hasta)
+        except ValueError:
+            messagebox.showwarning("Error", "Las fechas deben tener el formato AAAA-MM-DD.")
+            return
+        self._export("Exportar Ventas", self.csv_manager.export_sales, desde, hasta)
+
+class VirtualTreeview(ttk.Treeview):
+    """Treeview que sólo materializa las filas visibles y las pide a la base por páginas.
+
+    Las consultas corren en el hilo de base de datos (worker) de a una: mientras hay una en
+    curso, sólo se guarda el último pedido y los desplazamientos se acumulan.
+    """
+    def __init__(self, master, worker, count, fetch_page, fetch_row, id_at, **kwargs):
+        super().__init__(master, **kwargs)
+        self.worker = worker
+        self.count = count
+        self.fetch_page = fetch_page
+        self.fetch_row = fetch_row
+        self.id_at = id_at
+
+        self.visible_rows = int(self.cget('height'))
+        self.total = 0
+        self.offset = 0  # Posición de la primera fila visible
+        self.rows = []   # Filas visibles, en orden
+        self.search = None
+        self.loading = False   # Hay una consulta en curso
+        self.next_load = None  # Lo próximo a pedir cuando termine
+        self.scroll_pending = 0
+
+        self.scrollbar = ttk.Scrollbar(master, orient=tk.VERTICAL, command=self.yview)
+        self.bind('<MouseWheel>', self.on_mousewheel)
+        self.bind('<Button-4>', lambda event: self.scroll_rows(-3) or 'break')
+        self.bind('<Button-5>', lambda event: self.scroll_rows(3) or 'break')
+
+    def yview(self, *args):
+        """Traducir los comandos de la barra de desplazamiento a consultas por página"""
+        if not args:
+            return self.fractions()
+        if args[0] == 'moveto':
+            self.moveto(round(float(args[1]) * self.total))
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            if args[2] == 'pages':
+                amount *= self.visible_rows
+            self.scroll_rows(amount)
+
+    def on_mousewheel(self, event):
+        self.scroll_rows(-3 if event.delta > 0 else 3)
+        return 'break'
+
+    def fractions(self):
+        if not self.total:
+            return (0.0, 1.0)
+        return (self.offset / self.total, (self.offset + len(self.rows)) / self.total)
+
+    def show(self, rows):
+        """Reemplazar las filas visibles conservando los ítems que siguen en pantalla"""
+        keep = {str(row.id) for row in rows}
+        stale = [iid for iid in self.get_children() if iid not in keep]
+        if stale:
+            self.delete(*stale)
+        for index, row in enumerate(rows):
+            iid = str(row.id)
+            if self.exists(iid):
+                self.move(iid, '', index)
+            else:
+                self.insert('', index, iid=iid, values=row)
+        self.rows = rows
+        self.scrollbar.set(*self.fractions())
+
+    def load(self, query, *args):
+        """Correr query(*args) en el worker; devuelve (total, offset, filas) y se muestran al terminar"""
+        self.loading = True
+
+        def done(result):
+            self.loading = False
+            self.total, self.offset, rows = result
+            self.show(rows)
+            self.load_next()
+
+        def failed(error):
+            self.loading = False
+            messagebox.showerror("Error", str(error))
+            self.load_next()
+
+        self.worker.call(query, *args, on_done=done, on_error=failed, busy=self)
+
+    def load_next(self):
+        if self.next_load is not None:
+            next_load, self.next_load = self.next_load, None
+            next_load()
+        elif self.scroll_pending:
+            amount, self.scroll_pending = self.scroll_pending, 0
+            self.scroll_rows(amount)
+
+    def moveto(self, offset):
+        if self.loading:
+            self.next_load = lambda: self.moveto(offset)
+            self.scroll_pending = 0
+            return
+        offset = max(0, min(offset, self.total - self.visible_rows))
+        self.load(self.query_moveto, offset, self.total, self.search)
+
+    def query_moveto(self, offset, total, search):
+        start_id = self.id_at(offset, search=search)
+        rows = (self.fetch_page(after_id=start_id - 1, limit=self.visible_rows, search=search)
+                if start_id is not None else [])
+        return total, offset, rows
+
+    def scroll_rows(self, amount):
+        if self.loading:
+            self.scroll_pending += amount
+            return
+        if not self.rows or not amount:
+            return
+        self.load(self.query_scroll, amount, self.rows, self.offset, self.total, self.search)
+
+    def query_scroll(self, amount, rows, offset, total, search):
+        if amount > 0:
+            new_rows = self.fetch_page(after_id=rows[-1].id, limit=amount, search=search)
+            return total, offset + len(new_rows), (rows + new_rows)[-self.visible_rows:]
+        new_rows = self.fetch_page(before_id=rows[0].id, limit=-amount, search=search)
+        return total, offset - len(new_rows), (new_rows + rows)[:self.visible_rows]
+
+    def refresh(self):
+        """Recontar y volver a pedir sólo la ventana visible"""
+        if self.loading:
+            self.next_load = self.refresh
+            self.scroll_pending = 0
+            return
+        first_id = self.rows[0].id if self.rows else 1
+        self.load(self.query_refresh, first_id, self.offset, self.search)
+
+    def query_refresh(self, first_id, offset, search):
+        total = self.count(search=search)
+        rows = self.fetch_page(after_id=first_id - 1, limit=self.visible_rows, search=search)
+        missing = self.visible_rows - len(rows)
+        if missing and offset:
+            # Al final de la tabla tras un borrado: completar con las filas anteriores
+            before = self.fetch_page(before_id=rows[0].id if rows else first_id, limit=missing, search=search)
+            rows = before + rows
+        return total, max(0, min(offset, total - len(rows))), rows
+
+    def set_filter(self, text):
+        """Mostrar sólo las filas que coinciden con la búsqueda, desde el principio"""
+        self.search = text or None
+        self.offset = 0
+        self.rows = []
+        self.refresh()
+
+    def selected_row(self):
+        """Registro de la fila seleccionada, con sus tipos (no los textos del Treeview), o None"""
+        selection = self.selection()
+        if not selection:
+            return None
+        return next((row for row in self.rows if str(row.id) == selection[0]), None)
+
+    def refresh_row(self, row_id):
+        """Actualizar en su lugar una única fila modificada"""
+        def done(row):
+            iid = str(row_id)
+            if not self.exists(iid):
+                return
+            if row is None:
+                self.refresh()
+                return
+            self.item(iid, values=row)
+            self.rows = [row if r.id == row_id else r for r in self.rows]
+
+        if self.exists(str(row_id)):
+            self.worker.call(self.fetch_row, row_id, on_done=done, busy=self)
+
+class ClientManagementWindow:
+    def __init__(self, app):
+        self.app = app
+        self.window = tk.Toplevel(app.root)
+        self.window.title("Gestión de Clientes - Heladería")
+        self.window.geometry("600x500")
+
+        self.selected_client_id = None
+        self.search_job = None
+
+        self.create_widgets()
+
+    def create_widgets(self):
+        label_nombre_cliente = tk.Label(self.window, text="Nombre del Cliente:")
+        label_nombre_cliente.pack(pady=5)
+        self.entry_nombre_cliente = tk.Entry(self.window, width=40)
+        self.entry_nombre_cliente.pack(pady=5)
+
+        label_direccion_cliente = tk.Label(self.window, text="Dirección:")
+        label_direccion_cliente.pack(pady=5)
+        self.entry_direccion_cliente = tk.Entry(self.window, width=40)
+        self.entry_direccion_cliente.pack(pady=5)
+
+        label_telefono_cliente = tk.Label(self.window, text="Teléfono:")
+        label_telefono_cliente.pack(pady=5)
+        self.entry_telefono_cliente = tk.Entry(self.window, width=40)
+        self.entry_telefono_cliente.pack(pady=5)
+
+        btn_agregar_cliente = tk.Button(self.window, text="Agregar Cliente", command=self.add_client)
+        btn_agregar_cliente.pack(pady=10)
+
+        search_frame = tk.Frame(self.window)
+        search_frame.pack(pady=5)
+        tk.Label(search_frame, text="Buscar:").pack(side=tk.LEFT)
+        self.entry_buscar = tk.Entry(search_frame, width=33)
+        self.entry_buscar.pack(side=tk.LEFT, padx=5)
+        self.entry_buscar.bind("<KeyRelease>", self.schedule_search)
+
+        tree_frame = tk.Frame(self.window)
+        tree_frame.pack(pady=10, fill='x')
+        manager = self.app.client_manager
+        self.tree_clientes = VirtualTreeview(tree_frame, self.app.db_worker, manager.count_clients,
+                                             manager.get_clients_page, manager.get_client, manager.client_id_at,
+                                             columns=('ID', 'Nombre', 'Dirección', 'Teléfono'), show='headings')
+        self.tree_clientes.heading('ID', text='ID')
+        self.tree_clientes.heading('Nombre', text='Nombre')
+        self.tree_clientes.heading('Dirección', text='Dirección')
+        self.tree_clientes.heading('Teléfono', text='Teléfono')
+        self.tree_clientes.column('ID', anchor='center')
+        self.tree_clientes.pack(side=tk.LEFT, fill='x', expand=True)
+        self.tree_clientes.scrollbar.pack(side=tk.RIGHT, fill='y')
+
+        self.tree_clientes.bind('<<TreeviewSelect>>', self.select_client)
+
+        btn_actualizar_cliente = tk.Button(self.window, text="Actualizar Cliente", command=self.update_client)
+        btn_actualizar_cliente.pack(pady=5)
+
+        btn_eliminar_cliente = tk.Button(self.window, text="Eliminar Cliente", command=self.delete_client)
+        btn_eliminar_cliente.pack(pady=5)
+
+        self.load_clients()
+
+    def load_clients(self):
+        self.tree_clientes.refresh()
+
+    def schedule_search(self, event=None):
+        """Buscar cuando el usuario deja de escribir, no en cada tecla"""
+        if self.search_job:
+            self.window.after_cancel(self.search_job)
+        self.search_job = self.window.after(SEARCH_DELAY_MS, self.run_search)
+
+    def run_search(self):
+        self.search_job = None
+        self.tree_clientes.set_filter(self.entry_buscar.get())
+
+    def add_client(self):
+        nombre = self.entry_nombre_cliente.get()
+        direccion = self.entry_direccion_cliente.get()
+        telefono = self.entry_telefono_cliente.get()
+
+        if nombre:  # Verificar campo requerido
+            def done(client_id):
+                messagebox.showinfo("Cliente agregado", f"Cliente '{nombre}' agregado con éxito.")
+                self.entry_nombre_cliente.delete(0, tk.END)
+                self.entry_direccion_cliente.delete(0, tk.END)
+                self.entry_telefono_cliente.delete(0, tk.END)
+                self.load_clients()
+            self.app.db_worker.call(self.app.client_manager.add_client, nombre, direccion, telefono,
+                                    on_done=done, busy=self.window)
+        else:
+            messagebox.showwarning("Error", "El campo 'Nombre' es obligatorio.")
+
+    def select_client(self, event):
+        client = self.tree_clientes.selected_row()
+        if client:
+            self.selected_client_id = client.id  # ID del cliente seleccionado
+            self.entry_nombre_cliente.delete(0, tk.END)
+            self.entry_nombre_cliente.insert(0, client.nombre)
+            self.entry_direccion_cliente.delete(0, tk.END)
+            self.entry_direccion_cliente.insert(0, client.direccion or '')
+            self.entry_telefono_cliente.delete(0, tk.END)
+            self.entry_telefono_cliente.insert(0, client.telefono or '')
+
+    def update_client(self):
+        if self.selected_client_id:
+            nombre = self.entry_nombre_cliente.get()
+            direccion = self.entry_direccion_cliente.get()
+            telefono = self.entry_telefono_cliente.get()
+
+            if nombre:  # Verificar campo requerido
+                client_id = self.selected_client_id
+                def done(result):
+                    messagebox.showinfo("Cliente actualizado", f"Cliente '{nombre}' actualizado con éxito.")
+                    self.tree_clientes.refresh_row(client_id)
+                self.app.db_worker.call(self.app.client_manager.update_client, client_id, nombre, direccion, telefono,
+                                        on_done=done, busy=self.window)
+            else:
+                messagebox.showwarning("Error", "El campo 'Nombre' es obligatorio.")
+        else:
+            messagebox.showwarning("Error", "Seleccione un cliente para actualizar.")
+
+    def delete_client(self):
+        if self.selected_client_id:
+            def done(result):
+                messagebox.showinfo("Cliente eliminado", "Cliente eliminado con éxito.")
+                self.load_clients()
+                self.selected_client_id = None
+                self.entry_nombre_cliente.delete(0, tk.END)
+                self.entry_direccion_cliente.delete(0, tk.END)
+                self.entry_telefono_cliente.delete(0, tk.END)
+            self.app.db_worker.call(self.app.client_manager.delete_client, self.selected_client_id,
+                                    on_done=done, busy=self.window)
+        else:
+            messagebox.showwarning("Error", "Seleccione un cliente para eliminar.")
+
+class ProductManagementWindow:
+    def __init__(self, app):
+        self.app = app
+        self.window = tk.Toplevel(app.root)
+        self.window.title("Gestión de Productos - Heladería")
+        self.window.geometry("600x500")
+
+        self.selected_product_id = None
+        self.search_job = None
+
+        self.create_widgets()
+
+    def create_widgets(self):
+        label_nombre_producto = tk.Label(self.window, text="Nombre del Producto:")
+        label_nombre_producto.pack(pady=5)
+        self.entry_nombre_producto = tk.Entry(self.window, width=40)
+        self.entry_nombre_producto.pack(pady=5)
+
+        label_categoria_producto = tk.Label(self.window, text="Categoría:")
+        label_categoria_producto.pack(pady=5)
+        self.entry_categoria_producto = tk.Entry(self.window, width=40)
+        self.entry_categoria_producto.pack(pady=5)
+
+        label_precio_producto = tk.Label(self.window, text="Precio:")
+        label_precio_producto.pack(pady=5)
+        self.entry_precio_producto = tk.Entry(self.window, width=40)
+        self.entry_precio_producto.pack(pady=5)
+
+        btn_agregar_producto = tk.Button(self.window, text="Agregar Producto", command=self.add_product)
+        btn_agregar_producto.pack(pady=10)
+
+        search_frame = tk.Frame(self.window)
+        search_frame.pack(pady=5)
+        tk.Label(search_frame, text="Buscar:").pack(side=tk.LEFT)
+        self.entry_buscar = tk.Entry(search_frame, width=33)
+        self.entry_buscar.pack(side=tk.LEFT, padx=5)
+        self.entry_buscar.bind("<KeyRelease>", self.schedule_search)
+
+        tree_frame = tk.Frame(self.window)
+        tree_frame.pack(pady=10, fill='x')
+        manager = self.app.product_manager
+        self.tree_productos = VirtualTreeview(tree_frame, self.app.db_worker, manager.count_products,
+                                              manager.get_products_page, manager.get_product, manager.product_id_at,
+                                              columns=('ID', 'Nombre', 'Categoría', 'Precio'), show='headings')
+        self.tree_productos.heading('ID', text='ID')
+        self.tree_productos.heading('Nombre', text='Nombre')
+        self.tree_productos.heading('Categoría', text='Categoría')
+        self.tree_productos.heading('Precio', text='Precio')
+        self.tree_productos.column('ID', anchor='center')
+        self.tree_productos.pack(side=tk.LEFT, fill='x', expand=True)
+        self.tree_productos.scrollbar.pack(side=tk.RIGHT, fill='y')
+
+        self.tree_productos.bind('<<TreeviewSelect>>', self.select_product)
+
+        btn_actualizar_producto = tk.Button(self.window, text="Actualizar Producto", command=self.update_product)
+        btn_actualizar_producto.pack(pady=5)
+
+        btn_eliminar_producto = tk.Button(self.window, text="Eliminar Producto", command=self.delete_product)
+        btn_eliminar_producto.pack(pady=5)
+
+        self.load_products()
+
+    def load_products(self):
+        self.tree_productos.refresh()
+
+    def schedule_search(self, event=None):
+        """Buscar cuando el usuario deja de escribir, no en cada tecla"""
+        if self.search_job:
+            self.window.after_cancel(self.search_job)
+        self.search_job = self.window.after(SEARCH_DELAY_MS, self.run_search)
+
+    def run_search(self):
+        self.search_job = None
+        self.tree_productos.set_filter(self.entry_buscar.get())
+
+    def add_product(self):
+        nombre = self.entry_nombre_producto.get()
+        categoria = self.entry_categoria_producto.get()
+        precio = self.entry_precio_producto.get()
+
+        if nombre and precio:  # Verificar campos requeridos
+            try:
+                precio = Money.parse(precio)  # Importe en centavos
+            except ValueError:
+                messagebox.showwarning("Error", "El precio debe ser un número.")
+                return
+            def done(product_id):
+                messagebox.showinfo("Producto agregado", f"Producto '{nombre}' agregado con éxito.")
+                self.entry_nombre_producto.delete(0, tk.END)
+                self.entry_categoria_producto.delete(0, tk.END)
+                self.entry_precio_producto.delete(0, tk.END)
+                self.load_products()
+            self.app.db_worker.call(self.app.product_manager.add_product, nombre, categoria, precio,
+                                    on_done=done, busy=self.window)
+        else:
+            messagebox.showwarning("Error", "Los campos 'Nombre' y 'Precio' son obligatorios.")
+
+    def select_product(self, event):
+        product = self.tree_productos.selected_row()
+        if product:
+            self.selected_product_id = product.id  # ID del producto seleccionado
+            self.entry_nombre_producto.delete(0, tk.END)
+            self.entry_nombre_producto.insert(0, product.nombre)
+            self.entry_categoria_producto.delete(0, tk.END)
+            self.entry_categoria_producto.insert(0, product.categoria or '')
+            self.entry_precio_producto.delete(0, tk.END)
+            self.entry_precio_producto.insert(0, str(product.precio))
+
+    def update_product(self):
+        if self.selected_product_id:
+            nombre = self.entry_nombre_producto.get()
+            categoria = self.entry_categoria_producto.get()
+            precio = self.entry_precio_producto.get()
+
+            if nombre and precio:  # Verificar campos requeridos
+                try:
+                    precio = Money.parse(precio)  # Importe en centavos
+                except ValueError:
+                    messagebox.showwarning("Error", "El precio debe ser un número.")
+                    return
+                product_id = self.selected_product_id
+                def done(result):
+                    messagebox.showinfo("Producto actualizado", f"Producto '{nombre}' actualizado con éxito.")
+                    self.tree_productos.refresh_row(product_id)
+                self.app.db_worker.call(self.app.product_manager.update_product, product_id, nombre, categoria, precio,
+                                        on_done=done, busy=self.window)
+            else:
+                messagebox.showwarning("Error", "Los campos 'Nombre' y 'Precio' son obligatorios.")
+        else:
+            messagebox.showwarning("Error", "Seleccione un producto para actualizar.")
+
+    def delete_product(self):
+        if self.selected_product_id:
+            def done(result):
+                messagebox.showinfo("Producto eliminado", "Producto eliminado con éxito.")
+                self.load_products()
+                self.selected_product_id = None
+                self.entry_nombre_producto.delete(0, tk.END)
+                self.entry_categoria_producto.delete(0, tk.END)
+                self.entry_precio_producto.delete(0, tk.END)
+            self.app.db_worker.call(self.app.product_manager.delete_product, self.selected_product_id,
+                                    on_done=done, busy=self.window)
+        else:
+            messagebox.showwarning("Error", "Seleccione un producto para eliminar.")
+
+class InventoryWindow:
+    def __init__(self, app):
+        self.app = app
+        self.manager = app.inventory_manager
+        self.window = tk.Toplevel(app.root)
+        self.window.title("Inventario - Heladería")
+        self.window.geometry("650x600")
+
+        self.selected_item_id = None
+        self.items = {}  # Etiqueta del combobox de recetas -> id del insumo
+        self.shown_items = {}  # iid de la tabla -> Insumo mostrado
+        self.recipe = []  # [(insumo_id, etiqueta, cantidad)] del producto elegido
+
+        notebook = ttk.Notebook(self.window)
+        notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        stock_frame = ttk.Frame(notebook, padding="10")
+        notebook.add(stock_frame, text="Stock")
+        recipe_frame = ttk.Frame(notebook, padding="10")
+        notebook.add(recipe_frame, text="Recetas")
+        self.create_stock_widgets(stock_frame)
+        self.create_recipe_widgets(recipe_frame)
+        self.load_items()
+
+    def create_stock_widgets(self, frame):
+        form = ttk.Frame(frame)
+        form.pack(fill=tk.X)
+        ttk.Label(form, text="Insumo:").grid(row=0, column=0, sticky=tk.W, pady=2)
+        self.entry_nombre = ttk.Entry(form, width=30)
+        self.entry_nombre.grid(row=0, column=1, sticky=tk.W, pady=2)
+        ttk.Label(form, text="Unidad:").grid(row=1, column=0, sticky=tk.W, pady=2)
+        self.entry_unidad = ttk.Entry(form, width=15)
+        self.entry_unidad.grid(row=1, column=1, sticky=tk.W, pady=2)
+        ttk.Label(form, text="Stock mínimo:").grid(row=2, column=0, sticky=tk.W, pady=2)
+        self.entry_minimo = ttk.Entry(form, width=10)
+        self.entry_minimo.grid(row=2, column=1, sticky=tk.W, pady=2)
+
+        buttons = ttk.Frame(frame)
+        buttons.pack(fill=tk.X, pady=5)
+        ttk.Button(buttons, text="Agregar", command=self.add_item).pack(side=tk.LEFT, padx=2)
+        ttk.Button(buttons, text="Actualizar", command=self.update_item).pack(side=tk.LEFT, padx=2)
+        ttk.Button(buttons, text="Eliminar", command=self.delete_item).pack(side=tk.LEFT, padx=2)
+        self.var_faltantes = tk.BooleanVar(value=False)
+        ttk.Checkbutton(buttons, text="Sólo faltantes", variable=self.var_faltantes,
+                        command=self.load_items).pack(side=tk.RIGHT)
+
+        columns = ('ID', 'Insumo', 'Unidad', 'Stock', 'Mínimo')
+        self.tree_insumos = ttk.Treeview(frame, columns=columns, show='headings', height=8)
+        for column in columns:
+            self.tree_insumos.heading(column, text=column)
+            self.tree_insumos.column(column, width=80, anchor='e')
+        self.tree_insumos.column('Insumo', width=200, anchor='w')
+        self.tree_insumos.column('Unidad', anchor='w')
+        self.tree_insumos.tag_configure('faltante', foreground='red')
+        self.tree_insumos.pack(fill=tk.BOTH, expand=True, pady=5)
+        self.tree_insumos.bind('<<TreeviewSelect>>', self.select_item)
+
+        movement = ttk.Frame(frame)
+        movement.pack(fill=tk.X, pady=5)
+        ttk.Label(movement, text="Cantidad:").pack(side=tk.LEFT)
+        self.entry_cantidad = ttk.Entry(movement, width=10)
+        self.entry_cantidad.pack(side=tk.LEFT, padx=5)
+        ttk.Button(movement, text="Ingresar", command=self.receive).pack(side=tk.LEFT, padx=2)
+        ttk.Button(movement, text="Ajustar a conteo", command=self.adjust).pack(side=tk.LEFT, padx=2)
+
+        columns = ('Fecha', 'Cantidad', 'Stock', 'Motivo')
+        self.tree_movimientos = ttk.Treeview(frame, columns=columns, show='headings', height=6)
+        for column in columns:
+            self.tree_movimientos.heading(column, text=column)
+            self.tree_movimientos.column(column, width=100, anchor='e')
+        self.tree_movimientos.column('Fecha', anchor='w')
+        self.tree_movimientos.pack(fill=tk.BOTH, expand=True, pady=5)
+
+    def create_recipe_widgets(self, frame):
+        ttk.Label(frame, text="Producto:").pack(anchor=tk.W)
+        self.combo_producto = ttk.Combobox(frame, width=45, state='readonly')
+        self.combo_producto.pack(anchor=tk.W, pady=5)
+        self.combo_producto.bind('<<ComboboxSelected>>', self.load_recipe)
+
+        self.tree_receta = ttk.Treeview(frame, columns=('Insumo', 'Cantidad'), show='headings', height=8)
+        self.tree_receta.heading('Insumo', text='Insumo')
+        self.tree_receta.heading('Cantidad', text='Cantidad por unidad')
+        self.tree_receta.column('Cantidad', anchor='e')
+        self.tree_receta.pack(fill=tk.BOTH, expand=True, pady=5)
+
+        line = ttk.Frame(frame)
+        line.pack(fill=tk.X, pady=5)
+        self.combo_insumo = ttk.Combobox(line, width=30, state='readonly')
+        self.combo_insumo.pack(side=tk.LEFT)
+        self.entry_receta_cantidad = ttk.Entry(line, width=8)
+        self.entry_receta_cantidad.pack(side=tk.LEFT, padx=5)
+        ttk.Button(line, text="Agregar", command=self.add_ingredient).pack(side=tk.LEFT, padx=2)
+        ttk.Button(line, text="Quitar", command=self.remove_ingredient).pack(side=tk.LEFT, padx=2)
+        ttk.Button(frame, text="Guardar Receta", command=self.save_recipe).pack(pady=5)
+
+        self.products = {}
+
+        def done(products):
+            self.products = {f"{product.nombre} (ID: {product.id})": product.id for product in products}
+            self.combo_producto['values'] = list(self.products)
+        self.app.db_worker.call(self.app.product_manager.catalog.all, on_done=done, busy=self.window)
+
+    def read_int(self, entry, field):
+        try:
+            return int(entry.get())
+        except ValueError:
+            messagebox.showwarning("Error", f"{field} debe ser un número entero.", parent=self.window)
+            return None
+
+    def load_items(self):
+        fetch = self.manager.low_stock if self.var_faltantes.get() else self.manager.get_items
+
+        def done(items):
+            self.tree_insumos.delete(*self.tree_insumos.get_children())
+            self.shown_items = {str(item.id): item for item in items}
+            for item in items:
+                tags = ('faltante',) if item.stock <= item.minimo else ()
+                self.tree_insumos.insert('', tk.END, iid=item.id, values=item, tags=tags)
+            if not self.var_faltantes.get():
+                self.items = {f"{item.nombre} ({item.unidad})": item.id for item in items}
+                self.combo_insumo['values'] = list(self.items)
+        self.app.db_worker.call(fetch, on_done=done, busy=self.window)
+
+    def select_item(self, event=None):
+        selection = self.tree_insumos.selection()
+        if not selection:
+            return
+        item = self.shown_items[selection[0]]
+        self.selected_item_id = item.id
+        for entry, value in ((self.entry_nombre, item.nombre), (self.entry_unidad, item.unidad),
+                             (self.entry_minimo, item.minimo)):
+            entry.delete(0, tk.END)
+            entry.insert(0, value)
+        self.load_movements()
+
+    def load_movements(self):
+        def done(rows):
+            self.tree_movimientos.delete(*self.tree_movimientos.get_children())
+            for row in rows:
+                self.tree_movimientos.insert('', tk.END, values=(row.fecha, f"{row.cantidad:+d}", row.stock, row.motivo))
+        self.app.db_worker.call(self.manager.movements, self.selected_item_id, on_done=done, busy=self.window)
+
+    def add_item(self):
+        nombre = self.entry_nombre.get().strip()
+        if not nombre:
+            messagebox.showwarning("Error", "El nombre del insumo es obligatorio.", parent=self.window)
+            return
+        minimo = self.read_int(self.entry_minimo, "El stock mínimo") if self.entry_minimo.get() else 0
+        if minimo is None:
+            return
+        self.app.db_worker.call(self.manager.add_item, nombre, self.entry_unidad.get().strip() or 'unidad', 0, minimo,
+                                on_done=lambda insumo_id: self.load_items(), busy=self.window)
+
+    def update_item(self):
+        if self.selected_item_id is None:
+            messagebox.showwarning("Error", "Seleccione un insumo.", parent=self.window)
+            return
+        minimo = self.read_int(self.entry_minimo, "El stock mínimo")
+        if minimo is None:
+            return
+        self.app.db_worker.call(self.manager.update_item, self.selected_item_id, self.entry_nombre.get().strip(),
+                                self.entry_unidad.get().strip() or 'unidad', minimo,
+                                on_done=lambda result: self.load_items(), busy=self.window)
+
+    def delete_item(self):
+        if self.selected_item_id is None:
+            messagebox.showwarning("Error", "Seleccione un insumo.", parent=self.window)
+            return
+        if not messagebox.askyesno("Eliminar", "¿Eliminar el insumo, su historial y su uso en recetas?",
+                                   parent=self.window):
+            return
+
+        def done(result):
+            self.selected_item_id = None
+            self.tree_movimientos.delete(*self.tree_movimientos.get_children())
+            self.load_items()
+        self.app.db_worker.call(self.manager.delete_item, self.selected_item_id, on_done=done, busy=self.window)
+
+    def _movement(self, fn):
+        if self.selected_item_id is None:
+            messagebox.showwarning("Error", "Seleccione un insumo.", parent=self.window)
+            return
+        cantidad = self.read_int(self.entry_cantidad, "La cantidad")
+        if cantidad is None:
+            return
+
+        def done(result):
+            self.entry_cantidad.delete(0, tk.END)
+            self.load_items()
+            self.load_movements()
+        self.app.db_worker.call(fn, self.selected_item_id, cantidad, on_done=done, busy=self.window)
+
+    def receive(self):
+        self._movement(self.manager.receive)
+
+    def adjust(self):
+        self._movement(self.manager.adjust)
+
+    def load_recipe(self, event=None):
+        producto_id = self.products.get(self.combo_producto.get())
+        if producto_id is None:
+            return
+
+        def done(rows):
+            self.recipe = [(row.insumo_id, f"{row.nombre} ({row.unidad})", row.cantidad) for row in rows]
+            self.show_recipe()
+        self.app.db_worker.call(self.manager.get_recipe, producto_id, on_done=done, busy=self.window)
+
+    def show_recipe(self):
+        self.tree_receta.delete(*self.tree_receta.get_children())
+        for _, label, cantidad in self.recipe:
+            self.tree_receta.insert('', tk.END, values=(label, cantidad))
+
+    def add_ingredient(self):
+        label = self.combo_insumo.get()
+        if label not in self.items:
+            messagebox.showwarning("Error", "Seleccione un insumo.", parent=self.window)
+            return
+        cantidad = self.read_int(self.entry_receta_cantidad, "La cantidad")
+        if cantidad is None:
+            return
+        if cantidad <= 0:
+            messagebox.showwarning("Error", "La cantidad debe ser mayor a 0.", parent=self.window)
+            return
+        insumo_id = self.items[label]
+        self.recipe = [line for line in self.recipe if line[0] != insumo_id] + [(insumo_id, label, cantidad)]
+        self.show_recipe()
+
+    def remove_ingredient(self):
+        selection = self.tree_receta.selection()
+        if selection:
+            del self.recipe[self.tree_receta.index(selection[0])]
+            self.show_recipe()
+
+    def save_recipe(self):
+        producto_id = self.products.get(self.combo_producto.get())
+        if producto_id is None:
+            messagebox.showwarning("Error", "Seleccione un producto.", parent=self.window)
+            return
+
+        def done(result):
+            messagebox.showinfo("Receta", "Receta guardada con éxito.", parent=self.window)
+        self.app.db_worker.call(self.manager.set_recipe, producto_id,
+                                [(insumo_id, cantidad) for insumo_id, _, cantidad in self.recipe],
+                                on_done=done, busy=self.window)
+
+class SalesPointWindow:
+    def __init__(self, app):
+        self.app = app
+        self.window = tk.Toplevel(app.root)
+        self.window.title("Punto de Venta - Heladería")
+        self.window.geometry("520x1040")
+        
+        # Variables de control
+        self.selected_product_price = Money(0)
+        self.total_amount = Money(0)
+        self.cart = []  # Líneas del ticket en curso
+        self.sale_pending = False  # Hay un ticket cobrado que el worker todavía está registrando
+        self.search_job = None
+        self.catalog = app.product_manager.catalog
+        self.catalog_version = None
+        self.catalog_job = None
+        self.catalog_loading = False
+        self.products_data = {}
+        self.products_by_id = {}
+        self.labels_by_id = {}  # Código (id del producto) -> etiqueta del combobox
+        self.hotkeys = []       # Ids de los productos en F1..F12
+        self.clients_data = {}  # Etiqueta del combobox de clientes -> id
+        self.cliente_id = None  # Cliente de la venta en curso
+        self.client_search_job = None
+        
+        self.create_widgets()
+        self.load_hotkeys()
+        self.entry_codigo.focus_set()
+        self.catalog_job = self.window.after(CATALOG_POLL_MS, self.poll_catalog)
+        self.window.bind("<Destroy>", self.on_destroy)
+        
+    def on_destroy(self, event):
+        if event.widget is self.window and self.catalog_job:
+            self.window.after_cancel(self.catalog_job)
+            self.catalog_job = None
+        
+    def create_widgets(self):
+        # Frame principal
+        main_frame = ttk.Frame(self.window, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Venta rápida con teclado: código del producto (o cantidad*código) y Enter; Enter vacío cobra
+        quick_frame = ttk.LabelFrame(main_frame, text="Venta Rápida", padding="10")
+        quick_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Label(quick_frame, text="Código:").grid(row=0, column=0, sticky=tk.W, pady=5)
+        vcmd_code = (self.window.register(self.validate_code), '%P')
+        self.entry_codigo = ttk.Entry(quick_frame, width=12, validate='key', validatecommand=vcmd_code)
+        self.entry_codigo.grid(row=0, column=1, sticky=tk.W, padx=5, pady=5)
+        self.entry_codigo.bind("<Return>", self.on_code_entered)
+        self.entry_codigo.bind("<KP_Enter>", self.on_code_entered)
+        self.entry_codigo.bind("<Delete>", self.remove_last_line)
+        ttk.Label(quick_frame, text="cantidad*código, Enter vacío cobra, Supr quita la última línea",
+                  foreground="gray").grid(row=0, column=2, columnspan=2, sticky=tk.W)
+        
+        self.hotkeys_frame = ttk.Frame(quick_frame)
+        self.hotkeys_frame.grid(row=1, column=0, columnspan=4, sticky=tk.W)
+        for number in range(1, HOTKEYS + 1):
+            self.window.bind(f"<F{number}>", lambda event, index=number - 1: self.press_hotkey(index))
+        self.window.bind("<Escape>", self.focus_code)
+        
+        # Cliente (opcional): la venta queda a su nombre y se ven sus visitas y preferidos
+        client_frame = ttk.LabelFrame(main_frame, text="Cliente", padding="10")
+        client_frame.pack(fill=tk.X, pady=5)
+        self.combo_cliente = ttk.Combobox(client_frame, width=40)
+        self.combo_cliente.grid(row=0, column=0, sticky=tk.W, padx=5, pady=5)
+        self.combo_cliente.bind("<<ComboboxSelected>>", self.on_client_selected)
+        self.combo_cliente.bind("<KeyRelease>", self.schedule_client_search)
+        self.combo_cliente.bind("<Return>", self.pick_first_client)
+        ttk.Button(client_frame, text="Sin Cliente", command=self.clear_client).grid(row=0, column=1, padx=5)
+        self.label_cliente = ttk.Label(client_frame, text="", wraplength=460)
+        self.label_cliente.grid(row=1, column=0, columnspan=2, sticky=tk.W)
+        
+        # Sección de producto
+        product_frame = ttk.LabelFrame(main_frame, text="Selección de Producto", padding="10")
+        product_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Label(product_frame, text="Producto:").grid(row=0, column=0, sticky=tk.W, pady=5)
+        self.combo_producto = ttk.Combobox(product_frame, width=40)
+        self.combo_producto.grid(row=0, column=1, padx=5, pady=5)
+        self.combo_producto.bind("<<ComboboxSelected>>", self.on_product_selected)
+        self.combo_producto.bind("<KeyRelease>", self.schedule_search)
+        
+        # Precio unitario
+        ttk.Label(product_frame, text="Precio Unitario:").grid(row=1, column=0, sticky=tk.W, pady=5)
+        self.label_precio_unitario = ttk.Label(product_frame, text="$0.00")
+        self.label_precio_unitario.grid(row=1, column=1, sticky=tk.W, pady=5)
+        
+        # Cantidad
+        ttk.Label(product_frame, text="Cantidad:").grid(row=2, column=0, sticky=tk.W, pady=5)
+        vcmd = (self.window.register(self.validate_quantity), '%P')
+        self.entry_cantidad = ttk.Entry(product_frame, width=10, validate='key', validatecommand=vcmd)
+        self.entry_cantidad.grid(row=2, column=1, sticky=tk.W, pady=5)
+        self.entry_cantidad.bind("<KeyRelease>", self.update_total)
+        
+        btn_agregar = ttk.Button(product_frame, text="Agregar al Ticket", command=self.add_to_cart)
+        btn_agregar.grid(row=3, column=1, sticky=tk.W, pady=5)
+        
+        # Ticket en curso
+        cart_frame = ttk.LabelFrame(main_frame, text="Ticket", padding="10")
+        cart_frame.pack(fill=tk.X, pady=5)
+        
+        self.tree_ticket = ttk.Treeview(cart_frame, columns=('Producto', 'Cantidad', 'Subtotal'), show='headings', height=5)
+        self.tree_ticket.heading('Producto', text='Producto')
+        self.tree_ticket.heading('Cantidad', text='Cantidad')
+        self.tree_ticket.heading('Subtotal', text='Subtotal')
+        self.tree_ticket.column('Cantidad', width=70, anchor='center')
+        self.tree_ticket.column('Subtotal', width=90, anchor='e')
+        self.tree_ticket.pack(fill=tk.X)
+        
+        btn_quitar = ttk.Button(cart_frame, text="Quitar del Ticket", command=self.remove_from_cart)
+        btn_quitar.pack(pady=5)
+        
+        # Frame para el total
+        total_frame = ttk.LabelFrame(main_frame, text="Total", padding="10")
+        total_frame.pack(fill=tk.X, pady=10)
+        
+        # Total a pagar
+        ttk.Label(total_frame, text="Total a Pagar:").grid(row=0, column=0, sticky=tk.W, pady=5)
+        self.label_total = ttk.Label(total_frame, text="$0.00", font=('Arial', 12, 'bold'))
+        self.label_total.grid(row=0, column=1, sticky=tk.W, pady=5)
+        
+        # Frame para el pago
+        payment_frame = ttk.LabelFrame(main_frame, text="Pago", padding="10")
+        payment_frame.pack(fill=tk.X, pady=10)
+        
+        # Monto pagado
+        ttk.Label(payment_frame, text="Monto Pagado:").grid(row=0, column=0, sticky=tk.W, pady=5)
+        vcmd_payment = (self.window.register(self.validate_payment), '%P')
+        self.entry_pago = ttk.Entry(payment_frame, width=15, validate='key', validatecommand=vcmd_payment)
+        self.entry_pago.grid(row=0, column=1, sticky=tk.W, pady=5)
+        self.entry_pago.bind("<KeyRelease>", self.update_change)
+        self.entry_pago.bind("<Return>", lambda event: self.sell_product())
+        
+        # Vuelto
+        ttk.Label(payment_frame, text="Vuelto:").grid(row=1, column=0, sticky=tk.W, pady=5)
+        self.label_vuelto = ttk.Label(payment_frame, text="$0.00", font=('Arial', 12, 'bold'))
+        self.label_vuelto.grid(row=1, column=1, sticky=tk.W, pady=5)
+        
+        # Medio de pago (fuera del efectivo, se cobra el total justo)
+        ttk.Label(payment_frame, text="Medio de Pago:").grid(row=2, column=0, sticky=tk.W, pady=5)
+        self.combo_metodo = ttk.Combobox(payment_frame, values=METODOS_PAGO, state='readonly', width=15)
+        self.combo_metodo.set(METODOS_PAGO[0])
+        self.combo_metodo.grid(row=2, column=1, sticky=tk.W, pady=5)
+        
+        # Cobro rápido en efectivo: el total justo o un billete, sin tipear el monto
+        tender_frame = ttk.Frame(payment_frame)
+        tender_frame.grid(row=3, column=0, columnspan=2, sticky=tk.W, pady=5)
+        ttk.Button(tender_frame, text="Justo", width=7,
+                   command=lambda: self.sell_product(exacto=True)).pack(side=tk.LEFT, padx=2)
+        for pesos in QUICK_TENDER:
+            ttk.Button(tender_frame, text=f"${pesos}", width=7,
+                       command=lambda monto=Money(pesos * 100): self.tender(monto)).pack(side=tk.LEFT, padx=2)
+        
+        # Botón de venta
+        self.btn_vender = ttk.Button(main_frame, text="Realizar Venta", command=self.sell_product)
+        self.btn_vender.pack(pady=10)
+        
+        # Confirmaciones y avisos sin ventanas modales: la caja sigue atendiendo
+        self.label_estado = ttk.Label(main_frame, text="", font=('Arial', 11, 'bold'), wraplength=480)
+        self.label_estado.pack(pady=5)
+        
+        # Cargar productos
+        self.load_products()
+    
+    def validate_quantity(self, new_value):
+        """Validar que solo se ingresen números enteros positivos"""
+        return QUANTITY_RE.fullmatch(new_value) is not None
+    
+    def validate_payment(self, new_value):
+        """Validar que solo se ingresen números con hasta dos decimales"""
+        return PAYMENT_RE.fullmatch(new_value) is not None
+    
+    def validate_code(self, new_value):
+        return CODE_RE.fullmatch(new_value) is not None
+    
+    def load_products(self):
+        """Pedir el catálogo al hilo de base de datos (la caché en memoria, al día con la base)"""
+        if self.catalog_loading:
+            return
+        self.catalog_loading = True
+        
+        def failed(error):
+            self.catalog_loading = False
+            self.notify(f"No se pudo cargar el catálogo: {error}", error=True)
+        self.app.db_worker.call(self.catalog.snapshot, on_done=self.show_products, on_error=failed,
+                                busy=self.window)
+    
+    def poll_catalog(self):
+        """Buscar cada tanto cambios del catálogo hechos desde otro proceso o caja"""
+        self.load_products()
+        self.catalog_job = self.window.after(CATALOG_POLL_MS, self.poll_catalog)
+    
+    def show_products(self, snapshot):
+        """Cargar la lista de productos en el combobox y la tabla de códigos; si el catálogo
+        cambió, también los atajos y los precios del ticket en curso"""
+        self.catalog_loading = False
+        version, products = snapshot
+        if version == self.catalog_version:
+            return
+        first_load = self.catalog_version is None
+        self.catalog_version = version
+        self.products_data = {}
+        self.products_by_id = {}
+        self.labels_by_id = {}
+        for product in products:
+            label = f"{product.nombre} (ID: {product.id})"
+            self.products_data[label] = {"id": product.id, "precio": product.precio}
+            self.products_by_id[product.id] = product
+            self.labels_by_id[product.id] = label
+        self.combo_producto['values'] = list(self.products_data.keys())
+        if first_load:
+            return
+        
+        self.show_hotkeys()
+        for item in self.cart:
+            product = self.products_by_id.get(item["id"])
+            if product is not None:
+                item["precio"] = product.precio
+        for iid, item in zip(self.tree_ticket.get_children(), self.cart):
+            self.tree_ticket.item(iid, values=(item["nombre"], item["cantidad"],
+                                               f"${item['precio'] * item['cantidad']}"))
+        selected = self.combo_producto.get()
+        if selected in self.products_data:
+            self.selected_product_price = self.products_data[selected]["precio"]
+            self.label_precio_unitario.config(text=f"${self.selected_product_price}")
+        self.update_total()
+    
+    def load_hotkeys(self):
+        """Asignar F1..F12 a los más vendidos; si faltan, se completan con el orden del catálogo"""
+        hasta = today()
+        desde = (datetime.date.fromisoformat(hasta) - datetime.timedelta(days=HOTKEY_DAYS)).isoformat()
+        
+        def done(rows):
+            ids = [row[1] for row in rows if row[1] in self.labels_by_id]
+            ids += [product_id for product_id in self.labels_by_id if product_id not in ids]
+            self.hotkeys = ids[:HOTKEYS]
+            self.show_hotkeys()
+        
+        self.app.db_worker.call(self.app.report_manager.top_sellers, desde, hasta, HOTKEYS,
+                                on_done=done, on_error=lambda error: done([]), busy=self.window)
+    
+    def show_hotkeys(self):
+        for button in self.hotkeys_frame.winfo_children():
+            button.destroy()
+        self.hotkeys = [product_id for product_id in self.hotkeys if product_id in self.labels_by_id]
+        for index, product_id in enumerate(self.hotkeys):
+            nombre = self.products_by_id[product_id].nombre
+            ttk.Button(self.hotkeys_frame, text=f"F{index + 1}\n{nombre[:14]}", width=14,
+                       command=lambda product_id=product_id: self.add_item(product_id)
+                       ).grid(row=index // 4, column=index % 4, padx=2, pady=2)
+    
+    def press_hotkey(self, index):
+        if index < len(self.hotkeys):
+            self.add_item(self.hotkeys[index])
+        return 'break'
+    
+    def focus_code(self, event=None):
+        self.entry_codigo.delete(0, tk.END)
+        self.entry_codigo.focus_set()
+    
+    def notify(self, text, error=False):
+        """Aviso en la ventana, sin bloquearla; los errores además suenan"""
+        self.label_estado.config(text=text, foreground="red" if error else "dark green")
+        if error:
+            self.window.bell()
+    
+    def on_code_entered(self, event=None):
+        """Enter en el código: agregar el producto, o cobrar si el campo está vacío"""
+        if self.sale_in_flight():
+            return 'break'
+        text = self.entry_codigo.get()
+        if not text:
+            if self.cart or self.combo_producto.get():
+                self.sell_product()
+            return 'break'
+        cantidad, _, codigo = text.rpartition('*')
+        cantidad = int(cantidad or 1)
+        if not codigo or cantidad <= 0 or not self.add_item(int(codigo), cantidad):
+            self.notify(f"Código inválido: {text}", error=True)
+        else:
+            self.entry_codigo.delete(0, tk.END)
+        return 'break'
+    
+    def schedule_client_search(self, event=None):
+        """Buscar clientes mientras se escribe (nombre, dirección o teléfono)"""
+        if event is not None and event.keysym in ('Up', 'Down', 'Return', 'Escape', 'Tab'):
+            return
+        if self.cliente_id is not None and self.combo_cliente.get() not in self.clients_data:
+            self.cliente_id = None
+            self.label_cliente.config(text="")
+        if self.client_search_job:
+            self.window.after_cancel(self.client_search_job)
+        self.client_search_job = self.window.after(SEARCH_DELAY_MS, self.run_client_search)
+    
+    def run_client_search(self, then=None):
+        """Buscar en el hilo de base de datos; then() corre cuando la lista está al día"""
+        self.client_search_job = None
+        text = self.combo_cliente.get()
+        if text in self.clients_data or not text.strip():
+            if text in self.clients_data:
+                self.on_client_selected()
+            else:
+                self.combo_cliente['values'] = []
+            if then:
+                then()
+            return
+        
+        def done(clients):
+            if self.combo_cliente.get() != text:
+                return  # Se siguió escribiendo: ya hay otra búsqueda
+            labels = []
+            for client in clients:
+                label = f"{client.nombre} - {client.telefono or 'sin teléfono'} (ID: {client.id})"
+                self.clients_data[label] = client.id
+                labels.append(label)
+            self.combo_cliente['values'] = labels
+            if then:
+                then()
+        self.app.db_worker.call(self.app.client_manager.search_clients, text, on_done=done, busy=self.window)
+    
+    def pick_first_client(self, event=None):
+        """Enter en el cliente: tomar el primero de la búsqueda y volver al código"""
+        if self.client_search_job:
+            self.window.after_cancel(self.client_search_job)
+        self.run_client_search(then=self.choose_first_client)
+        self.entry_codigo.focus_set()
+        return 'break'
+    
+    def choose_first_client(self):
+        values = self.combo_cliente['values']
+        if self.combo_cliente.get() not in self.clients_data and values:
+            self.combo_cliente.set(values[0])
+        self.on_client_selected()
+    
+    def on_client_selected(self, event=None):
+        """Mostrar visitas, gasto y preferidos del cliente elegido (de las estadísticas ya calculadas)"""
+        cliente_id = self.clients_data.get(self.combo_cliente.get())
+        if cliente_id is None or cliente_id == self.cliente_id:
+            return
+        self.cliente_id = cliente_id
+        self.label_cliente.config(text="Cargando...")
+        
+        def done(summary):
+            if self.cliente_id != cliente_id:
+                return  # Ya se eligió otro cliente
+            stats, favorites, orders = summary
+            if stats is None:
+                self.label_cliente.config(text="Primera compra")
+                return
+            text = f"Visitas: {stats.visitas}  |  Gastado: ${stats.gasto}  |  Última visita: {stats.ultima_visita}"
+            if favorites:
+                text += "\nPreferidos: " + ", ".join(f"{row.nombre} ({row.cantidad})" for row in favorites)
+            if orders:
+                text += "\nÚltimos pedidos: " + ", ".join(f"{row.fecha} ${row.total}" for row in orders)
+            self.label_cliente.config(text=text)
+        
+        self.app.db_worker.call(self.app.loyalty_manager.get_client_summary, cliente_id, on_done=done,
+                                busy=self.window)
+    
+    def clear_client(self):
+        self.cliente_id = None
+        self.combo_cliente.set("")
+        self.combo_cliente['values'] = []
+        self.label_cliente.config(text="")
+    
+    def sale_in_flight(self):
+        """El ticket no cambia mientras se registra: avisar y devolver True si hay una venta en curso"""
+        if self.sale_pending:
+            self.notify("Registrando la venta anterior, espere un momento.", error=True)
+        return self.sale_pending
+    
+    def add_item(self, product_id, cantidad=1):
+        """Sumar un producto al ticket por su código; si ya está, se suma a su línea"""
+        if self.sale_in_flight():
+            return False
+        self.sync_catalog()
+        label = self.labels_by_id.get(product_id)
+        if label is None:
+            return False
+        precio = self.products_data[label]["precio"]
+        for index, item in enumerate(self.cart):
+            if item["id"] == product_id:
+                item["cantidad"] += cantidad
+                iid = self.tree_ticket.get_children()[index]
+                self.tree_ticket.item(iid, values=(label, item["cantidad"], f"${item['precio'] * item['cantidad']}"))
+                break
+        else:
+            self.cart.append({"id": product_id, "nombre": label, "precio": precio, "cantidad": cantidad})
+            self.tree_ticket.insert('', tk.END, values=(label, cantidad, f"${precio * cantidad}"))
+        self.notify(f"{cantidad} x {label}")
+        self.update_total()
+        return True
+    
+    def remove_last_line(self, event=None):
+        """Supr con el código vacío quita la última línea del ticket"""
+        if self.entry_codigo.get() or not self.cart:
+            return None
+        if self.sale_in_flight():
+            return 'break'
+        self.tree_ticket.delete(self.tree_ticket.get_children()[-1])
+        item = self.cart.pop()
+        self.notify(f"Quitado: {item['nombre']}")
+        self.update_total()
+        return 'break'
+    
+    def schedule_search(self, event=None):
+        """Filtrar el combobox mientras se escribe, con una espera entre teclas"""
+        if event is not None and event.keysym in ('Up', 'Down', 'Return', 'Escape', 'Tab'):
+            return
+        if self.search_job:
+            self.window.after_cancel(self.search_job)
+        self.search_job = self.window.after(SEARCH_DELAY_MS, self.run_search)
+    
+    def run_search(self):
+        self.search_job = None
+        text = self.combo_producto.get()
+        if text in self.products_data:
+            self.on_product_selected()
+            return
+        if not text.strip():
+            self.combo_producto['values'] = list(self.products_data.keys())
+            return
+        
+        def done(products):
+            if self.combo_producto.get() != text:
+                return  # Se siguió escribiendo: ya hay otra búsqueda
+            labels = []
+            for product in products:
+                label = f"{product.nombre} (ID: {product.id})"
+                self.products_data[label] = {"id": product.id, "precio": product.precio}
+                labels.append(label)
+            self.combo_producto['values'] = labels
+        self.app.db_worker.call(self.app.product_manager.search_products, text, on_done=done, busy=self.window)
+    
+    def sync_catalog(self):
+        """Si el catálogo en memoria cambió (precios, altas, bajas), volver a cargarlo"""
+        if self.catalog_version != self.catalog.version:
+            self.load_products()
+    
+    def on_product_selected(self, event=None):
+        """Actualizar el precio unitario cuando se selecciona un producto"""
+        self.sync_catalog()
+        selected = self.combo_producto.get()
+        if selected in self.products_data:
+            self.selected_product_price = self.products_data[selected]["precio"]
+            self.label_precio_unitario.config(text=f"${self.selected_product_price}")
+            self.update_total()
+        else:
+            self.selected_product_price = Money(0)
+            self.label_precio_unitario.config(text="$0.00")
+    
+    def cart_total(self):
+        """Total de las líneas ya agregadas al ticket"""
+        return sum((item["precio"] * item["cantidad"] for item in self.cart), Money(0))
+    
+    def add_to_cart(self):
+        """Agregar el producto seleccionado al ticket en curso"""
+        if self.sale_in_flight():
+            return False
+        selected = self.combo_producto.get()
+        if selected not in self.products_data:
+            self.notify("Debe seleccionar un producto.", error=True)
+            return False
+        
+        cantidad = int(self.entry_cantidad.get() or 0)
+        if cantidad <= 0:
+            self.notify("La cantidad debe ser mayor a 0.", error=True)
+            self.entry_cantidad.focus_set()
+            return False
+        
+        product = self.products_data[selected]
+        self.cart.append({"id": product["id"], "nombre": selected,
+                          "precio": product["precio"], "cantidad": cantidad})
+        self.tree_ticket.insert('', tk.END, values=(selected, cantidad, f"${product['precio'] * cantidad}"))
+        
+        # Dejar la selección lista para la próxima línea
+        self.combo_producto.set("")
+        self.entry_cantidad.delete(0, tk.END)
+        self.selected_product_price = Money(0)
+        self.label_precio_unitario.config(text="$0.00")
+        self.update_total()
+        return True
+    
+    def remove_from_cart(self):
+        """Quitar la línea seleccionada del ticket"""
+        if self.sale_in_flight():
+            return
+        selected_item = self.tree_ticket.selection()
+        if not selected_item:
+            self.notify("Seleccione una línea del ticket para quitar.", error=True)
+            return
+        index = self.tree_ticket.index(selected_item[0])
+        self.tree_ticket.delete(selected_item[0])
+        del self.cart[index]
+        self.update_total()
+    
+    def update_total(self, event=None):
+        """Actualizar el total basado en el ticket y la línea en edición"""
+        self.sync_catalog()
+        try:
+            cantidad = int(self.entry_cantidad.get() or 0)
+            self.total_amount = self.cart_total() + self.selected_product_price * cantidad
+            self.label_total.config(text=f"${self.total_amount}")
+            self.update_change()  # Actualizar el vuelto también
+        except ValueError:
+            self.total_amount = self.cart_total()
+            self.label_total.config(text=f"${self.total_amount}")
+    
+    def update_change(self, event=None):
+        """Actualizar el vuelto basado en el monto pagado y el total"""
+        try:
+            monto_pagado = Money.parse(self.entry_pago.get() or 0)
+            vuelto = monto_pagado - self.total_amount
+            self.label_vuelto.config(text=f"${vuelto}")
+            # Cambiar el color del vuelto según si es suficiente o no
+            if vuelto >= 0:
+                self.label_vuelto.config(foreground="dark green")
+            else:
+                self.label_vuelto.config(foreground="red")
+        except ValueError:
+            self.label_vuelto.config(text="$0.00", foreground="black")
+    
+    def tender(self, monto):
+        """Cobrar en efectivo con un billete"""
+        self.combo_metodo.set('efectivo')
+        self.entry_pago.delete(0, tk.END)
+        self.entry_pago.insert(0, str(monto))
+        self.sell_product()
+    
+    def sell_product(self, exacto=False):
+        """Realizar la venta de todo el ticket; exacto cobra el total justo"""
+        if self.sale_in_flight():
+            return
+        self.update_total()  # Por si cambió algún precio del catálogo
+        # Una línea seleccionada y no agregada todavía también forma parte del ticket
+        if self.combo_producto.get() and not self.add_to_cart():
+            return
+        
+        if not self.cart:
+            self.notify("Debe seleccionar un producto.", error=True)
+            return
+            
+        metodo_pago = self.combo_metodo.get()
+        try:
+            monto_pagado = Money.parse(self.entry_pago.get() or 0)
+        except ValueError as e:
+            self.notify(str(e), error=True)
+            self.entry_pago.focus_set()
+            return
+        if exacto or metodo_pago != 'efectivo':
+            monto_pagado = self.total_amount
+        if monto_pagado < self.total_amount:
+            self.notify("El monto pagado es insuficiente.", error=True)
+            self.entry_pago.focus_set()
+            return
+        
+        def done(result):
+            self.sale_pending = False
+            self.btn_vender.config(state=tk.NORMAL)
+            # El vuelto sale del total que registró la venta (igual al cotizado: si no, se rechaza)
+            # y queda a la vista hasta el próximo aviso, sin cerrar ningún diálogo
+            vuelto = monto_pagado - result
+            cliente = f" a {self.combo_cliente.get().split(' - ')[0]}" if cliente_id is not None else ""
+            self.reset_fields()
+            self.notify(f"Venta realizada{cliente}: total ${result}, pagado ${monto_pagado} ({metodo_pago}), "
+                        f"vuelto ${vuelto}")
+            self.entry_codigo.focus_set()
+        
+        def failed(error):
+            self.sale_pending = False
+            self.btn_vender.config(state=tk.NORMAL)
+            # El ticket queda como estaba; si cambiaron los precios, el catálogo recarga el total
+            self.notify(f"No se registró la venta: {error}", error=True)
+            self.load_products()
+        
+        # Realizar la venta (todas las líneas en una sola transacción) sin bloquear la caja. El
+        # ticket queda fijo hasta que termina y se manda el total cotizado: si otra caja o proceso
+        # cambió un precio, la venta se rechaza en vez de cobrar un importe distinto del mostrado
+        items = [(item["id"], item["cantidad"]) for item in self.cart]
+        cliente_id = self.cliente_id
+        self.sale_pending = True  # Evitar cobrar dos veces el mismo ticket o cambiarlo a medio registrar
+        self.btn_vender.config(state=tk.DISABLED)
+        self.app.db_worker.call(self.app.sales_manager.sell_ticket, items, cliente_id, metodo_pago,
+                                self.total_amount, on_done=done, on_error=failed, busy=self.window)
+    
+    def reset_fields(self):
+        """Limpiar todos los campos después de una venta"""
+        self.entry_codigo.delete(0, tk.END)
+        self.combo_producto.set("")
+        self.entry_cantidad.delete(0, tk.END)
+        self.entry_pago.delete(0, tk.END)
+        for row in self.tree_ticket.get_children():
+            self.tree_ticket.delete(row)
+        self.cart = []
+        self.label_precio_unitario.config(text="$0.00")
+        self.label_total.config(text="$0.00")
+        self.label_vuelto.config(text="$0.00", foreground="black")
+        self.combo_metodo.set(METODOS_PAGO[0])
+        self.clear_client()
+        self.selected_product_price = Money(0)
+        self.total_amount = Money(0)
+
+class SalesReportWindow:
+    def __init__(self, app):
+        self.app = app
+        self.window = tk.Toplevel(app.root)
+        self.window.title("Cierre de Caja - Heladería")
+        self.window.geometry("750x500")
+
+        total_frame = tk.Frame(self.window)
+        total_frame.pack(pady=10)
+        btn_ver_total = tk.Button(total_frame, text="Ver Total de Ventas", command=self.show_total_sales)
+        btn_ver_total.pack(side=tk.LEFT, padx=5)
+        btn_cerrar = tk.Button(total_frame, text="Cerrar el Día", command=self.close_day)
+        btn_cerrar.pack(side=tk.LEFT, padx=5)
+
+        # Rango del reporte
+        range_frame = tk.Frame(self.window)
+        range_frame.pack(pady=5)
+        hoy = today()
+        tk.Label(range_frame, text="Desde (AAAA-MM-DD):").pack(side=tk.LEFT)
+        self.entry_desde = tk.Entry(range_frame, width=12)
+        self.entry_desde.insert(0, hoy[:8] + '01')  # Primer día del mes
+        self.entry_desde.pack(side=tk.LEFT, padx=5)
+        tk.Label(range_frame, text="Hasta:").pack(side=tk.LEFT)
+        self.entry_hasta = tk.Entry(range_frame, width=12)
+        self.entry_hasta.insert(0, hoy)
+        self.entry_hasta.pack(side=tk.LEFT, padx=5)
+        btn_reporte = tk.Button(range_frame, text="Generar Reporte", command=self.show_report)
+        btn_reporte.pack(side=tk.LEFT, padx=5)
+
+        notebook = ttk.Notebook(self.window)
+        notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.tree_productos = self.add_tab(notebook, "Productos", ('Puesto', 'Producto', 'Cantidad', 'Total', '%'))
+        self.tree_categorias = self.add_tab(notebook, "Categorías", ('Categoría', 'Cantidad', 'Total', '%'))
+        self.tree_horas = self.add_tab(notebook, "Por Hora", ('Hora', 'Ventas', 'Cantidad', 'Total', '%'))
+        self.tree_dias = self.add_tab(notebook, "Por Día", ('Fecha', 'Ventas', 'Total', 'Acumulado', 'Promedio 7 días'))
+        self.tree_comparacion = self.add_tab(notebook, "Comparación",
+                                             ('Producto', 'Total', 'Período Anterior', 'Variación'))
+        self.label_comparacion = ttk.Label(self.window, text="")
+        self.label_comparacion.pack(pady=5)
+
+    def add_tab(self, notebook, title, columns):
+        frame = ttk.Frame(notebook)
+        notebook.add(frame, text=title)
+        tree = ttk.Treeview(frame, columns=columns, show='headings')
+        for column in columns:
+            tree.heading(column, text=column)
+            tree.column(column, width=110, anchor='e')
+        tree.column(columns[0], anchor='w')
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill='y')
+        return tree
+
+    def fill(self, tree, rows):
+        tree.delete(*tree.get_children())
+        for row in rows:
+            tree.insert('', tk.END, values=row)
+
+    def show_report(self):
+        desde = self.entry_desde.get().strip()
+        hasta = self.entry_hasta.get().strip()
+        try:
+            if datetime.date.fromisoformat(desde) > datetime.date.fromisoformat(hasta):
+                raise ValueError
+        except ValueError:
+            messagebox.showwarning("Error", "Ingrese un rango de fechas válido (AAAA-MM-DD).")
+            return
+
+        def done(report):
+            self.fill(self.tree_productos, [(puesto, nombre, cantidad, f"${total}", f"{porcentaje:.1f}%")
+                                            for _, nombre, cantidad, total, porcentaje, puesto in report['productos']])
+            self.fill(self.tree_categorias, [(categoria, cantidad, f"${total}", f"{porcentaje:.1f}%")
+                                             for categoria, cantidad, total, porcentaje in report['categorias']])
+            self.fill(self.tree_horas, [(f"{hora:02d}:00" if hora is not None else "Sin hora", ventas, cantidad,
+                                         f"${total}", f"{porcentaje:.1f}%")
+                                        for hora, ventas, cantidad, total, porcentaje in report['horas']])
+            self.fill(self.tree_dias, [(fecha, ventas, f"${total}", f"${acumulado}", f"${promedio}")
+                                       for fecha, ventas, total, acumulado, promedio in report['dias']])
+            desde_anterior, hasta_anterior, rows = report['comparacion']
+            self.fill(self.tree_comparacion, [(nombre, f"${actual}", f"${anterior}",
+                                               f"{variacion:+.1f}%" if variacion is not None else "-")
+                                              for _, nombre, actual, anterior, variacion in rows])
+            actual = sum((row[2] for row in rows), Money(0))
+            anterior = sum((row[3] for row in rows), Money(0))
+            self.label_comparacion.config(
+                text=f"Total: ${actual}  |  Período anterior ({desde_anterior} a {hasta_anterior}): ${anterior}")
+
+        self.app.db_worker.call(self.app.report_manager.sales_report, desde, hasta, on_done=done, busy=self.window)
+
+    def show_total_sales(self):
+        def done(total_ventas):
+            messagebox.showinfo("Total de Ventas", f"Total de ventas del día: ${total_ventas}")
+        self.app.db_worker.call(self.app.sales_manager.get_daily_total, on_done=done, busy=self.window)
+
+    def close_day(self):
+        if not messagebox.askyesno("Cerrar el Día", "¿Cerrar la caja de hoy? El cierre no se puede modificar.",
+                                   parent=self.window):
+            return
+
+        def done(closing):
+            cierre, _, pagos = closing
+            detalle = '\n'.join(f"{pago.metodo_pago}: {pago.pagos} pagos, ${pago.total}" for pago in pagos)
+            messagebox.showinfo("Cierre de Caja",
+                                f"Caja del {cierre.fecha} cerrada: {cierre.pedidos} pedidos, {cierre.ventas} ventas, "
+                                f"total ${cierre.total}"
+                                + (f"\n\n{detalle}" if detalle else ''), parent=self.window)
+            # Con el día cerrado, pasar los pedidos viejos al archivo sin bloquear la ventana
+            self.app.db_worker.call(self.app.sales_manager.archive_sales)
+
+        self.app.db_worker.call(self.app.sales_manager.close_day, on_done=done, busy=self.window)
+
+class BackupWindow:
+    """Respaldos guardados, avance del respaldo en curso y tiempos del último"""
+    REFRESH_MS = 200
+
+    def __init__(self, app):
+        self.app = app
+        self.manager = app.backup_manager
+        self.window = tk.Toplevel(app.root)
+        self.window.title("Respaldos - Heladería")
+        self.window.geometry("600x400")
+
+        top_frame = tk.Frame(self.window)
+        top_frame.pack(fill=tk.X, padx=10, pady=5)
+        tk.Label(top_frame, text=f"Carpeta: {self.manager.directory}").pack(side=tk.LEFT)
+        self.btn_respaldar = tk.Button(top_frame, text="Respaldar Ahora", command=self.backup)
+        self.btn_respaldar.pack(side=tk.RIGHT, padx=5)
+
+        self.progressbar = ttk.Progressbar(self.window, maximum=1.0)
+        self.progressbar.pack(fill=tk.X, padx=10, pady=5)
+        self.label_estado = ttk.Label(self.window, text="")
+        self.label_estado.pack(anchor='w', padx=10)
+
+        columns = ('Fecha', 'Archivos', 'Tamaño')
+        self.tree_respaldos = ttk.Treeview(self.window, columns=columns, show='headings')
+        for column in columns:
+            self.tree_respaldos.heading(column, text=column)
+        self.tree_respaldos.column('Archivos', width=320)
+        self.tree_respaldos.column('Tamaño', width=90, anchor='e')
+        self.tree_respaldos.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        self.load_snapshots()
+        self.refresh()
+
+    def load_snapshots(self):
+        self.tree_respaldos.delete(*self.tree_respaldos.get_children())
+        for fecha, paths in self.manager.snapshots():
+            size = sum(os.path.getsize(path) for path in paths)
+            self.tree_respaldos.insert('', tk.END, values=(
+                fecha.strftime('%Y-%m-%d %H:%M:%S'), ', '.join(os.path.basename(path) for path in paths),
+                f"{size / 1024 / 1024:.1f} MB"))
+
+    def backup(self):
+        def done(result):
+            if self.window.winfo_exists():
+                self.load_snapshots()
+        self.app.run_backup(on_done=done)
+
+    def refresh(self):
+        if not self.window.winfo_exists():
+            return
+        progress = self.manager.progress
+        if progress is not None:
+            etapa, hechas, total = progress
+            self.progressbar['value'] = hechas / total if total else 0
+            self.label_estado.config(text=f"Respaldando: {etapa} ({hechas} de {total})")
+            self.btn_respaldar.config(state=tk.DISABLED)
+        else:
+            self.progressbar['value'] = 0
+            self.btn_respaldar.config(state=tk.NORMAL)
+            last = self.manager.last
+            self.label_estado.config(text="" if last is None else (
+                f"Último respaldo: {last['paginas']} páginas, {last['bytes'] / 1024 / 1024:.1f} MB; "
+                f"copia {last['copia']:.2f} s, verificación {last['verificacion']:.2f} s, "
+                f"compresión {last['compresion']:.2f} s"))
+        self.window.after(self.REFRESH_MS, self.refresh)
+
+class DiagnosticsWindow:
+    """Estadísticas del perfilado de consultas: tiempos por sentencia y consultas lentas"""
+    REFRESH_MS = 2000
+
+    def __init__(self, app):
+        self.app = app
+        self.profiler = app.db.profiler
+        self.window = tk.Toplevel(app.root)
+        self.window.title("Diagnóstico - Heladería")
+        self.window.geometry("900x550")
+
+        top_frame = tk.Frame(self.window)
+        top_frame.pack(fill=tk.X, padx=10, pady=5)
+        self.var_activo = tk.BooleanVar(value=self.profiler.enabled)
+        tk.Checkbutton(top_frame, text="Perfilado activo", variable=self.var_activo,
+                       command=self.toggle_profiling).pack(side=tk.LEFT)
+        tk.Button(top_frame, text="Exportar...", command=self.export).pack(side=tk.RIGHT, padx=5)
+        tk.Button(top_frame, text="Reiniciar", command=self.reset).pack(side=tk.RIGHT, padx=5)
+        tk.Button(top_frame, text="Actualizar", command=self.refresh).pack(side=tk.RIGHT, padx=5)
+
+        columns = ('Sitio', 'Sentencia', 'Llamadas', 'Total ms', 'p50 ms', 'p99 ms', 'Máx ms')
+        self.tree_sentencias = ttk.Treeview(self.window, columns=columns, show='headings', height=12)
+        for column in columns:
+            self.tree_sentencias.heading(column, text=column)
+            self.tree_sentencias.column(column, width=80, anchor='e')
+        self.tree_sentencias.column('Sitio', width=200, anchor='w')
+        self.tree_sentencias.column('Sentencia', width=300, anchor='w')
+        self.tree_sentencias.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        tk.Label(self.window, text="Consultas lentas:").pack(anchor='w', padx=10)
+        slow_frame = tk.Frame(self.window)
+        slow_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        self.list_lentas = tk.Listbox(slow_frame, height=8)
+        self.list_lentas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.list_lentas.bind('<<ListboxSelect>>', self.show_plan)
+        self.text_plan = tk.Text(slow_frame, height=8, width=50, state=tk.DISABLED)
+        self.text_plan.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=(5, 0))
+
+        self.lentas = []
+        self.refresh()
+
+    def toggle_profiling(self):
+        # Se cambia desde el hilo de base de datos, que es el dueño de la conexión de escritura
+        self.app.db_worker.call(self.app.db.set_profiling, self.var_activo.get())
+
+    def refresh(self):
+        if not self.window.winfo_exists():
+            return
+        snapshot = self.profiler.snapshot()
+        self.tree_sentencias.delete(*self.tree_sentencias.get_children())
+        for row in snapshot['sentencias']:
+            self.tree_sentencias.insert('', tk.END, values=(
+                row['sitio'], row['sql'], row['llamadas'], f"{row['total_ms']:.1f}",
+                f"{row['p50_ms']:.2f}", f"{row['p99_ms']:.2f}", f"{row['max_ms']:.2f}"))
+        if snapshot['lentas'] != self.lentas:
+            self.lentas = snapshot['lentas']
+            self.list_lentas.delete(0, tk.END)
+            for lenta in reversed(self.lentas):
+                self.list_lentas.insert(tk.END, f"{lenta['hora']}  {lenta['ms']:.1f} ms  {lenta['sitio']}")
+        self.window.after(self.REFRESH_MS, self.refresh)
+
+    def show_plan(self, event):
+        selection = self.list_lentas.curselection()
+        if not selection:
+            return
+        lenta = self.lentas[len(self.lentas) - 1 - selection[0]]
+        self.text_plan.config(state=tk.NORMAL)
+        self.text_plan.delete('1.0', tk.END)
+        self.text_plan.insert(tk.END, lenta['sql'] + "\n\n" + "\n".join(lenta['plan'] or ["(sin plan)"]))
+        self.text_plan.config(state=tk.DISABLED)
+
+    def reset(self):
+        self.profiler.reset()
+        self.lentas = None
+        self.list_lentas.delete(0, tk.END)
+        self.tree_sentencias.delete(*self.tree_sentencias.get_children())
+
+    def export(self):
+        path = filedialog.asksaveasfilename(title="Exportar Diagnóstico", defaultextension=".json",
+                                            filetypes=[("JSON", "*.json")], parent=self.window)
+        if not path:
+            return
+        try:
+            self.profiler.export(path)
+        except OSError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        messagebox.showinfo("Exportación", f"Diagnóstico guardado en {path}")
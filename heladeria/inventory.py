@@ -0,0 +1,83 @@
+import sqlite3
+
+from .dao import InventoryRepository
+from .database import PAGE_SIZE
+
+
+class InventoryManager:
+    """Stock de insumos (potes, cucuruchos, paletas...), recetas de cada producto e historial de movimientos"""
+    def __init__(self, db):
+        self.db = db
+        self.repository = InventoryRepository(db)
+
+    def _write(self, fn):
+        """Ejecutar fn(connection) en una transacción de la conexión de escritura"""
+        connection = self.db.connection
+        try:
+            result = fn(connection)
+            connection.commit()
+        except (sqlite3.Error, ValueError):
+            connection.rollback()
+            raise
+        return result
+
+    def add_item(self, nombre, unidad='unidad', stock=0, minimo=0, producto_id=None):
+        """Agregar un insumo; con producto_id, el producto lo consume de a uno (stock por producto)"""
+        def add(connection):
+            insumo_id = self.repository.insert(connection, nombre, unidad, stock, minimo)
+            if stock:
+                self.repository.add_movement(connection, insumo_id, stock, stock, 'alta')
+            if producto_id is not None:
+                self.repository.add_recipe(connection, producto_id, [(insumo_id, 1)])
+            return insumo_id
+        return self._write(add)
+
+    def get_items(self):
+        return self.repository.items()
+
+    def get_item(self, insumo_id):
+        return self.repository.item(insumo_id)
+
+    def update_item(self, insumo_id, nombre, unidad, minimo):
+        self._write(lambda connection: self.repository.update(connection, insumo_id, nombre, unidad, minimo))
+
+    def delete_item(self, insumo_id):
+        self._write(lambda connection: self.repository.delete(connection, insumo_id))
+
+    def receive(self, insumo_id, cantidad, motivo='ingreso'):
+        """Sumar (o restar, con cantidad negativa) stock; devuelve el stock resultante"""
+        def receive(connection):
+            row = self.repository.add_stock(connection, insumo_id, cantidad)
+            if row is None:
+                raise ValueError("Insumo no encontrado")
+            _, stock = row
+            self.repository.add_movement(connection, insumo_id, cantidad, stock, motivo)
+            return stock
+        return self._write(receive)
+
+    def adjust(self, insumo_id, stock):
+        """Fijar el stock contado; el movimiento registra la diferencia con el stock del sistema"""
+        def adjust(connection):
+            if not self.repository.set_stock(connection, insumo_id, stock):
+                raise ValueError("Insumo no encontrado")
+        self._write(adjust)
+
+    def low_stock(self, margen=0):
+        """Insumos con stock - minimo <= margen, los más urgentes primero (lee el índice idx_insumos_faltante)"""
+        return self.repository.low_stock(margen)
+
+    def get_recipe(self, producto_id):
+        """(insumo_id, nombre, unidad, cantidad) que consume una unidad del producto"""
+        return self.repository.recipe(producto_id)
+
+    def set_recipe(self, producto_id, ingredientes):
+        """Reemplazar la receta de un producto por [(insumo_id, cantidad), ...]"""
+        for _, cantidad in ingredientes:
+            if cantidad <= 0:
+                raise ValueError("La cantidad de cada insumo debe ser mayor a 0")
+
+        self._write(lambda connection: self.repository.replace_recipe(connection, producto_id, ingredientes))
+
+    def movements(self, insumo_id, before_id=None, limit=PAGE_SIZE):
+        """Movimientos de un insumo del más reciente al más antiguo, por páginas (id < before_id)"""
+        return self.repository.movements(insumo_id, before_id, limit)
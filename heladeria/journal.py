@@ -0,0 +1,201 @@
+"""Diario de ventas para el modo de escritura diferida.
+
+Cada ticket se agrega como una línea JSON a un archivo de solo anexado con una única
+llamada a write(): si el proceso se cae, la venta ya está en el sistema operativo. Un
+hilo descargador hace fsync del archivo por grupos y pasa los tickets pendientes a
+pedidos (Pedidos, Ventas y Pagos) en una sola transacción, junto con la secuencia de
+la última entrada aplicada (tabla DiariosAplicados). Al abrir el diario se aplican las
+entradas que hayan quedado sin pasar, así ninguna venta se pierde ni se registra dos veces.
+
+Quien abre el diario lo bloquea (flock) mientras lo usa: otro proceso con el mismo archivo
+recibe JournalInUse en vez de aplicar y vaciar entradas que el dueño todavía está anotando.
+"""
+import json
+import os
+import sqlite3
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+from .dao import InventoryRepository, OrderRepository
+from .money import Money
+
+FLUSH_INTERVAL = 0.05            # Segundos entre descargas a la base
+FLUSH_GROUP_SIZE = 200           # Tickets pendientes que adelantan la descarga
+JOURNAL_MAX_BYTES = 1024 * 1024  # Con todo aplicado, el archivo se vacía al pasar este tamaño
+
+
+class JournalInUse(Exception):
+    """Otro proceso (la interfaz, el servidor de ventas) tiene abierto el diario"""
+
+
+class SalesJournal:
+    def __init__(self, db, path, flush_interval=FLUSH_INTERVAL):
+        self.db = db
+        self.path = path
+        # Clave en DiariosAplicados: la ruta resuelta, así dos diarios con el mismo nombre
+        # en distintas carpetas no se saltean las entradas uno al otro
+        self.name = os.path.realpath(path)
+        self.flush_interval = flush_interval
+        self.connection = db.open_writer()  # Conexión propia: sus transacciones no se mezclan con las de la interfaz
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(self._fd)
+                self.connection.close()
+                raise JournalInUse(f"El diario {path} está en uso por otro proceso") from None
+        self.orders = OrderRepository(db)
+        self.inventory = InventoryRepository(db)
+        self.last_error = None
+
+        self._lock = threading.Lock()        # Secuencia, archivo y pendientes
+        self._flush_lock = threading.Lock()  # Una descarga a la vez
+        self._pending = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+        try:
+            self._claim_legacy_name(os.path.basename(path))
+            self._seq = self.replay()
+        except (OSError, sqlite3.Error):
+            os.close(self._fd)
+            self.connection.close()
+            raise
+        self._thread = threading.Thread(target=self._run, name='heladeria-diario', daemon=True)
+        self._thread.start()
+
+    def _claim_legacy_name(self, legacy):
+        """Los diarios anteriores se anotaban sólo con el nombre del archivo: el primero que se
+        abre con ese nombre pasa la secuencia a su ruta completa"""
+        try:
+            self.connection.execute('''
+                UPDATE DiariosAplicados SET diario = ?
+                WHERE diario = ? AND NOT EXISTS (SELECT 1 FROM DiariosAplicados WHERE diario = ?)
+            ''', (self.name, legacy, self.name))
+            self.connection.commit()
+        except sqlite3.Error:
+            self.connection.rollback()
+            raise
+
+    def applied_seq(self):
+        row = self.connection.execute('SELECT secuencia FROM DiariosAplicados WHERE diario = ?',
+                                      (self.name,)).fetchone()
+        return row[0] if row else 0
+
+    def read_entries(self):
+        """Entradas completas del archivo; una última línea cortada por una caída se descarta"""
+        try:
+            f = open(self.path, encoding='utf-8')
+        except FileNotFoundError:
+            return []
+        entries = []
+        with f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    break
+        return entries
+
+    def replay(self):
+        """Aplicar las entradas que no llegaron a la base y vaciar el archivo; devuelve la última secuencia"""
+        entries = self.read_entries()
+        if entries:
+            self._apply(entries)
+        applied = self.applied_seq()
+        os.ftruncate(self._fd, 0)
+        os.fsync(self._fd)
+        return applied
+
+    def append(self, filas, fecha, hora, cliente_id=None, metodo_pago='efectivo'):
+        """Registrar un ticket [(producto_id, cantidad, precio_total), ...]; devuelve su secuencia"""
+        with self._lock:
+            self._seq += 1
+            entry = [self._seq, fecha, hora, [list(fila) for fila in filas], cliente_id, metodo_pago]
+            os.write(self._fd, (json.dumps(entry, separators=(',', ':')) + '\n').encode('utf-8'))
+            self._pending.append(entry)
+            if len(self._pending) >= FLUSH_GROUP_SIZE:
+                self._wake.set()
+            return self._seq
+
+    def _apply(self, entries):
+        try:
+            # Se vuelve a leer la secuencia dentro de la transacción: si otro proceso ya
+            # aplicó estas entradas (por ejemplo, "python -m heladeria --diario"), se saltean
+            self.connection.execute('BEGIN IMMEDIATE')
+            applied = self.applied_seq()
+            entries = [entry for entry in entries if entry[0] > applied]
+            if not entries:
+                self.connection.rollback()
+                return
+            for entry in entries:
+                # Las entradas de antes de la migración 7 no traen cliente ni medio de pago
+                _, fecha, hora, filas, cliente_id, metodo_pago = entry + [None, 'efectivo'][len(entry) - 4:]
+                # Los importes se anotan en centavos; un float es una entrada en pesos de antes de la migración 5
+                filas = [(product_id, cantidad,
+                          Money(precio_total) if isinstance(precio_total, int) else Money.parse(precio_total))
+                         for product_id, cantidad, precio_total in filas]
+                total = sum((fila[2] for fila in filas), Money(0))
+                self.orders.record(self.connection, filas, cliente_id, 'entregado', [(total, metodo_pago)], fecha, hora)
+            # Ventas ya confirmadas: el stock se descuenta aunque quede negativo
+            fecha, hora = entries[-1][1:3]
+            self.inventory.consume(self.connection, [(product_id, cantidad)
+                                                     for entry in entries
+                                                     for product_id, cantidad, _ in entry[3]], fecha, hora)
+            self.connection.execute('''
+                INSERT INTO DiariosAplicados (diario, secuencia) VALUES (?, ?)
+                ON CONFLICT (diario) DO UPDATE SET secuencia = excluded.secuencia
+            ''', (self.name, entries[-1][0]))
+            self.connection.commit()
+        except sqlite3.Error:
+            self.connection.rollback()
+            raise
+
+    def flush(self):
+        """fsync del diario y pasaje de los tickets pendientes a la base; devuelve cuántos se aplicaron"""
+        with self._flush_lock:
+            with self._lock:
+                entries, self._pending = self._pending, []
+            if not entries:
+                return 0
+            try:
+                os.fsync(self._fd)
+                self._apply(entries)
+            except (OSError, sqlite3.Error) as e:
+                # Los tickets siguen en el diario; se reintenta en la próxima descarga
+                with self._lock:
+                    self._pending[:0] = entries
+                self.last_error = e
+                raise
+            self.last_error = None
+            with self._lock:
+                if not self._pending and os.fstat(self._fd).st_size > JOURNAL_MAX_BYTES:
+                    os.ftruncate(self._fd, 0)
+            return len(entries)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except (OSError, sqlite3.Error):
+                pass  # Queda en last_error
+
+    def close(self):
+        """Detener el descargador, aplicar lo pendiente y soltar el diario"""
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        try:
+            self.flush()
+        finally:
+            os.close(self._fd)
+            self.connection.close()
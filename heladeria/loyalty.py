@@ -0,0 +1,50 @@
+import datetime
+
+from .dao import LoyaltyRepository, OrderRepository
+from .database import PAGE_SIZE, today
+
+FAVORITES = 3         # Productos preferidos que se muestran por cliente
+RECENT_ORDERS = 5     # Últimos pedidos en el resumen de la caja
+TOP_ORDERS = ('gasto', 'visitas')
+
+
+class LoyaltyManager:
+    """Fidelidad de clientes: visitas, gasto y productos preferidos. Se leen de EstadisticasCliente
+    y ClienteProducto, que los triggers actualizan con cada pedido, sin recorrer Ventas."""
+    def __init__(self, db):
+        self.db = db
+        self.repository = LoyaltyRepository(db)
+        self.orders = OrderRepository(db)
+
+    def get_client_stats(self, cliente_id):
+        """(visitas, gasto, primera_visita, ultima_visita) o None si el cliente no compró"""
+        return self.repository.stats(cliente_id)
+
+    def get_favorites(self, cliente_id, limit=FAVORITES):
+        """(producto_id, nombre, veces, cantidad, total) de lo que más compra el cliente"""
+        return self.repository.favorites(cliente_id, limit)
+
+    def get_client_summary(self, cliente_id):
+        """Todo lo que la caja muestra al elegir un cliente, con una sola conexión:
+        (estadísticas o None, preferidos, últimos pedidos)"""
+        with self.db.reader() as conn:
+            stats = self.repository.stats(cliente_id, conn)
+            if stats is None:
+                return None, [], []
+            favorites = self.repository.favorites(cliente_id, FAVORITES, conn)
+            orders = self.orders.client_orders(cliente_id, None, RECENT_ORDERS, conn)
+        return stats, favorites, orders
+
+    def get_top_clients(self, limit=10, orden='gasto'):
+        """(cliente_id, nombre, visitas, gasto, ultima_visita) de los mejores clientes por gasto o por
+        visitas (índices idx_estadisticas_gasto / idx_estadisticas_visitas)"""
+        if orden not in TOP_ORDERS:
+            raise ValueError(f"Orden desconocido: {orden}")
+        return self.repository.top(orden, limit)
+
+    def get_churned_clients(self, dias=60, min_visitas=3, limit=PAGE_SIZE):
+        """Clientes habituales (min_visitas o más) que no vuelven hace más de dias días, los que se
+        perdieron más recientemente primero (índice idx_estadisticas_ultima):
+        (cliente_id, nombre, telefono, visitas, gasto, ultima_visita)"""
+        desde = (datetime.date.fromisoformat(today()) - datetime.timedelta(days=dias)).isoformat()
+        return self.repository.churned(desde, min_visitas, limit)
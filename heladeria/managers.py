@@ -0,0 +1,398 @@
+import datetime
+import sqlite3
+import threading
+import time
+
+from .dao import ClientRepository, InventoryRepository, OrderRepository, ProductRepository, now
+from .database import PAGE_SIZE, today
+from .money import Money
+
+ESTADOS_PEDIDO = ('pendiente', 'pagado', 'entregado')
+METODOS_PAGO = ('efectivo', 'tarjeta', 'QR', 'transferencia')
+CATALOG_TTL = 1.0  # Segundos entre comprobaciones de VersionCatalogo; en el medio, la caché responde sola
+
+def _commit(connection, fn):
+    """Ejecutar fn() y confirmar en connection; si falla, deshacer"""
+    try:
+        result = fn()
+        connection.commit()
+    except (sqlite3.Error, ValueError):
+        connection.rollback()
+        raise
+    return result
+
+class ClientManager:
+    def __init__(self, db):
+        self.db = db
+        self.repository = ClientRepository(db)
+
+    def add_client(self, nombre, direccion, telefono):
+        return _commit(self.db.connection, lambda: self.repository.insert(nombre, direccion, telefono))
+
+    def get_clients(self):
+        return self.repository.all()
+
+    def get_client(self, client_id):
+        return self.repository.get(client_id)
+
+    def get_clients_page(self, after_id=0, limit=PAGE_SIZE, before_id=None, search=None):
+        return self.repository.page(after_id, limit, before_id, search)
+
+    def count_clients(self, search=None):
+        return self.repository.count(search)
+
+    def client_id_at(self, offset, search=None):
+        return self.repository.id_at(offset, search)
+
+    def search_clients(self, text, limit=PAGE_SIZE):
+        """Buscar por prefijo de palabra en el índice de texto completo"""
+        return self.get_clients_page(limit=limit, search=text)
+
+    def update_client(self, client_id, nombre, direccion, telefono):
+        _commit(self.db.connection, lambda: self.repository.update(client_id, nombre, direccion, telefono))
+
+    def delete_client(self, client_id):
+        _commit(self.db.connection, lambda: self.repository.delete(client_id))
+
+class ProductCatalog:
+    """Caché en memoria de Productos indexada por id, para no consultar la base en cada venta.
+
+    Los cambios de este proceso la actualizan al momento (invalidate). Los de otros procesos
+    (la línea de comandos, otra interfaz) se ven al comparar la versión del catálogo en la base
+    (VersionCatalogo), a lo sumo una vez cada ttl segundos: si cambió, se relee entera.
+    """
+    def __init__(self, db, ttl=CATALOG_TTL):
+        self.db = db
+        self.repository = ProductRepository(db)
+        self.ttl = ttl
+        self.version = 0  # Cambia con cada modificación; las ventanas abiertas lo comparan
+        self._products = None
+        self._db_version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def products(self):
+        with self._lock:
+            self._refresh()
+            return self._products
+
+    def _refresh(self):
+        """Con el lock tomado: cargar el catálogo, o releerlo si la base cambió desde la última carga"""
+        if self._products is not None and time.monotonic() - self._checked_at < self.ttl:
+            return
+        db_version = self.repository.version()
+        self._checked_at = time.monotonic()
+        if self._products is not None and db_version == self._db_version:
+            return
+        if self._products is not None:
+            self.version += 1
+        self._products = {row.id: row for row in self.repository.all()}
+        self._db_version = db_version
+
+    def refresh(self):
+        """Tomar los cambios hechos por otros procesos; devuelve la versión vigente"""
+        with self._lock:
+            self._refresh()
+            return self.version
+
+    def snapshot(self):
+        """(versión, productos) tomados juntos, al día con la base"""
+        with self._lock:
+            self._refresh()
+            return self.version, list(self._products.values())
+
+    def all(self):
+        return list(self.products.values())
+
+    def get(self, product_id):
+        return self.products.get(product_id)
+
+    def price(self, product_id, products=None):
+        product = (self.products if products is None else products).get(product_id)
+        if product is None:
+            raise ValueError("Producto no encontrado")
+        return product.precio
+
+    def invalidate(self, product_id=None):
+        """Releer un producto modificado (o descartar toda la caché) y avanzar la versión"""
+        with self._lock:
+            db_version = self.repository.version()
+            # Sólo se relee el producto si el único cambio en la base fue este
+            if product_id is None or self._products is None or db_version != self._db_version + 1:
+                self._products = None
+            else:
+                row = self.repository.get(product_id)
+                if row is None:
+                    self._products.pop(product_id, None)
+                else:
+                    self._products[product_id] = row
+                self._db_version = db_version
+                self._checked_at = time.monotonic()
+            self.version += 1
+
+class ProductManager:
+    def __init__(self, db):
+        self.db = db
+        self.catalog = ProductCatalog(db)
+        self.repository = self.catalog.repository
+
+    def check_price(self, precio):
+        """Los precios llegan como Money (centavos); un float en pesos se rechaza"""
+        if not isinstance(precio, int) or precio < 0:
+            raise ValueError("El precio debe ser un importe (Money) no negativo")
+        return Money(precio)
+
+    def add_product(self, nombre, categoria, precio):
+        precio = self.check_price(precio)
+        product_id = _commit(self.db.connection, lambda: self.repository.insert(nombre, categoria, precio))
+        self.catalog.invalidate(product_id)
+        return product_id
+
+    def get_products(self):
+        return self.repository.all()
+
+    def get_product(self, product_id):
+        return self.repository.get(product_id)
+
+    def get_products_page(self, after_id=0, limit=PAGE_SIZE, before_id=None, search=None):
+        return self.repository.page(after_id, limit, before_id, search)
+
+    def count_products(self, search=None):
+        return self.repository.count(search)
+
+    def product_id_at(self, offset, search=None):
+        return self.repository.id_at(offset, search)
+
+    def search_products(self, text, limit=PAGE_SIZE):
+        """Buscar por prefijo de palabra en el índice de texto completo"""
+        return self.get_products_page(limit=limit, search=text)
+
+    def update_product(self, product_id, nombre, categoria, precio):
+        precio = self.check_price(precio)
+        _commit(self.db.connection, lambda: self.repository.update(product_id, nombre, categoria, precio))
+        self.catalog.invalidate(product_id)
+
+    def delete_product(self, product_id):
+        _commit(self.db.connection, lambda: self.repository.delete(product_id))
+        self.catalog.invalidate(product_id)
+
+class SalesManager:
+    def __init__(self, db, catalog=None, journal=None, allow_negative_stock=False):
+        self.db = db
+        self.catalog = catalog  # Si se comparte el catálogo de ProductManager, los precios salen de memoria
+        self.journal = journal  # SalesJournal: las ventas se confirman al anotarlas y se escriben después
+        self.allow_negative_stock = allow_negative_stock
+        self.repository = OrderRepository(db)
+        self.products = ProductRepository(db)
+        self.inventory = InventoryRepository(db)
+
+    def sell_product(self, product_id, cantidad):
+        return self.sell_ticket([(product_id, cantidad)])
+
+    def sell_ticket(self, items, cliente_id=None, metodo_pago='efectivo', total=None):
+        """Registrar un ticket completo [(producto_id, cantidad), ...] como pedido pagado y
+        entregado y descontar sus insumos, todo en una sola transacción; devuelve el total.
+        Con total (lo que la caja le cobra al cliente), la venta se rechaza si los precios
+        vigentes dan otro importe."""
+        filas, total = self._ticket(items, metodo_pago, total)
+        if self.journal is not None:
+            # Fecha y hora del momento de la venta, no del momento en que se descarga el diario
+            fecha, hora = now()
+            self.journal.append(filas, fecha, hora, cliente_id, metodo_pago)
+            return total
+        self._write_order(items, filas, cliente_id, 'entregado', [(total, metodo_pago)])
+        return total
+
+    def sell_tickets(self, tickets):
+        """Registrar varios tickets [(items, cliente_id, metodo_pago[, total]), ...] con un único commit.
+
+        Cada ticket va en su propio savepoint: uno rechazado (sin stock, producto inexistente)
+        no deshace los demás. Devuelve, por ticket, el total o la excepción que lo rechazó."""
+        if self.journal is not None:
+            results = []
+            for ticket in tickets:
+                try:
+                    results.append(self.sell_ticket(*ticket))
+                except ValueError as e:
+                    results.append(e)
+            return results
+
+        connection = self.db.connection
+        results = []
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            for ticket in tickets:
+                items, cliente_id, metodo_pago, total = (*ticket, None)[:4]
+                try:
+                    filas, total = self._ticket(items, metodo_pago, total)
+                    connection.execute('SAVEPOINT ticket')
+                    try:
+                        self.repository.record(connection, filas, cliente_id, 'entregado', [(total, metodo_pago)])
+                        self.inventory.consume(connection, items, allow_negative=self.allow_negative_stock)
+                    except (sqlite3.IntegrityError, ValueError):
+                        connection.execute('ROLLBACK TO ticket')
+                        raise
+                    finally:
+                        connection.execute('RELEASE ticket')
+                except (sqlite3.IntegrityError, ValueError) as e:
+                    results.append(e)
+                else:
+                    results.append(total)
+            connection.commit()
+        except sqlite3.Error:
+            connection.rollback()
+            raise
+        return results
+
+    def _ticket(self, items, metodo_pago, cotizado=None):
+        if metodo_pago not in METODOS_PAGO:
+            raise ValueError(f"Medio de pago desconocido: {metodo_pago}")
+        filas = self._lines(items)
+        total = sum((fila[2] for fila in filas), Money(0))
+        if cotizado is not None and total != cotizado:
+            raise ValueError(f"Cambiaron los precios: el ticket suma ${total}, no ${Money(cotizado)}")
+        return filas, total
+
+    def create_order(self, items, cliente_id=None):
+        """Registrar un pedido pendiente de pago (por teléfono, para retirar...); devuelve su id.
+        Los insumos se descuentan al tomarlo, igual que en una venta de mostrador"""
+        return self._write_order(items, self._lines(items), cliente_id, 'pendiente', ())
+
+    def _lines(self, items):
+        if not items:
+            raise ValueError("El ticket está vacío")
+        for _, cantidad in items:
+            # bool es un int de Python, pero no una cantidad
+            if not isinstance(cantidad, int) or isinstance(cantidad, bool) or cantidad <= 0:
+                raise ValueError("La cantidad debe ser un número entero mayor a 0")
+        precios = self.get_prices({product_id for product_id, _ in items})
+        return [(product_id, cantidad, precios[product_id] * cantidad) for product_id, cantidad in items]
+
+    def _write_order(self, items, filas, cliente_id, estado, pagos):
+        connection = self.db.connection
+        try:
+            pedido_id = self.repository.record(connection, filas, cliente_id, estado, pagos)
+            self.inventory.consume(connection, items, allow_negative=self.allow_negative_stock)
+            connection.commit()
+        except (sqlite3.Error, ValueError):
+            connection.rollback()
+            raise
+        return pedido_id
+
+    def add_payment(self, pedido_id, monto, metodo_pago='efectivo', confirmado=True):
+        """Registrar un pago de hasta el saldo del pedido; un pedido pendiente pasa a pagado cuando
+        los pagos confirmados cubren el total"""
+        if metodo_pago not in METODOS_PAGO:
+            raise ValueError(f"Medio de pago desconocido: {metodo_pago}")
+        if not isinstance(monto, int) or isinstance(monto, bool) or monto <= 0:
+            raise ValueError("El monto debe ser un importe (Money) positivo")
+        connection = self.db.connection
+        connection.execute('BEGIN IMMEDIATE')  # El saldo no cambia entre leerlo y registrar el pago
+        try:
+            _, saldo = self._balance(connection, pedido_id)
+            if monto > saldo:
+                raise ValueError(f"El pago supera el saldo del pedido (${max(saldo, Money(0))})")
+            self.repository.add_payment(connection, pedido_id, Money(monto), metodo_pago, confirmado)
+            connection.commit()
+        except (sqlite3.Error, ValueError):
+            connection.rollback()
+            raise
+
+    def set_order_state(self, pedido_id, estado):
+        """Cambiar el estado de un pedido. Pagado y entregado exigen pagos confirmados que cubran el
+        total, y un pedido cubierto no vuelve a pendiente: el pago se registra con add_payment"""
+        if estado not in ESTADOS_PEDIDO:
+            raise ValueError(f"Estado desconocido: {estado}")
+        connection = self.db.connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            _, saldo = self._balance(connection, pedido_id)
+            if estado != 'pendiente' and saldo > 0:
+                raise ValueError(f"El pedido tiene un saldo de ${saldo} sin pagar")
+            if estado == 'pendiente' and saldo <= 0:
+                raise ValueError("El pedido ya está pagado")
+            self.repository.set_state(pedido_id, estado, connection)
+            connection.commit()
+        except (sqlite3.Error, ValueError):
+            connection.rollback()
+            raise
+
+    def _balance(self, connection, pedido_id):
+        balance = self.repository.balance(pedido_id, connection)
+        if balance is None:
+            raise ValueError("Pedido no encontrado")
+        return balance
+
+    def get_order(self, pedido_id):
+        """(pedido, líneas, pagos) o None; el pedido es (id, cliente_id, fecha, hora, estado, total)"""
+        self.flush_journal()
+        return self.repository.get(pedido_id)
+
+    def get_client_orders(self, cliente_id, before_id=None, limit=PAGE_SIZE):
+        """Pedidos de un cliente del más reciente al más antiguo, por páginas (índice idx_pedidos_cliente)"""
+        self.flush_journal()
+        return self.repository.client_orders(cliente_id, before_id, limit)
+
+    def get_open_orders(self):
+        """Pedidos todavía no entregados (índice parcial idx_pedidos_abiertos)"""
+        return self.repository.open_orders()
+
+    def get_prices(self, ids):
+        """Precio de cada producto del ticket, del catálogo en memoria o con una sola consulta"""
+        if self.catalog is not None:
+            products = self.catalog.products  # Una sola lectura del catálogo por ticket
+            return {product_id: self.catalog.price(product_id, products) for product_id in ids}
+
+        ids = set(ids)
+        precios = self.products.prices(ids)
+        if len(precios) != len(ids):
+            raise ValueError("Producto no encontrado")
+        return precios
+
+    def get_sales(self):
+        return self.repository.sales()
+
+    def iter_sales(self, desde, hasta, chunk_size=PAGE_SIZE):
+        """Recorrer las ventas entre dos fechas (inclusive) con el nombre del producto, de a bloques"""
+        self.flush_journal()
+        yield from self.repository.iter_sales(desde, hasta, chunk_size)
+
+    def get_daily_total(self, fecha=None):
+        """Total vendido en el día (hoy por defecto), leído del agregado VentasDiarias"""
+        self.flush_journal()
+        total = self.repository.daily_total(fecha)
+        return Money(0) if total is None else total
+
+    def close_day(self, fecha=None):
+        """Cerrar la caja del día (hoy por defecto): guarda totales por producto y por medio de
+        pago que ya no cambian. Devuelve lo mismo que get_closing."""
+        self.flush_journal()
+        fecha = fecha or today()
+        conn = self.db.connection
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if not self.repository.close(conn, fecha):
+                raise ValueError(f"La caja del {fecha} ya está cerrada")
+            conn.commit()
+        except (sqlite3.Error, ValueError):
+            conn.rollback()
+            raise
+        return self.get_closing(fecha)
+
+    def get_closing(self, fecha):
+        """(cierre, productos, pagos) del cierre de caja de un día, o None si no se cerró"""
+        return self.repository.closing(fecha)
+
+    def archive_sales(self, dias=None):
+        """Pasar a la base de archivo los pedidos entregados de hace más de dias (db.archive_days
+        por defecto); devuelve cuántas ventas pasaron"""
+        self.flush_journal()
+        dias = self.db.archive_days if dias is None else dias
+        fecha = (datetime.date.fromisoformat(today()) - datetime.timedelta(days=dias)).isoformat()
+        return self.db.archive_before(fecha)
+
+    def flush_journal(self):
+        """Pasar a Ventas las ventas todavía en el diario, para leer totales al día"""
+        if self.journal is not None:
+            self.journal.flush()
@@ -0,0 +1,63 @@
+import decimal
+
+
+class Money(int):
+    """Importe en centavos. Es un int: se guarda como INTEGER en SQLite y las sumas son
+    exactas. Se muestra en pesos con dos decimales (str(Money(125050)) == '1250.50')."""
+    __slots__ = ()
+
+    @classmethod
+    def parse(cls, text):
+        """'12', '12.5', '12,50', '$1.250,50' -> Money; ValueError si no es un importe"""
+        text = str(text).strip().replace('$', '').replace(' ', '')
+        if ',' in text:
+            # La coma es el separador decimal; los puntos, de miles
+            text = text.replace('.', '').replace(',', '.')
+        try:
+            value = decimal.Decimal(text)
+        except decimal.InvalidOperation:
+            raise ValueError(f"Importe inválido: {text!r}") from None
+        if not value.is_finite():
+            raise ValueError(f"Importe inválido: {text!r}")
+        return cls((value * 100).quantize(decimal.Decimal(1), rounding=decimal.ROUND_HALF_UP))
+
+    def __str__(self):
+        pesos, centavos = divmod(abs(int(self)), 100)
+        return f"{'-' if self < 0 else ''}{pesos}.{centavos:02d}"
+
+    def __repr__(self):
+        return f"Money({int(self)})"
+
+    def __format__(self, spec):
+        return format(str(self), spec)
+
+    # Las operaciones entre importes y por cantidades enteras siguen siendo Money
+    def __add__(self, other):
+        if isinstance(other, int):
+            return Money(int(self) + other)
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, int):
+            return Money(int(self) - other)
+        return NotImplemented
+
+    def __rsub__(self, other):
+        if isinstance(other, int):
+            return Money(other - int(self))
+        return NotImplemented
+
+    def __mul__(self, other):
+        if isinstance(other, int) and not isinstance(other, Money):
+            return Money(int(self) * other)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return Money(-int(self))
+
+    def __abs__(self):
+        return Money(abs(int(self)))
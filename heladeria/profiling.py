@@ -0,0 +1,271 @@
+"""Perfilado opcional de las consultas.
+
+Las conexiones de Database se crean con ProfiledConnection. Mientras el perfilado está
+apagado sólo se agrega una llamada en Python por cursor. Encendido, cada execute, fetch
+y commit se cronometra y se atribuye al método que lo originó (por ejemplo
+SalesManager.sell_ticket). El progress handler de SQLite cuenta los pasos de la
+máquina virtual y el trace callback cuenta los programas que corre cada sentencia (la
+propia más los de sus triggers). Las sentencias lentas guardan su EXPLAIN QUERY PLAN.
+"""
+import collections
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+SLOW_QUERY_MS = 20        # A partir de cuántos milisegundos una sentencia se considera lenta
+ROLLING_WINDOW = 1000     # Latencias recientes que se guardan por sentencia para p50/p99
+PROGRESS_STEPS = 1000     # Cada cuántas instrucciones de SQLite se llama al progress handler
+HISTOGRAM_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+_SKIP_FILES = {os.path.join(_PACKAGE_DIR, name) for name in ('profiling.py', 'database.py', 'dao.py')}
+
+
+def normalize(sql):
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+def call_site():
+    """Primer método público del paquete fuera de la capa de base de datos (y de los repositorios)
+    en la pila (Clase.método)"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        if (code.co_filename.startswith(_PACKAGE_DIR) and code.co_filename not in _SKIP_FILES
+                and not code.co_name.startswith('_') and code.co_name != '<lambda>'):
+            return getattr(code, 'co_qualname', code.co_name)
+        frame = frame.f_back
+    return '(externo)'
+
+
+class LatencyStats:
+    """Contadores acumulados, histograma logarítmico y ventana de latencias recientes"""
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.steps = 0
+        self.programs = 0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        self.recent = collections.deque(maxlen=ROLLING_WINDOW)
+
+    def add(self, elapsed_ms, steps=0, programs=0):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.steps += steps
+        self.programs += programs
+        bucket = 0
+        while bucket < len(HISTOGRAM_BOUNDS_MS) and elapsed_ms > HISTOGRAM_BOUNDS_MS[bucket]:
+            bucket += 1
+        self.histogram[bucket] += 1
+        self.recent.append(elapsed_ms)
+
+    def extend(self, elapsed_ms, steps=0):
+        """Sumar tiempo de lectura (fetch) a la última ejecución registrada"""
+        self.total_ms += elapsed_ms
+        self.steps += steps
+        if self.recent:
+            self.recent[-1] += elapsed_ms
+            self.max_ms = max(self.max_ms, self.recent[-1])
+
+    def percentile(self, p):
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def as_dict(self):
+        return {
+            'llamadas': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'max_ms': round(self.max_ms, 3),
+            'p50_ms': round(self.percentile(50), 3),
+            'p99_ms': round(self.percentile(99), 3),
+            'pasos_vm': self.steps,
+            'programas': self.programs,
+            'histograma': dict(zip([f'<={bound}ms' for bound in HISTOGRAM_BOUNDS_MS] + ['mayor'],
+                                   self.histogram)),
+        }
+
+
+class Profiler:
+    def __init__(self, enabled=False, slow_query_ms=SLOW_QUERY_MS):
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.statements = {}  # (sitio, sql) -> LatencyStats
+            self.slow_queries = collections.deque(maxlen=50)
+            self.plans = {}
+
+    def record(self, site, sql, elapsed_ms, steps=0, programs=0):
+        key = (site, normalize(sql))
+        with self._lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                stats = self.statements[key] = LatencyStats()
+            stats.add(elapsed_ms, steps, programs)
+        return stats
+
+    def extend(self, stats, elapsed_ms, steps=0):
+        with self._lock:
+            stats.extend(elapsed_ms, steps)
+
+    def record_slow(self, site, sql, elapsed_ms, plan):
+        with self._lock:
+            self.slow_queries.append({
+                'hora': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'sitio': site,
+                'sql': normalize(sql),
+                'ms': round(elapsed_ms, 3),
+                'plan': plan,
+            })
+
+    def by_call_site(self):
+        """Totales por método de origen: sitio -> (llamadas, total_ms)"""
+        totals = collections.defaultdict(lambda: [0, 0.0])
+        with self._lock:
+            for (site, _), stats in self.statements.items():
+                totals[site][0] += stats.count
+                totals[site][1] += stats.total_ms
+        return {site: tuple(values) for site, values in totals.items()}
+
+    def snapshot(self):
+        with self._lock:
+            statements = [dict(sitio=site, sql=sql, **stats.as_dict())
+                          for (site, sql), stats in self.statements.items()]
+            slow = list(self.slow_queries)
+        statements.sort(key=lambda row: row['total_ms'], reverse=True)
+        return {
+            'sentencias': statements,
+            'por_sitio': {site: {'llamadas': count, 'total_ms': round(total, 3)}
+                          for site, (count, total) in self.by_call_site().items()},
+            'lentas': slow,
+        }
+
+    def export(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(dict(fecha=time.strftime('%Y-%m-%d %H:%M:%S'), **self.snapshot()), f,
+                      indent=2, ensure_ascii=False)
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor que cronometra execute y fetch cuando el perfilado está encendido"""
+    _stats = None
+
+    def _timed(self, method, sql, *args):
+        connection = self.connection
+        profiler = connection.profiler
+        site = call_site()
+        connection.steps = connection.programs = 0
+        start = time.perf_counter()
+        try:
+            return method(self, sql, *args)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._stats = profiler.record(site, sql, elapsed_ms, connection.steps * PROGRESS_STEPS,
+                                          connection.programs)
+            self._site, self._sql, self._params = site, sql, args[0] if args else ()
+            if elapsed_ms >= profiler.slow_query_ms and method is sqlite3.Cursor.execute:
+                self._report_slow(elapsed_ms)
+
+    def _report_slow(self, elapsed_ms):
+        profiler = self.connection.profiler
+        key = normalize(self._sql)
+        plan = profiler.plans.get(key)
+        if plan is None:
+            try:
+                rows = sqlite3.Cursor(self.connection).execute('EXPLAIN QUERY PLAN ' + self._sql,
+                                                               self._params).fetchall()
+                plan = [row[-1] for row in rows]
+            except sqlite3.Error:
+                plan = []  # DDL, PRAGMA y similares no tienen plan
+            profiler.plans[key] = plan
+        profiler.record_slow(self._site, self._sql, elapsed_ms, plan)
+
+    def _fetch(self, method, *args):
+        if self._stats is None:
+            return method(self, *args)
+        connection = self.connection
+        connection.steps = 0
+        start = time.perf_counter()
+        try:
+            return method(self, *args)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            connection.profiler.extend(self._stats, elapsed_ms, connection.steps * PROGRESS_STEPS)
+
+    def execute(self, sql, parameters=()):
+        return self._timed(sqlite3.Cursor.execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(sqlite3.Cursor.executemany, sql, seq_of_parameters)
+
+    def fetchone(self):
+        return self._fetch(sqlite3.Cursor.fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetch(sqlite3.Cursor.fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._fetch(sqlite3.Cursor.fetchall)
+
+    def __next__(self):
+        return self._fetch(sqlite3.Cursor.__next__)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """Conexión que entrega cursores cronometrados y mide los commits si el perfilado está encendido"""
+    profiler = None
+    steps = 0
+    programs = 0
+    _instrumented = False
+
+    def _instrument(self, enabled):
+        if enabled:
+            self.set_progress_handler(self._on_progress, PROGRESS_STEPS)
+            self.set_trace_callback(self._on_trace)
+        else:
+            self.set_progress_handler(None, 0)
+            self.set_trace_callback(None)
+        self._instrumented = enabled
+
+    def _on_progress(self):
+        self.steps += 1
+        return 0
+
+    def _on_trace(self, statement):
+        self.programs += 1
+
+    def cursor(self, factory=None):
+        enabled = self.profiler is not None and self.profiler.enabled
+        if enabled != self._instrumented:
+            self._instrument(enabled)
+        if factory is None:
+            factory = ProfiledCursor if enabled else sqlite3.Cursor
+        return super().cursor(factory)
+
+    # Connection.execute de sqlite3 no pasa por Cursor.execute; se redirige para poder medirlo
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        if self.profiler is None or not self.profiler.enabled:
+            return super().commit()
+        site = call_site()
+        start = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            self.profiler.record(site, 'COMMIT', (time.perf_counter() - start) * 1000)
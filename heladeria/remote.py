@@ -0,0 +1,239 @@
+"""Cajas conectadas a un servidor de ventas (``python -m heladeria servidor``).
+
+Los administradores remotos tienen los mismos métodos que los locales, pero cada
+llamada viaja al servidor, que es el único que escribe en la base. El protocolo es
+una línea JSON por pedido y por respuesta, sobre TCP o un socket Unix. Las tuplas
+viajan como arreglos JSON; las filas (registros de dao.py), las listas, los importes
+y los diccionarios van marcados para que del otro lado se reconstruyan con el mismo tipo.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from .dao import RECORDS
+from .inventory import InventoryManager
+from .loyalty import LoyaltyManager
+from .managers import ClientManager, ProductCatalog, ProductManager, SalesManager
+from .money import Money
+from .reports import ReportManager
+
+DEFAULT_ADDRESS = '127.0.0.1:8765'
+CATALOG_TTL = 30  # Segundos: el catálogo se relee para tomar los cambios de otras cajas
+
+# Errores que se vuelven a lanzar en la caja con su propio tipo
+ERRORS = {error.__name__: error for error in (
+    ValueError, TypeError, LookupError, PermissionError,
+    sqlite3.IntegrityError, sqlite3.OperationalError, sqlite3.DatabaseError)}
+
+
+class RemoteError(Exception):
+    """Error del servidor sin equivalente local"""
+
+
+def parse_address(text):
+    """'host:puerto' para TCP; una ruta (con '/' o terminada en .sock) para un socket Unix"""
+    if '/' in text or text.endswith('.sock'):
+        return text
+    host, _, port = text.rpartition(':')
+    try:
+        return host or '127.0.0.1', int(port)
+    except ValueError:
+        raise ValueError(f"Dirección inválida: {text!r} (se espera host:puerto o la ruta de un socket)") from None
+
+
+def encode(value):
+    if isinstance(value, Money):
+        return {'@m': int(value)}
+    if RECORDS.get(type(value).__name__) is type(value):
+        return {'@r': [type(value).__name__, [encode(item) for item in value]]}
+    if isinstance(value, tuple):
+        return [encode(item) for item in value]
+    if isinstance(value, list):
+        return {'@l': [encode(item) for item in value]}
+    if isinstance(value, dict):
+        return {'@d': [[encode(key), encode(item)] for key, item in value.items()]}
+    return value
+
+
+def decode(value):
+    if isinstance(value, list):
+        return tuple(decode(item) for item in value)
+    if isinstance(value, dict):
+        if '@m' in value:
+            return Money(value['@m'])
+        if '@r' in value:
+            name, fields = value['@r']
+            return RECORDS[name]._make(decode(item) for item in fields)
+        if '@l' in value:
+            return [decode(item) for item in value['@l']]
+        return {decode(key): decode(item) for key, item in value['@d']}
+    return value
+
+
+def dumps(message):
+    return (json.dumps(message, separators=(',', ':'), ensure_ascii=False) + '\n').encode('utf-8')
+
+
+class RemoteConnection:
+    """Conexión de una caja con el servidor; un pedido a la vez, desde cualquier hilo. El token
+    compartido (por defecto $HELADERIA_SERVER_TOKEN) viaja en el saludo al conectar.
+
+    Cada llamada espera la respuesta (hasta timeout segundos) con el lock tomado: la interfaz
+    la usa sólo desde su hilo de base de datos, nunca desde el de Tk, así una venta en curso
+    o un servidor lento no congelan la caja.
+    """
+    def __init__(self, address=DEFAULT_ADDRESS, timeout=30, token=None):
+        self.address = parse_address(address) if isinstance(address, str) else address
+        self.timeout = timeout
+        self.token = token or os.environ.get('HELADERIA_SERVER_TOKEN') or None
+        self._lock = threading.Lock()
+        self._sock = None
+        self._file = None
+        self._next_id = 0
+
+    def _connect(self):
+        if isinstance(self.address, str):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.address)
+            file = sock.makefile('rwb')
+            try:
+                # Saludo con el token compartido; el servidor contesta antes de atender pedidos
+                file.write(dumps({'token': self.token}))
+                file.flush()
+                response = json.loads(file.readline() or b'{}')
+                if 'error' in response:
+                    tipo, mensaje = response['error']
+                    raise ERRORS.get(tipo, RemoteError)(mensaje)
+                if not response.get('ok'):
+                    raise ConnectionError("El servidor cerró la conexión")
+            except Exception:
+                file.close()
+                raise
+        except Exception:
+            sock.close()
+            raise
+        self._sock, self._file = sock, file
+
+    def call(self, service, method, *args, **kwargs):
+        with self._lock:
+            self._next_id += 1
+            request = {'id': self._next_id, 'servicio': service, 'metodo': method,
+                       'args': encode(args), 'kwargs': {key: encode(value) for key, value in kwargs.items()}}
+            try:
+                if self._sock is None:
+                    self._connect()
+                self._file.write(dumps(request))
+                self._file.flush()
+                line = self._file.readline()
+                if not line:
+                    raise ConnectionError("El servidor cerró la conexión")
+            except OSError:
+                # Sin reintento: una venta podría registrarse dos veces. La próxima llamada reconecta
+                self.close()
+                raise
+        response = json.loads(line)
+        if 'error' in response:
+            tipo, mensaje = response['error']
+            raise ERRORS.get(tipo, RemoteError)(mensaje)
+        return decode(response['resultado'])
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._file.close()
+                self._sock.close()
+            finally:
+                self._sock = self._file = None
+
+
+class RemoteManager:
+    """Administrador de una caja: los métodos públicos de local_class se ejecutan en el servidor"""
+    local_class = None
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __getattr__(self, name):
+        if name.startswith('_') or not callable(getattr(self.local_class, name, None)):
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+        def call(*args, **kwargs):
+            return self.connection.call(self.local_class.__name__, name, *args, **kwargs)
+        call.__name__ = name
+        return call
+
+
+class RemoteCatalog(ProductCatalog):
+    """Catálogo en memoria de una caja; se relee del servidor cada CATALOG_TTL segundos"""
+    def __init__(self, connection, ttl=CATALOG_TTL):
+        super().__init__(None, ttl)
+        self.connection = connection
+
+    def _refresh(self):
+        if self._products is None or time.monotonic() - self._checked_at > self.ttl:
+            products = {row.id: row for row in self.connection.call('ProductManager', 'get_products')}
+            if self._products is not None and products != self._products:
+                self.version += 1  # Cambios de otra caja: las ventanas abiertas recargan
+            self._products = products
+            self._checked_at = time.monotonic()
+
+    def invalidate(self, product_id=None):
+        with self._lock:
+            self._products = None
+            self.version += 1
+
+
+class RemoteClientManager(RemoteManager):
+    local_class = ClientManager
+
+
+class RemoteProductManager(RemoteManager):
+    local_class = ProductManager
+
+    def __init__(self, connection):
+        super().__init__(connection)
+        self.catalog = RemoteCatalog(connection)
+
+    def add_product(self, nombre, categoria, precio):
+        product_id = self.connection.call('ProductManager', 'add_product', nombre, categoria, precio)
+        self.catalog.invalidate(product_id)
+        return product_id
+
+    def update_product(self, product_id, nombre, categoria, precio):
+        self.connection.call('ProductManager', 'update_product', product_id, nombre, categoria, precio)
+        self.catalog.invalidate(product_id)
+
+    def delete_product(self, product_id):
+        self.connection.call('ProductManager', 'delete_product', product_id)
+        self.catalog.invalidate(product_id)
+
+
+class RemoteSalesManager(RemoteManager):
+    local_class = SalesManager
+    journal = None  # El diario, si lo hay, lo lleva el servidor
+
+    def sell_product(self, product_id, cantidad):
+        return self.sell_ticket([(product_id, cantidad)])
+
+    def iter_sales(self, desde, hasta, chunk_size=None):
+        yield from self.connection.call('SalesManager', 'iter_sales', desde, hasta)
+
+
+class RemoteInventoryManager(RemoteManager):
+    local_class = InventoryManager
+
+
+class RemoteLoyaltyManager(RemoteManager):
+    local_class = LoyaltyManager
+
+
+class RemoteReportManager(RemoteManager):
+    local_class = ReportManager
@@ -0,0 +1,83 @@
+import datetime
+import sqlite3
+import time
+
+from .dao import ReportRepository
+from .database import today
+
+
+class ReportManager:
+    """Reportes de ventas calculados en SQL. Cada día cerrado se resume una sola vez en
+    ResumenDiarioProducto / ResumenDiarioHora y los reportes leen esos resúmenes."""
+    def __init__(self, db):
+        self.db = db
+        self.repository = ReportRepository(db)
+
+    def cache_closed_days(self, desde, hasta):
+        """Resumir los días anteriores a hoy del rango que todavía no tienen resumen; devuelve cuántos"""
+        conn = self.db.connection
+        summarized = 0
+        for fecha in self.repository.pending_days(desde, hasta, today()):
+            # Un día por transacción para no retener el bloqueo de escritura. Otra caja o proceso
+            # puede haberlo resumido desde la lectura: summarize_day lo vuelve a mirar con el bloqueo
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                summarized += self.repository.summarize_day(conn, fecha)
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+        return summarized
+
+    def revenue_by_product(self, desde, hasta):
+        """(producto_id, nombre, cantidad, total, porcentaje, puesto) ordenado por facturación"""
+        self.cache_closed_days(desde, hasta)
+        return self.repository.report('revenue_by_product', {'desde': desde, 'hasta': hasta})
+
+    def revenue_by_category(self, desde, hasta):
+        """(categoria, cantidad, total, porcentaje) ordenado por facturación"""
+        self.cache_closed_days(desde, hasta)
+        return self.repository.report('revenue_by_category', {'desde': desde, 'hasta': hasta})
+
+    def top_sellers(self, desde, hasta, limite=10):
+        """(puesto, producto_id, nombre, cantidad, total) de los productos más vendidos en unidades"""
+        self.cache_closed_days(desde, hasta)
+        return self.repository.report('top_sellers', {'desde': desde, 'hasta': hasta, 'limite': limite})
+
+    def hourly_distribution(self, desde, hasta):
+        """(hora local o None si no se registró, ventas, cantidad, total, porcentaje)"""
+        self.cache_closed_days(desde, hasta)
+        rows = self.repository.report('hourly_distribution', {'desde': desde, 'hasta': hasta})
+        # Las horas se guardan en UTC como la fecha; se muestran en la hora local del equipo
+        offset = round(time.localtime().tm_gmtoff / 3600)
+        rows = [((hora + offset) % 24 if hora >= 0 else None,) + tuple(rest) for hora, *rest in rows]
+        return sorted(rows, key=lambda row: -1 if row[0] is None else row[0])
+
+    def daily_totals(self, desde, hasta):
+        """(fecha, ventas, total, acumulado, promedio de 7 días) a partir de VentasDiarias"""
+        return self.repository.report('daily_totals', {'desde': desde, 'hasta': hasta})
+
+    def compare_periods(self, desde, hasta):
+        """Comparar con el período anterior de igual duración.
+        Devuelve (desde_anterior, hasta_anterior, filas) con filas
+        (producto_id, nombre, total, total_anterior, variación % o None)."""
+        inicio = datetime.date.fromisoformat(desde)
+        fin = datetime.date.fromisoformat(hasta)
+        dias = (fin - inicio).days + 1
+        desde_anterior = (inicio - datetime.timedelta(days=dias)).isoformat()
+        hasta_anterior = (inicio - datetime.timedelta(days=1)).isoformat()
+
+        self.cache_closed_days(desde_anterior, hasta)
+        rows = self.repository.report('compare_periods', {'desde': desde_anterior, 'hasta': hasta, 'inicio': desde})
+        rows = [row + ((row[2] - row[3]) * 100.0 / row[3] if row[3] else None,) for row in rows]
+        return desde_anterior, hasta_anterior, rows
+
+    def sales_report(self, desde, hasta):
+        """Todos los reportes del rango juntos, para la ventana de cierre"""
+        return {
+            'productos': self.revenue_by_product(desde, hasta),
+            'categorias': self.revenue_by_category(desde, hasta),
+            'horas': self.hourly_distribution(desde, hasta),
+            'dias': self.daily_totals(desde, hasta),
+            'comparacion': self.compare_periods(desde, hasta),
+        }
@@ -0,0 +1,251 @@
+"""Servidor de ventas para varias cajas: ``python -m heladeria servidor``.
+
+El servidor es el único proceso que abre la base para escribir. Las cajas se conectan
+con los administradores de remote.py y el servidor ejecuta cada llamada con los
+administradores locales: las escrituras en un único hilo escritor, las lecturas en
+un grupo de hilos que usa el pool de conexiones de solo lectura. Las ventas que llegan
+mientras se escribe un grupo se juntan y se confirman con un solo commit
+(SalesManager.sell_tickets), así varias cajas no compiten por el bloqueo de SQLite.
+
+Cada caja abre la conexión con un saludo que lleva el token compartido
+($HELADERIA_SERVER_TOKEN); sin token, el servidor sólo escucha en la máquina local
+(127.0.0.1, ::1 o un socket Unix). Sólo se atienden los métodos de SERVICES.
+"""
+import asyncio
+import hmac
+import inspect
+import ipaddress
+import json
+import os
+import signal
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+from .database import Database
+from .inventory import InventoryManager
+from .loyalty import LoyaltyManager
+from .managers import ClientManager, ProductManager, SalesManager
+from .remote import DEFAULT_ADDRESS, decode, dumps, encode, parse_address
+from .reports import ReportManager
+
+MAX_BATCH = 200  # Ventas como máximo por commit
+SALE_SIGNATURE = inspect.signature(SalesManager.sell_ticket)
+
+# Métodos que una caja puede llamar, por servicio: (lecturas, escrituras). Las lecturas van al
+# grupo de hilos lectores y las escrituras al hilo escritor; los reportes guardan resúmenes de
+# días cerrados, así que van como escrituras
+SERVICES = {
+    'ClientManager': (
+        {'get_clients', 'get_client', 'get_clients_page', 'count_clients', 'client_id_at', 'search_clients'},
+        {'add_client', 'update_client', 'delete_client'},
+    ),
+    'ProductManager': (
+        {'get_products', 'get_product', 'get_products_page', 'count_products', 'product_id_at', 'search_products'},
+        {'add_product', 'update_product', 'delete_product'},
+    ),
+    'SalesManager': (
+        {'get_order', 'get_client_orders', 'get_open_orders', 'iter_sales', 'get_daily_total', 'get_closing'},
+        {'sell_ticket', 'create_order', 'add_payment', 'set_order_state', 'close_day', 'archive_sales'},
+    ),
+    'InventoryManager': (
+        {'get_items', 'get_item', 'low_stock', 'get_recipe', 'movements'},
+        {'add_item', 'update_item', 'delete_item', 'receive', 'adjust', 'set_recipe'},
+    ),
+    'LoyaltyManager': (
+        {'get_client_stats', 'get_favorites', 'get_client_summary', 'get_top_clients', 'get_churned_clients'},
+        set(),
+    ),
+    'ReportManager': (
+        set(),
+        {'sales_report', 'top_sellers', 'revenue_by_product', 'revenue_by_category', 'hourly_distribution',
+         'daily_totals', 'compare_periods'},
+    ),
+}
+
+
+def is_local(address):
+    """Un socket Unix o una dirección TCP de loopback (127.0.0.0/8, ::1, localhost)"""
+    if isinstance(address, str):
+        return True
+    host = address[0]
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False  # Un nombre de host o '' (todas las interfaces)
+
+
+class SalesServer:
+    def __init__(self, db, journal=None, token=None):
+        self.db = db
+        self.token = token or os.environ.get('HELADERIA_SERVER_TOKEN') or None
+        product_manager = ProductManager(db)
+        self.sales_manager = SalesManager(db, product_manager.catalog, journal)
+        self.services = {
+            'ClientManager': ClientManager(db),
+            'ProductManager': product_manager,
+            'SalesManager': self.sales_manager,
+            'InventoryManager': InventoryManager(db),
+            'LoyaltyManager': LoyaltyManager(db),
+            'ReportManager': ReportManager(db),
+        }
+        self.address = None
+        self._clients = {}  # StreamWriter -> tarea que atiende a esa caja
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix='heladeria-escritor')
+        self._readers = ThreadPoolExecutor(Database.READ_POOL_SIZE, thread_name_prefix='heladeria-lector')
+        self._sales = []
+        self._loop = None
+        self._stopped = None
+        self._sales_ready = None
+
+    async def serve(self, address=DEFAULT_ADDRESS, on_ready=None):
+        """Atender cajas hasta stop(); on_ready(dirección) se llama al quedar escuchando"""
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self._sales_ready = asyncio.Event()
+        address = parse_address(address) if isinstance(address, str) else address
+        if self.token is None and not is_local(address):
+            raise ValueError(f"Para escuchar en {address[0]!r} hace falta un token compartido "
+                             "($HELADERIA_SERVER_TOKEN); sin token, usar 127.0.0.1 o un socket Unix")
+        if isinstance(address, str):
+            if os.path.exists(address):
+                os.remove(address)  # Socket de una ejecución anterior
+            server = await asyncio.start_unix_server(self.handle, address)
+            self.address = address
+        else:
+            server = await asyncio.start_server(self.handle, *address)
+            self.address = server.sockets[0].getsockname()[:2]
+        sales_task = asyncio.create_task(self._sell_batches())
+        if on_ready is not None:
+            on_ready(self.address)
+        try:
+            async with server:
+                await self._stopped.wait()
+                # Cortar las cajas conectadas y esperar a que terminen sus pedidos en curso
+                for writer in list(self._clients):
+                    writer.close()
+                await asyncio.gather(*self._clients.values(), return_exceptions=True)
+        finally:
+            sales_task.cancel()
+            self._writer.shutdown()
+            self._readers.shutdown()
+            if isinstance(address, str) and os.path.exists(address):
+                os.remove(address)
+
+    def stop(self):
+        """Detener el servidor; se puede llamar desde cualquier hilo"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+    async def handle(self, reader, writer):
+        """Una caja: los pedidos se atienden a medida que llegan y cada respuesta lleva su id"""
+        self._clients[writer] = asyncio.current_task()
+        tasks = set()
+        try:
+            if not await self._greet(reader, writer):
+                return
+            while line := await reader.readline():
+                task = asyncio.create_task(self._respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            pass
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            del self._clients[writer]
+            writer.close()
+
+    async def _greet(self, reader, writer):
+        """Saludo de la caja, {'token': ...}; devuelve si se la atiende"""
+        line = await reader.readline()
+        if not line:
+            return False
+        try:
+            token = json.loads(line).get('token')
+        except (ValueError, AttributeError):
+            token = None
+        accepted = self.token is None or hmac.compare_digest(str(token or '').encode(), self.token.encode())
+        writer.write(dumps({'ok': True} if accepted else
+                           {'error': ['PermissionError', "Token del servidor incorrecto"]}))
+        try:
+            await writer.drain()
+        except ConnectionError:
+            return False
+        return accepted
+
+    async def _respond(self, line, writer):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            result = await self.dispatch(request['servicio'], request['metodo'], decode(request['args']),
+                                         {key: decode(value) for key, value in request['kwargs'].items()})
+            response = {'id': request_id, 'resultado': encode(result)}
+        except Exception as e:  # El error viaja a la caja, que lo vuelve a lanzar
+            response = {'id': request_id, 'error': [type(e).__name__, str(e)]}
+        writer.write(dumps(response))
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def dispatch(self, service, method, args, kwargs):
+        reads, writes = SERVICES.get(service, ((), ()))
+        if method not in reads and method not in writes:
+            raise ValueError(f"Operación desconocida: {service}.{method}")
+        manager = self.services[service]
+        if service == 'SalesManager' and method == 'sell_ticket':
+            arguments = SALE_SIGNATURE.bind(manager, *args, **kwargs)
+            arguments.apply_defaults()
+            return await self.sell(*list(arguments.arguments.values())[1:])
+
+        fn = getattr(manager, method)
+        return await self._loop.run_in_executor(self._readers if method in reads else self._writer,
+                                                lambda: self._materialize(fn(*args, **kwargs)))
+
+    @staticmethod
+    def _materialize(result):
+        # Los generadores (iter_sales) se recorren en el hilo que tiene la conexión
+        return list(result) if isinstance(result, types.GeneratorType) else result
+
+    async def sell(self, items, cliente_id=None, metodo_pago='efectivo', total=None):
+        """Encolar una venta para el próximo grupo; devuelve el total cuando quedó confirmada"""
+        future = self._loop.create_future()
+        self._sales.append(((items, cliente_id, metodo_pago, total), future))
+        self._sales_ready.set()
+        return await future
+
+    async def _sell_batches(self):
+        while True:
+            await self._sales_ready.wait()
+            self._sales_ready.clear()
+            while self._sales:
+                # Las ventas que llegan mientras se escribe un grupo forman el siguiente
+                batch, self._sales = self._sales[:MAX_BATCH], self._sales[MAX_BATCH:]
+                try:
+                    results = await self._loop.run_in_executor(
+                        self._writer, self.sales_manager.sell_tickets, [ticket for ticket, _ in batch])
+                except Exception as e:
+                    results = [e] * len(batch)
+                for (_, future), result in zip(batch, results):
+                    if future.done():
+                        continue  # La caja se desconectó
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+
+
+def run(db, address=DEFAULT_ADDRESS, journal=None):
+    """Atender cajas hasta Ctrl+C o SIGTERM"""
+    def listening(address):
+        print(f"Servidor escuchando en {address} (Ctrl+C para salir)", flush=True)
+
+    server = SalesServer(db, journal)
+    signal.signal(signal.SIGTERM, lambda signum, frame: server.stop())  # Cierre ordenado al terminar el proceso
+    try:
+        asyncio.run(server.serve(address, listening))
+    except KeyboardInterrupt:
+        pass
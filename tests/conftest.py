@@ -0,0 +1,20 @@
+import pytest
+
+from heladeria.database import Database
+from heladeria.managers import ProductManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / 'heladeria.db'))
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def products(db):
+    """Dos productos: 1 a $10,50 y 2 a $3,00"""
+    manager = ProductManager(db)
+    manager.add_product('Cucurucho', 'Helados', 1050)
+    manager.add_product('Paleta', 'Palitos', 300)
+    return manager
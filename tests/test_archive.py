@@ -0,0 +1,72 @@
+import pytest
+
+from heladeria.journal import SalesJournal
+from heladeria.managers import SalesManager
+
+
+def views(db):
+    connection = db.connection
+    return (connection.execute('SELECT id, producto_id, cantidad, precio_total, fecha FROM VentasTodas ORDER BY id').fetchall(),
+            connection.execute('SELECT id, estado, total FROM PedidosTodos ORDER BY id').fetchall(),
+            connection.execute('SELECT id, pedido_id, monto FROM PagosTodos ORDER BY id').fetchall(),
+            connection.execute('SELECT * FROM VentasDiarias ORDER BY fecha').fetchall())
+
+
+@pytest.fixture
+def history(db, products, tmp_path):
+    """Ventas en tres días pasados (por el diario, que conserva la fecha) y un pedido pendiente"""
+    journal = SalesJournal(db, str(tmp_path / 'ventas.journal'), flush_interval=3600)
+    for seq, fecha in enumerate(['2026-01-10', '2026-01-10', '2026-01-11', '2026-02-01'], start=1):
+        journal.append([(1, seq, 1050 * seq), (2, 1, 300)], fecha, 12)
+    journal.close()
+    manager = SalesManager(db, products.catalog)
+    pendiente = manager.create_order([(1, 1)])
+    db.connection.execute("UPDATE Pedidos SET fecha = '2026-01-10' WHERE id = ?", (pendiente,))
+    db.connection.commit()
+    return manager
+
+
+def test_archive_before(db, history):
+    before = views(db)
+    assert db.archive_before('2026-01-31', chunk_size=1) == 6
+    connection = db.connection
+    assert connection.execute('SELECT COUNT(*) FROM archivo.Ventas').fetchone()[0] == 6
+    assert connection.execute('SELECT COUNT(*) FROM archivo.Pedidos').fetchone()[0] == 3
+    assert connection.execute('SELECT COUNT(*) FROM archivo.Pagos').fetchone()[0] == 3
+    # En la principal quedan el día posterior y el pedido pendiente, aunque sea anterior
+    assert connection.execute('SELECT fecha, estado FROM main.Pedidos ORDER BY id').fetchall() == [
+        ('2026-02-01', 'entregado'), ('2026-01-10', 'pendiente')]
+    assert connection.execute('SELECT fecha FROM DiasArchivados ORDER BY fecha').fetchall() == [
+        ('2026-01-10',), ('2026-01-11',)]
+    # Las vistas sobre las dos bases y los totales diarios no cambian
+    assert views(db) == before
+    assert history.get_daily_total('2026-01-10') == 1050 + 2100 + 600
+
+
+def test_archive_before_twice(db, history):
+    assert db.archive_before('2026-01-31') == 6
+    assert db.archive_before('2026-01-31') == 0
+    assert db.archive_before('2026-03-01') == 2
+
+
+def test_archive_resumes_after_copy(db, history):
+    """Corte entre la copia al archivo y el borrado: la pasada siguiente sólo borra"""
+    connection = db.connection
+    for table, columns in (('Pedidos', '*'), ('Ventas', '*'), ('Pagos', '*')):
+        key = 'id' if table == 'Pedidos' else 'pedido_id'
+        connection.execute(f'INSERT INTO archivo.{table} SELECT {columns} FROM main.{table} WHERE {key} = 1')
+    connection.commit()
+    before = views(db)
+    assert db.archive_before('2026-01-31') == 6
+    assert connection.execute('SELECT COUNT(*) FROM archivo.Ventas').fetchone()[0] == 6
+    assert views(db) == before
+
+
+def test_memory_database_has_no_archive():
+    from heladeria.database import Database
+    db = Database(':memory:')
+    try:
+        with pytest.raises(ValueError):
+            db.archive_before('2026-01-31')
+    finally:
+        db.close()
@@ -0,0 +1,69 @@
+import gzip
+import os
+import sqlite3
+
+import pytest
+
+from heladeria.backup import BackupCancelled, BackupManager
+from heladeria.managers import SalesManager
+
+
+@pytest.fixture
+def backups(db, products, tmp_path):
+    SalesManager(db, products.catalog).sell_ticket([(1, 2)])
+    return BackupManager(db, directory=str(tmp_path / 'respaldos'), keep=3, pages=1, pause=0)
+
+
+def restore(path, target):
+    with gzip.open(path, 'rb') as source, open(target, 'wb') as f:
+        f.write(source.read())
+    return sqlite3.connect(target)
+
+
+def test_run(db, backups, tmp_path):
+    steps = []
+    result = backups.run(lambda etapa, hechas, total: steps.append(etapa))
+    assert {'copia', 'verificacion', 'compresion'} <= set(steps)
+    # La base y su archivo, con la misma fecha y hora
+    assert len(result['archivos']) == 2
+    assert backups.snapshots()[0][1] == sorted(result['archivos'])
+    main, = [path for path in result['archivos'] if '-archivo-' not in path]
+    # Sólo quedan los .db.gz, sin copias a medio hacer
+    assert sorted(os.listdir(backups.directory)) == sorted(os.path.basename(path) for path in result['archivos'])
+    copy = restore(main, str(tmp_path / 'restaurada.db'))
+    try:
+        assert copy.execute('PRAGMA quick_check').fetchone()[0] == 'ok'
+        assert copy.execute('SELECT COUNT(*), SUM(precio_total) FROM Ventas').fetchone() == (1, 2100)
+        assert copy.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+    finally:
+        copy.close()
+
+
+def test_failed_verification_leaves_nothing(db, backups, monkeypatch):
+    monkeypatch.setattr(db, 'quick_check', lambda path=None, full=False: ['*** in database main ***'])
+    with pytest.raises(sqlite3.DatabaseError):
+        backups.run()
+    assert os.listdir(backups.directory) == []
+
+
+def test_cancel(backups):
+    with pytest.raises(BackupCancelled):
+        backups.run(lambda etapa, hechas, total: backups.cancel())
+    assert os.listdir(backups.directory) == []
+    assert backups.progress is None
+
+
+def test_rotate(backups):
+    os.makedirs(backups.directory)
+    for day in range(1, 6):
+        for suffix in ('', '-archivo'):
+            open(os.path.join(backups.directory, f'heladeria{suffix}-2026010{day}-120000.db.gz'), 'wb').close()
+    other = os.path.join(backups.directory, 'otra-20260101-120000.db.gz')
+    open(other, 'wb').close()
+    assert backups.rotate() == 2
+    assert [stamp.day for stamp, paths in backups.snapshots()] == [5, 4, 3]
+    assert all(len(paths) == 2 for _, paths in backups.snapshots())
+    # Los archivos que no son respaldos de esta base no se tocan
+    assert os.path.exists(other)
+    backups.run()
+    assert len(backups.snapshots()) == 3
@@ -0,0 +1,59 @@
+import sqlite3
+
+import pytest
+
+from heladeria.managers import ProductCatalog, SalesManager
+
+
+def version(db):
+    return db.connection.execute('SELECT version FROM VersionCatalogo').fetchone()[0]
+
+
+def other_process(db, sql, params=()):
+    """Cambio hecho por otro proceso: otra conexión, sin pasar por invalidate"""
+    connection = sqlite3.connect(db.path)
+    with connection:
+        connection.execute(sql, params)
+    connection.close()
+
+
+def test_triggers_bump_version(db, products):
+    start = version(db)
+    other_process(db, 'UPDATE Productos SET precio = 1100 WHERE id = 1')
+    other_process(db, "INSERT INTO Productos (nombre, categoria, precio) VALUES ('Kilo', 'Potes', 9000)")
+    other_process(db, 'DELETE FROM Productos WHERE id = 3')
+    assert version(db) == start + 3
+
+
+def test_reloads_after_change_from_other_process(db, products):
+    catalog = ProductCatalog(db, ttl=0)
+    assert catalog.price(1) == 1050
+    seen = catalog.version
+    other_process(db, 'UPDATE Productos SET precio = 1100 WHERE id = 1')
+    assert catalog.price(1) == 1100
+    assert catalog.version == seen + 1
+    # Sin más cambios, la versión no avanza
+    assert catalog.refresh() == seen + 1
+
+
+def test_serves_from_memory_within_ttl(db, products, monkeypatch):
+    catalog = ProductCatalog(db, ttl=3600)
+    assert catalog.price(1) == 1050
+    monkeypatch.setattr(catalog.repository, 'version', lambda: pytest.fail("consultó VersionCatalogo"))
+    sales = SalesManager(db, catalog)
+    for _ in range(5):
+        assert sales.sell_ticket([(1, 1), (2, 2)]) == 1650
+    assert catalog.get(2).precio == 300
+
+
+def test_local_changes_apply_at_once(db, products):
+    catalog = products.catalog
+    catalog.ttl = 3600
+    assert catalog.price(1) == 1050
+    seen = catalog.version
+    products.update_product(1, 'Cucurucho', 'Helados', 1200)
+    assert catalog.price(1) == 1200
+    assert catalog.version > seen
+    products.delete_product(2)
+    with pytest.raises(ValueError):
+        catalog.price(2)
@@ -0,0 +1,72 @@
+import csv
+
+import pytest
+
+from heladeria import csv_io
+from heladeria.csv_io import CsvManager
+from heladeria.database import Database
+from heladeria.managers import ClientManager, SalesManager
+from heladeria.money import Money
+
+
+@pytest.fixture
+def other_db(tmp_path):
+    db = Database(str(tmp_path / 'otra.db'))
+    yield db
+    db.close()
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # Bloques chicos para que importar y exportar pasen por varios
+    monkeypatch.setattr(csv_io, 'CSV_CHUNK_SIZE', 2)
+
+
+def test_products_round_trip(db, other_db, products, tmp_path):
+    products.add_product('Pote "1/4", chocolate', 'Potes', 250099)
+    path = str(tmp_path / 'productos.csv')
+    assert CsvManager(db).export_products(path) == 3
+    catalog = CsvManager(other_db)
+    assert catalog.import_products(path) == (3, [])
+    rows = other_db.connection.execute('SELECT nombre, categoria, precio FROM Productos ORDER BY id').fetchall()
+    assert rows == [(p.nombre, p.categoria, p.precio) for p in products.get_products()]
+    assert all(type(precio) is Money for _, _, precio in rows)
+
+
+def test_clients_round_trip(db, other_db, tmp_path):
+    clients = ClientManager(db)
+    for n in range(5):
+        clients.add_client(f'Cliente ñandú {n}', f'Av. Mitre {n}, 2º "B"', f'555-{n}')
+    path = str(tmp_path / 'clientes.csv')
+    assert CsvManager(db).export_clients(path) == 5
+    assert CsvManager(other_db).import_clients(path) == (5, [])
+    assert [tuple(row) for row in ClientManager(other_db).get_clients()] == [tuple(row) for row in clients.get_clients()]
+
+
+def test_import_reports_bad_rows(db, tmp_path):
+    path = tmp_path / 'productos.csv'
+    # Planilla con ';', encabezados en mayúsculas y precios con coma decimal
+    path.write_text('Nombre;Categoria;Precio\n'
+                    'Kilo;Potes;4500,50\n'
+                    ';Potes;10\n'
+                    'Cuarto;Potes;caro\n'
+                    'Regalo;Promos;-1\n'
+                    'Medio;Potes;2300\n', encoding='utf-8')
+    total, errors = CsvManager(db).import_products(str(path))
+    assert total == 2
+    assert [line for line, _ in errors] == [3, 4, 5]
+    assert db.connection.execute('SELECT nombre, precio FROM Productos ORDER BY id').fetchall() == [
+        ('Kilo', 450050), ('Medio', 230000)]
+
+
+def test_export_sales(db, products, tmp_path):
+    sales = SalesManager(db, products.catalog)
+    sales.sell_ticket([(1, 2), (2, 1)])
+    sales.sell_ticket([(2, 3)])
+    path = tmp_path / 'ventas.csv'
+    assert CsvManager(db).export_sales(str(path), '2000-01-01', '2999-12-31') == 3
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        rows = list(csv.DictReader(f))
+    assert [(row['producto'], row['cantidad'], row['precio_total']) for row in rows] == [
+        ('Cucurucho', '2', '21.00'), ('Paleta', '1', '3.00'), ('Paleta', '3', '9.00')]
+    assert CsvManager(db).export_sales(str(path), '2000-01-01', '2000-01-02') == 0
@@ -0,0 +1,56 @@
+import pytest
+
+from heladeria.dao import InventoryRepository
+from heladeria.inventory import InventoryManager
+from heladeria.managers import SalesManager
+
+
+@pytest.fixture
+def inventory(db, products):
+    """Cucurucho: 1 cono y 2 bochas; Paleta: 1 paleta"""
+    manager = InventoryManager(db)
+    conos = manager.add_item('Conos', stock=10)
+    bochas = manager.add_item('Bochas', stock=5)
+    manager.add_item('Paletas', stock=3, producto_id=2)
+    manager.set_recipe(1, [(conos, 1), (bochas, 2)])
+    return manager
+
+
+def stock(inventory):
+    return {item.nombre: item.stock for item in inventory.get_items()}
+
+
+def test_consume_rejects_negative_stock(db, inventory):
+    repository = InventoryRepository(db)
+    connection = db.connection
+    repository.consume(connection, [(1, 2), (2, 1)], allow_negative=False)
+    connection.commit()
+    assert stock(inventory) == {'Bochas': 1, 'Conos': 8, 'Paletas': 2}
+    with pytest.raises(ValueError, match='Bochas'):
+        repository.consume(connection, [(1, 1)], allow_negative=False)
+    connection.rollback()
+    assert stock(inventory) == {'Bochas': 1, 'Conos': 8, 'Paletas': 2}
+    # Con allow_negative (ventas ya cobradas, el diario) el stock puede quedar negativo
+    repository.consume(connection, [(1, 1)])
+    connection.commit()
+    assert stock(inventory)['Bochas'] == -1
+
+
+def test_sale_without_stock_is_rolled_back(db, inventory):
+    sales = SalesManager(db, None)
+    sales.sell_ticket([(1, 2)])
+    with pytest.raises(ValueError):
+        sales.sell_ticket([(2, 1), (1, 1)])
+    assert stock(inventory) == {'Bochas': 1, 'Conos': 8, 'Paletas': 3}
+    assert db.connection.execute('SELECT COUNT(*) FROM Ventas').fetchone()[0] == 1
+    assert SalesManager(db, None, allow_negative_stock=True).sell_ticket([(1, 1)]) == 1050
+
+
+def test_movements(db, inventory):
+    conos = 1
+    SalesManager(db, None).sell_ticket([(1, 2)])
+    inventory.receive(conos, 20)
+    inventory.adjust(conos, 25)
+    assert [(m.cantidad, m.stock, m.motivo) for m in inventory.movements(conos)] == [
+        (-3, 25, 'ajuste'), (20, 28, 'ingreso'), (-2, 8, 'venta'), (10, 10, 'alta')]
+    assert [item.nombre for item in inventory.low_stock(margen=1)] == ['Bochas']
@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+from heladeria.cli import main
+from heladeria.journal import JournalInUse, SalesJournal
+from heladeria.managers import SalesManager
+
+FECHA = '2026-03-02'
+
+
+def write_entries(path, entries, tail=b''):
+    with open(path, 'ab') as f:
+        for entry in entries:
+            f.write((json.dumps(entry) + '\n').encode('utf-8'))
+        f.write(tail)
+
+
+def entry(seq, cantidad=1):
+    return [seq, FECHA, 15, [[1, cantidad, 1050 * cantidad]], None, 'efectivo']
+
+
+def sales(db):
+    return db.connection.execute('SELECT COUNT(*), SUM(cantidad) FROM Ventas').fetchone()
+
+
+def test_replay_after_crash(db, products, tmp_path):
+    path = str(tmp_path / 'ventas.journal')
+    # Tres tickets escritos y una cuarta línea cortada a mitad de la escritura
+    write_entries(path, [entry(1), entry(2, 2), entry(3)], tail=b'[4,"2026-03')
+    journal = SalesJournal(db, path, flush_interval=3600)
+    try:
+        assert sales(db) == (3, 4)
+        assert journal.applied_seq() == 3
+        assert db.connection.execute("SELECT SUM(total) FROM Pedidos WHERE fecha = ?", (FECHA,)).fetchone()[0] == 4200
+        # El archivo queda vacío y la numeración sigue después de lo aplicado
+        with open(path, 'rb') as f:
+            assert f.read() == b''
+        assert journal.append([(1, 1, 1050)], FECHA, 16) == 4
+    finally:
+        journal.close()
+    assert sales(db) == (4, 5)
+
+
+def test_replay_does_not_apply_twice(db, products, tmp_path):
+    path = str(tmp_path / 'ventas.journal')
+    write_entries(path, [entry(1), entry(2)])
+    SalesJournal(db, path, flush_interval=3600).close()
+    # Caída entre el commit y el vaciado del archivo: las mismas entradas vuelven a estar
+    write_entries(path, [entry(1), entry(2), entry(3)])
+    journal = SalesJournal(db, path, flush_interval=3600)
+    try:
+        assert sales(db) == (3, 3)
+        assert journal.applied_seq() == 3
+    finally:
+        journal.close()
+
+
+def test_journals_with_same_name(db, products, tmp_path):
+    paths = []
+    for folder in ('caja1', 'caja2'):
+        (tmp_path / folder).mkdir()
+        paths.append(str(tmp_path / folder / 'ventas.journal'))
+    write_entries(paths[0], [entry(1), entry(2)])
+    write_entries(paths[1], [entry(1)])
+    for path in paths:
+        SalesJournal(db, path, flush_interval=3600).close()
+    assert sales(db) == (3, 3)
+
+
+def test_sales_through_journal(db, products, tmp_path):
+    journal = SalesJournal(db, str(tmp_path / 'ventas.journal'), flush_interval=3600)
+    try:
+        manager = SalesManager(db, products.catalog, journal)
+        assert manager.sell_ticket([(1, 2), (2, 1)]) == 2400
+        assert sales(db) == (0, None)
+        # Las lecturas descargan el diario antes de consultar
+        assert manager.get_daily_total() == 2400
+    finally:
+        journal.close()
+
+
+def test_journal_in_use(db, products, tmp_path, capsys):
+    path = str(tmp_path / 'ventas.journal')
+    owner = SalesJournal(db, path, flush_interval=3600)
+    try:
+        owner.append([(1, 1, 1050)], FECHA, 12)
+        with pytest.raises(JournalInUse):
+            SalesJournal(db, path, flush_interval=3600)
+        # La línea de comandos lee la base sin aplicar ni vaciar el diario del dueño
+        assert main(['--db', db.path, '--diario', path, 'ventas']) == 0
+        assert 'en uso' in capsys.readouterr().out
+        assert len(owner.read_entries()) == 1
+        assert sales(db) == (0, None)
+    finally:
+        owner.close()
+    assert sales(db) == (1, 1)
+    SalesJournal(db, path, flush_interval=3600).close()
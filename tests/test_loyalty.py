@@ -0,0 +1,60 @@
+import pytest
+
+from heladeria.loyalty import LoyaltyManager
+from heladeria.managers import ClientManager, SalesManager
+
+
+@pytest.fixture
+def clients(db):
+    manager = ClientManager(db)
+    manager.add_client('Ana', 'Mitre 10', '555-0101')
+    manager.add_client('Beto', 'Sarmiento 20', '555-0102')
+    return manager
+
+
+@pytest.fixture
+def sales(db, products):
+    return SalesManager(db, products.catalog)
+
+
+def recomputed(db, cliente_id):
+    """Visitas y gasto recalculados desde los pedidos, como los deja la migración 11"""
+    return db.connection.execute('''
+        SELECT COUNT(*), COALESCE(SUM(total), 0) FROM Pedidos
+        WHERE cliente_id = ? AND estado IN ('pagado', 'entregado')
+    ''', (cliente_id,)).fetchone()
+
+
+def test_pending_order_counts_once_paid(db, clients, sales):
+    loyalty = LoyaltyManager(db)
+    pedido_id = sales.create_order([(1, 2)], cliente_id=1)
+    assert loyalty.get_client_stats(1) is None
+    sales.add_payment(pedido_id, 2100, 'tarjeta')
+    stats = loyalty.get_client_stats(1)
+    assert (stats.visitas, stats.gasto) == (1, 2100)
+    sales.set_order_state(pedido_id, 'entregado')
+    assert tuple(loyalty.get_client_stats(1)[:2]) == recomputed(db, 1) == (1, 2100)
+
+
+def test_reassigning_client_moves_stats(db, clients, sales):
+    loyalty = LoyaltyManager(db)
+    sales.sell_ticket([(1, 1)], cliente_id=1)
+    sales.sell_ticket([(2, 3)], cliente_id=1)
+    assert tuple(loyalty.get_client_stats(1)[:2]) == (2, 1950)
+    db.connection.execute('UPDATE Pedidos SET cliente_id = 2 WHERE id = 1')
+    db.connection.commit()
+    for cliente_id in (1, 2):
+        assert tuple(loyalty.get_client_stats(cliente_id)[:2]) == recomputed(db, cliente_id)
+    assert [favorite.producto_id for favorite in loyalty.get_favorites(1)] == [2]
+    assert [favorite.producto_id for favorite in loyalty.get_favorites(2)] == [1]
+
+
+def test_top_clients(db, clients, sales):
+    loyalty = LoyaltyManager(db)
+    sales.sell_ticket([(1, 1)], cliente_id=1)
+    sales.sell_ticket([(2, 1)], cliente_id=2)
+    sales.sell_ticket([(2, 1)], cliente_id=2)
+    assert [row.cliente_id for row in loyalty.get_top_clients(orden='gasto')] == [1, 2]
+    assert [row.cliente_id for row in loyalty.get_top_clients(orden='visitas')] == [2, 1]
+    with pytest.raises(ValueError):
+        loyalty.get_top_clients(orden='nombre')
@@ -0,0 +1,68 @@
+import sqlite3
+
+from heladeria.database import MIGRATIONS, Database
+from heladeria.money import Money
+
+
+def create_legacy(path):
+    """Base de la primera versión: importes REAL en pesos y sin user_version"""
+    connection = sqlite3.connect(path)
+    connection.executescript('''
+        CREATE TABLE Clientes (id INTEGER PRIMARY KEY AUTOINCREMENT, nombre TEXT NOT NULL,
+                               direccion TEXT, telefono TEXT);
+        CREATE TABLE Productos (id INTEGER PRIMARY KEY AUTOINCREMENT, nombre TEXT NOT NULL,
+                                categoria TEXT, precio REAL NOT NULL);
+        CREATE TABLE Ventas (id INTEGER PRIMARY KEY AUTOINCREMENT, producto_id INTEGER NOT NULL,
+                             cantidad INTEGER NOT NULL, precio_total REAL NOT NULL, fecha TEXT NOT NULL,
+                             FOREIGN KEY (producto_id) REFERENCES Productos (id));
+        INSERT INTO Clientes (nombre, direccion, telefono) VALUES ('Ana', 'Mitre 10', '555-0101');
+        INSERT INTO Productos (nombre, categoria, precio) VALUES ('Cucurucho', 'Helados', 10.5), ('Paleta', 'Palitos', 0.1);
+        INSERT INTO Ventas (producto_id, cantidad, precio_total, fecha) VALUES
+            (1, 2, 21.0, '2024-01-05'), (2, 3, 0.3, '2024-01-05'), (1, 1, 10.5, '2024-01-06');
+    ''')
+    connection.commit()
+    connection.close()
+
+
+def test_migrates_legacy_schema(tmp_path):
+    path = str(tmp_path / 'heladeria.db')
+    create_legacy(path)
+    db = Database(path)
+    try:
+        connection = db.connection
+        assert connection.execute('PRAGMA user_version').fetchone()[0] == len(MIGRATIONS)
+        assert connection.execute('PRAGMA integrity_check').fetchone()[0] == 'ok'
+        assert connection.execute('PRAGMA foreign_key_check').fetchall() == []
+
+        # Importes pasados a centavos enteros, sin errores de redondeo
+        precios = connection.execute('SELECT precio FROM Productos ORDER BY id').fetchall()
+        assert precios == [(Money(1050),), (Money(10),)]
+        assert all(type(precio) is Money for precio, in precios)
+        assert connection.execute('SELECT typeof(precio_total), SUM(precio_total) FROM Ventas').fetchone() == ('integer', 3180)
+
+        # Totales diarios recalculados desde los centavos
+        assert connection.execute('SELECT fecha, ventas, cantidad, total FROM VentasDiarias ORDER BY fecha').fetchall() == [
+            ('2024-01-05', 2, 5, 2130), ('2024-01-06', 1, 1, 1050)]
+
+        # Historial pasado a pedidos entregados, uno por venta
+        assert connection.execute('SELECT COUNT(*) FROM Ventas WHERE pedido_id IS NULL').fetchone()[0] == 0
+        assert connection.execute("SELECT COUNT(*), SUM(total) FROM Pedidos WHERE estado = 'entregado'").fetchone() == (3, 3180)
+    finally:
+        db.close()
+
+
+def test_reopen_is_a_no_op(tmp_path):
+    path = str(tmp_path / 'heladeria.db')
+    create_legacy(path)
+    Database(path).close()
+    db = Database(path)
+    try:
+        assert db.connection.execute('PRAGMA user_version').fetchone()[0] == len(MIGRATIONS)
+        assert db.connection.execute('SELECT COUNT(*) FROM Pedidos').fetchone()[0] == 3
+    finally:
+        db.close()
+
+
+def test_new_database(db):
+    assert db.connection.execute('PRAGMA user_version').fetchone()[0] == len(MIGRATIONS)
+    assert db.connection.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
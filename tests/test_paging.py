@@ -0,0 +1,34 @@
+import pytest
+
+from heladeria.managers import ClientManager
+
+
+@pytest.fixture
+def clients(db):
+    manager = ClientManager(db)
+    manager.repository.insert_many([(f'Cliente {n:03d}', f'Calle {n}', f'555-{n:04d}') for n in range(1, 251)])
+    db.connection.commit()
+    return manager
+
+
+def test_pages_forward_and_back(clients):
+    ids = []
+    after_id = 0
+    while True:
+        page = clients.get_clients_page(after_id=after_id, limit=40)
+        if not page:
+            break
+        ids += [row.id for row in page]
+        after_id = page[-1].id
+    assert ids == list(range(1, 251))
+    # Hacia atrás vuelven en orden de id
+    assert [row.id for row in clients.get_clients_page(before_id=101, limit=5)] == [96, 97, 98, 99, 100]
+    assert clients.get_clients_page(before_id=1, limit=5) == []
+
+
+def test_skips_deleted_ids(clients):
+    for client_id in range(10, 20):
+        clients.delete_client(client_id)
+    assert [row.id for row in clients.get_clients_page(after_id=5, limit=6)] == [6, 7, 8, 9, 20, 21]
+    assert clients.count_clients() == 240
+    assert clients.client_id_at(9) == 20
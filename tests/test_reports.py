@@ -0,0 +1,74 @@
+import pytest
+
+from heladeria.dao import OrderRepository
+from heladeria.database import Database, today
+from heladeria.managers import SalesManager
+from heladeria.money import Money
+from heladeria.reports import ReportManager
+
+DIAS = ['2026-01-05', '2026-01-06', '2026-01-12']
+
+
+@pytest.fixture
+def history(db, products):
+    """Ventas en días pasados y hoy: (producto_id, cantidad) por ticket"""
+    orders = OrderRepository(db)
+    precios = {1: 1050, 2: 300}
+    tickets = [(DIAS[0], 13, [(1, 2), (2, 1)]), (DIAS[0], 20, [(2, 4)]), (DIAS[1], 13, [(1, 1)]),
+               (DIAS[2], 22, [(1, 3), (2, 2)])]
+    for fecha, hora, items in tickets:
+        filas = [(product_id, cantidad, Money(precios[product_id] * cantidad)) for product_id, cantidad in items]
+        total = sum((fila[2] for fila in filas), Money(0))
+        orders.record(db.connection, filas, None, 'entregado', [(total, 'efectivo')], fecha, hora)
+    db.connection.commit()
+    SalesManager(db, products.catalog).sell_ticket([(2, 1)])
+    return ReportManager(db)
+
+
+def raw(db, sql, params=()):
+    return db.connection.execute(sql, params).fetchall()
+
+
+def test_summaries_match_ventas(db, history):
+    desde, hasta = DIAS[0], today()
+    productos = history.revenue_by_product(desde, hasta)
+    assert [(row[0], row[2], row[3]) for row in productos] == raw(db, '''
+        SELECT producto_id, SUM(cantidad), SUM(precio_total) FROM Ventas GROUP BY producto_id ORDER BY 3 DESC''')
+    assert sum(row[4] for row in productos) == pytest.approx(100)
+    assert all(type(row[3]) is Money for row in productos)
+    assert [(row[0], row[1], row[2]) for row in history.daily_totals(desde, hasta)] == raw(db, '''
+        SELECT fecha, COUNT(*), SUM(precio_total) FROM Ventas GROUP BY fecha ORDER BY fecha''')
+    horas = history.hourly_distribution(desde, hasta)
+    assert sum(row[3] for row in horas) == raw(db, 'SELECT SUM(precio_total) FROM Ventas')[0][0]
+    assert [row[2] for row in history.top_sellers(desde, hasta)] == ['Paleta', 'Cucurucho']
+    categorias = dict((row[0], row[2]) for row in history.revenue_by_category(desde, hasta))
+    assert categorias == {'Helados': 6300, 'Palitos': 2400}
+
+
+def test_closed_days_summarized_once(db, history):
+    assert history.cache_closed_days(DIAS[0], today()) == 3
+    assert history.cache_closed_days(DIAS[0], today()) == 0
+    # Hoy no se resume: todavía puede vender
+    assert raw(db, 'SELECT fecha FROM ResumenDias ORDER BY fecha') == [(fecha,) for fecha in DIAS]
+    assert raw(db, 'SELECT SUM(total) FROM ResumenDiarioProducto') == raw(
+        db, 'SELECT SUM(precio_total) FROM Ventas WHERE fecha < ?', (today(),))
+
+
+def test_concurrent_summary(db, history, monkeypatch):
+    """Otro proceso resume los mismos días entre la lectura de pendientes y la escritura"""
+    pending = history.repository.pending_days(DIAS[0], today(), today())
+    other = Database(db.path)
+    try:
+        assert ReportManager(other).cache_closed_days(DIAS[0], today()) == 3
+    finally:
+        other.close()
+    monkeypatch.setattr(history.repository, 'pending_days', lambda desde, hasta, hoy: pending)
+    assert history.cache_closed_days(DIAS[0], today()) == 0
+    assert raw(db, 'SELECT COUNT(*) FROM ResumenDiarioHora WHERE fecha = ?', (DIAS[0],)) == [(2,)]
+
+
+def test_compare_periods(db, history):
+    desde_anterior, hasta_anterior, rows = history.compare_periods('2026-01-08', '2026-01-14')
+    assert (desde_anterior, hasta_anterior) == ('2026-01-01', '2026-01-07')
+    assert [row[:4] for row in rows] == [(1, 'Cucurucho', 3150, 3150), (2, 'Paleta', 600, 1500)]
+    assert rows[1][4] == pytest.approx(-60)
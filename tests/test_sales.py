@@ -0,0 +1,126 @@
+import sqlite3
+
+import pytest
+
+from heladeria.inventory import InventoryManager
+from heladeria.managers import SalesManager
+
+
+@pytest.fixture
+def sales(db, products):
+    return SalesManager(db, products.catalog)
+
+
+def count(db, table):
+    return db.connection.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+
+def test_sell_ticket(db, sales):
+    assert sales.sell_ticket([(1, 2), (2, 1)], metodo_pago='tarjeta') == 2400
+    assert db.connection.execute('SELECT estado, total FROM Pedidos').fetchall() == [('entregado', 2400)]
+    assert db.connection.execute('SELECT monto, metodo_pago FROM Pagos').fetchall() == [(2400, 'tarjeta')]
+    assert sales.get_daily_total() == 2400
+
+
+def test_sell_ticket_rejects_stale_quote(db, sales, products):
+    cotizado = 2400
+    products.update_product(1, 'Cucurucho', 'Helados', 1200)  # Otra caja cambia el precio
+    with pytest.raises(ValueError, match='Cambiaron los precios'):
+        sales.sell_ticket([(1, 2), (2, 1)], total=cotizado)
+    assert count(db, 'Pedidos') == 0
+    assert sales.sell_ticket([(1, 2), (2, 1)], total=2700) == 2700
+    results = sales.sell_tickets([([(2, 1)], None, 'efectivo', 300), ([(2, 1)], None, 'efectivo', 250)])
+    assert results[0] == 300 and isinstance(results[1], ValueError)
+    assert count(db, 'Pedidos') == 2
+
+
+def test_sell_tickets_rolls_back_only_the_bad_ticket(db, sales):
+    inventory = InventoryManager(db)
+    paletas = inventory.add_item('Paletas', stock=3, producto_id=2)
+    results = sales.sell_tickets([
+        ([(1, 1)], None, 'efectivo'),
+        ([(1, 1), (2, 5)], None, 'efectivo'),   # Sin stock: se deshace después de insertar el pedido
+        ([(9, 1)], None, 'efectivo'),           # Producto inexistente
+        ([(1, 1)], None, 'cheque'),             # Medio de pago desconocido
+        ([(2, 2)], None, 'QR'),
+    ])
+    assert results[0] == 1050
+    assert all(isinstance(result, ValueError) for result in results[1:4])
+    assert results[4] == 600
+    assert count(db, 'Pedidos') == 2
+    assert count(db, 'Ventas') == 2
+    assert count(db, 'Pagos') == 2
+    assert inventory.get_item(paletas).stock == 1
+    assert sales.get_daily_total() == 1650
+    assert not db.connection.in_transaction
+
+
+def test_sell_tickets_database_error_rolls_back_all(db, sales, monkeypatch):
+    calls = []
+
+    def consume(conn, items, allow_negative=True):
+        calls.append(items)
+        if len(calls) == 2:
+            raise sqlite3.OperationalError('disk I/O error')
+    monkeypatch.setattr(sales.inventory, 'consume', consume)
+    with pytest.raises(sqlite3.OperationalError):
+        sales.sell_tickets([([(1, 1)], None, 'efectivo'), ([(2, 1)], None, 'efectivo')])
+    assert count(db, 'Ventas') == 0
+    assert not db.connection.in_transaction
+
+
+def test_order_payments(db, sales):
+    pedido_id = sales.create_order([(1, 2)])
+    sales.add_payment(pedido_id, 1000)
+    assert sales.get_order(pedido_id)[0].estado == 'pendiente'
+    sales.add_payment(pedido_id, 1100, 'transferencia')
+    assert sales.get_order(pedido_id)[0].estado == 'pagado'
+    with pytest.raises(ValueError):
+        sales.add_payment(pedido_id, 100, 'cheque')
+
+
+@pytest.mark.parametrize('cantidad', [-2, 0, 1.5, 'a', None, True])
+def test_rejects_invalid_quantity(db, sales, cantidad):
+    with pytest.raises(ValueError):
+        sales.sell_ticket([(1, 1), (2, cantidad)])
+    result, = sales.sell_tickets([([(2, cantidad)], None, 'efectivo')])
+    assert isinstance(result, ValueError)
+    with pytest.raises(ValueError):
+        sales.create_order([(2, cantidad)])
+    assert count(db, 'Ventas') == 0
+    assert sales.get_daily_total() == 0
+
+
+def test_payment_limited_to_balance(db, sales):
+    pedido_id = sales.create_order([(1, 2)])
+    for monto in (0, -100, 1.5, True):
+        with pytest.raises(ValueError):
+            sales.add_payment(pedido_id, monto)
+    with pytest.raises(ValueError, match='saldo'):
+        sales.add_payment(pedido_id, 2101)
+    with pytest.raises(ValueError, match='no encontrado'):
+        sales.add_payment(999, 100)
+    # Un pago sin confirmar no cubre el pedido ni reduce el saldo
+    sales.add_payment(pedido_id, 2100, 'transferencia', confirmado=False)
+    assert sales.get_order(pedido_id)[0].estado == 'pendiente'
+    sales.add_payment(pedido_id, 2100)
+    assert sales.get_order(pedido_id)[0].estado == 'pagado'
+    with pytest.raises(ValueError, match='saldo'):
+        sales.add_payment(pedido_id, 1)
+    assert not db.connection.in_transaction
+
+
+def test_state_follows_confirmed_payments(db, sales):
+    pedido_id = sales.create_order([(1, 1)])
+    for estado in ('pagado', 'entregado'):
+        with pytest.raises(ValueError, match='saldo'):
+            sales.set_order_state(pedido_id, estado)
+    sales.add_payment(pedido_id, 1050)
+    with pytest.raises(ValueError):
+        sales.set_order_state(pedido_id, 'pendiente')
+    sales.set_order_state(pedido_id, 'entregado')
+    assert sales.get_order(pedido_id)[0].estado == 'entregado'
+    with pytest.raises(ValueError):
+        sales.set_order_state(pedido_id, 'cancelado')
+    with pytest.raises(ValueError, match='no encontrado'):
+        sales.set_order_state(999, 'entregado')
@@ -0,0 +1,48 @@
+import pytest
+
+from heladeria.dao import fts_query
+from heladeria.managers import ClientManager
+
+
+@pytest.fixture
+def clients(db):
+    manager = ClientManager(db)
+    for nombre, direccion in [('Ana Gómez', 'Mitre 10'), ('Anabel Ruiz', 'Sarmiento 20'),
+                              ('Bruno Anaya', 'Belgrano 30'), ('Carla Díaz', 'Mitre 400')]:
+        manager.add_client(nombre, direccion, '555')
+    return manager
+
+
+def names(rows):
+    return [row.nombre for row in rows]
+
+
+def test_fts_query():
+    assert fts_query('hel cho') == '"hel"* "cho"*'
+    assert fts_query('dice "hola') == '"dice"* """hola"*'
+    assert fts_query('   ') == ''
+
+
+def test_prefix_search(clients):
+    assert names(clients.search_clients('ana')) == ['Ana Gómez', 'Anabel Ruiz', 'Bruno Anaya']
+    assert names(clients.search_clients('ana mitre')) == ['Ana Gómez']
+    assert names(clients.search_clients('mit')) == ['Ana Gómez', 'Carla Díaz']
+    # Comillas y operadores de FTS5 se buscan como texto, sin error de sintaxis
+    assert clients.search_clients('"OR') == []
+    assert clients.count_clients('ana') == 3
+
+
+def test_index_follows_changes(clients):
+    clients.update_client(1, 'Ana Gómez', 'Rivadavia 5', '555')
+    assert names(clients.search_clients('mitre')) == ['Carla Díaz']
+    assert names(clients.search_clients('riva')) == ['Ana Gómez']
+    clients.delete_client(2)
+    assert names(clients.search_clients('ana')) == ['Ana Gómez', 'Bruno Anaya']
+
+
+def test_search_pages(clients):
+    first = clients.get_clients_page(limit=2, search='ana')
+    assert names(first) == ['Ana Gómez', 'Anabel Ruiz']
+    assert names(clients.get_clients_page(after_id=first[-1].id, limit=2, search='ana')) == ['Bruno Anaya']
+    assert names(clients.get_clients_page(before_id=3, limit=1, search='ana')) == ['Anabel Ruiz']
+    assert clients.client_id_at(2, search='ana') == 3
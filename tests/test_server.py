@@ -0,0 +1,103 @@
+import asyncio
+import threading
+
+import pytest
+
+from heladeria.dao import Pedido
+from heladeria.database import today
+from heladeria.money import Money
+from heladeria.remote import (RemoteConnection, RemoteProductManager, RemoteReportManager, RemoteSalesManager,
+                              decode, encode)
+from heladeria.server import SalesServer
+
+
+@pytest.fixture
+def serve(db, products, monkeypatch):
+    """Arrancar un SalesServer en un hilo; devuelve una función (token=None) -> dirección"""
+    monkeypatch.delenv('HELADERIA_SERVER_TOKEN', raising=False)
+    running = []
+
+    def start(token=None, address=('127.0.0.1', 0)):
+        server = SalesServer(db, token=token)
+        ready = threading.Event()
+        thread = threading.Thread(target=asyncio.run, args=(server.serve(address, lambda address: ready.set()),))
+        thread.start()
+        ready.wait(5)
+        running.append((server, thread))
+        return '%s:%d' % server.address
+
+    yield start
+    for server, thread in running:
+        server.stop()
+        thread.join()
+
+
+@pytest.fixture
+def connection(serve):
+    connection = RemoteConnection(serve())
+    yield connection
+    connection.close()
+
+
+def test_encode_round_trip():
+    value = (Money(1050), [Money(1), ('a', None)], {1: Money(2), 'x': [3]},
+             Pedido(7, None, '2026-03-02', 15, 'entregado', Money(2100)), 1.5, True)
+    decoded = decode(encode(value))
+    assert decoded == value
+    assert type(decoded[0]) is Money
+    assert type(decoded[1]) is list and type(decoded[1][1]) is tuple
+    assert type(decoded[3]) is Pedido and type(decoded[3].total) is Money
+
+
+def test_sales_round_trip(db, connection):
+    sales = RemoteSalesManager(connection)
+    total = sales.sell_ticket([(1, 2), (2, 1)], metodo_pago='tarjeta')
+    assert total == 2400 and type(total) is Money
+    pedido, lineas, pagos = sales.get_order(1)
+    assert type(pedido) is Pedido and pedido.total == 2400
+    assert [(linea.nombre, linea.cantidad) for linea in lineas] == [('Cucurucho', 2), ('Paleta', 1)]
+    assert [(pago.monto, pago.metodo_pago) for pago in pagos] == [(2400, 'tarjeta')]
+    assert sales.get_daily_total() == 2400
+    assert db.connection.execute('SELECT COUNT(*) FROM Ventas').fetchone()[0] == 2
+    # Los errores vuelven con su tipo
+    with pytest.raises(ValueError):
+        sales.sell_ticket([(99, 1)])
+    with pytest.raises(ValueError):
+        sales.sell_ticket([(1, 1)], None, 'efectivo', 999)  # Total cotizado con otros precios
+    assert sales.sell_ticket([(1, 1)], total=1050) == 1050
+
+
+def test_products_and_reports(connection):
+    products = RemoteProductManager(connection)
+    product_id = products.add_product('Kilo', 'Potes', Money(9000))
+    assert products.catalog.price(product_id) == 9000
+    assert [row.nombre for row in products.search_products('kil')] == ['Kilo']
+    RemoteSalesManager(connection).sell_product(product_id, 1)
+    assert RemoteReportManager(connection).top_sellers(today(), today(), 1)[0][2] == 'Kilo'
+
+
+@pytest.mark.parametrize('service, method', [
+    ('SalesManager', 'sell_tickets'), ('SalesManager', 'flush_journal'), ('SalesManager', '__init__'),
+    ('ReportManager', 'cache_closed_days'), ('ProductManager', 'repository'), ('Database', 'close'),
+])
+def test_only_allowed_methods(connection, service, method):
+    with pytest.raises(ValueError, match='Operación desconocida'):
+        connection.call(service, method)
+
+
+def test_token(serve):
+    address = serve(token='secreto')
+    with pytest.raises(PermissionError):
+        RemoteConnection(address, token='otro').call('SalesManager', 'get_daily_total')
+    with pytest.raises(PermissionError):
+        RemoteConnection(address).call('SalesManager', 'get_daily_total')
+    connection = RemoteConnection(address, token='secreto')
+    try:
+        assert connection.call('SalesManager', 'get_daily_total') == 0
+    finally:
+        connection.close()
+
+
+def test_refuses_public_address_without_token(db):
+    with pytest.raises(ValueError, match='token'):
+        asyncio.run(SalesServer(db).serve(('0.0.0.0', 0)))